@@ -1,6 +1,6 @@
 from flask import Flask, jsonify
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager
+from flask_jwt_extended import JWTManager, jwt_required
 from config import Config
 from models.database import db
 from routes.tasks import tasks_bp
@@ -10,13 +10,18 @@ from routes.sync import sync_bp
 from routes.meeting_generator import meeting_generator_bp
 from routes.schedule import schedule_bp
 from routes.auth import auth_bp
+from routes.calendar import calendar_bp
+from routes.ics_import import import_bp
+from routes.export import export_bp
+from services.migrations import run_migrations
+from services.range_cache import get_cache
 import traceback
 
 app = Flask(__name__)
 app.config.from_object(Config)
 
 # Initialize extensions
-CORS(app, resources={r"/*": {"origins": "*"}})  # Allow all origins
+CORS(app, resources={r"/*": {"origins": "*"}}, expose_headers=["ETag"])  # Allow all origins
 jwt = JWTManager(app)
 db.init_app(app)
 
@@ -28,6 +33,9 @@ app.register_blueprint(meetings_bp, url_prefix='/meetings')
 app.register_blueprint(sync_bp, url_prefix='/sync')
 app.register_blueprint(meeting_generator_bp, url_prefix='/generate-meeting')
 app.register_blueprint(schedule_bp, url_prefix='/schedule')
+app.register_blueprint(calendar_bp, url_prefix='/calendar')
+app.register_blueprint(import_bp, url_prefix='/import')
+app.register_blueprint(export_bp, url_prefix='/export')
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -41,6 +49,14 @@ def check_db():
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@app.route('/cache/stats', methods=['GET'])
+@jwt_required()
+def cache_stats():
+    cache = get_cache()
+    if cache is None:
+        return jsonify({"status": "disabled"}), 200
+    return jsonify(cache.stats()), 200
+
 # Error handling improvements
 @app.errorhandler(404)
 def not_found(e):
@@ -50,9 +66,10 @@ def not_found(e):
 def handle_exception(e):
     return jsonify({"error": "Something went wrong", "details": str(e)}), 500
 
-# Ensure database tables are created
+# Ensure database tables are created and migrated
 with app.app_context():
     db.create_all()
+    run_migrations()
 
 if __name__ == '__main__':
     app.run(debug=True, port=8181)
@@ -0,0 +1,138 @@
+"""Compare per-day and whole-range availability over a 90 day window
+
+Run from the calendar-app directory:
+
+    python benchmarks/bench_availability.py --days 90 --repeat 20
+
+Seeds one user with a working-hours schedule and a busy calendar (--events
+events and --meetings meetings per day), then computes the free slots of
+--days days three ways:
+
+  per day     available_slots() once per working day, what the frontend had
+              to do with one /schedule/available-slots call per day
+  sweep       available_slots_range() without NumPy, the same per-day sweep
+  vectorized  available_slots_range() with NumPy: one busy query and one
+              occupancy bitmap for the whole range
+
+Reports the p50 and p95 of --repeat runs, and checks that all three return
+the same slots. The app uses a throwaway SQLite database unless DATABASE_URL
+is set.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, time as clock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def percentile(values, fraction):
+    """Return the value below which the given fraction of the sorted values fall"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def seed(db, Event, Meeting, Schedule, User, first_day, days, events, meetings, rng):
+    """Create one user with a schedule and a busy calendar and return the schedule"""
+    user = User(email='bench@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+    
+    schedule = Schedule(
+        start_date=first_day,
+        end_date=first_day + timedelta(days=days),
+        start_time=clock(8),
+        end_time=clock(18),
+        slot_duration=30,
+        user_id=user.id
+    )
+    db.session.add(schedule)
+    
+    for day in range(days):
+        midnight = datetime.combine(first_day + timedelta(days=day), clock())
+        for _ in range(events):
+            start = midnight + timedelta(minutes=rng.randrange(7 * 4, 19 * 4) * 15)
+            db.session.add(Event(
+                title='Busy', start_date=start, end_date=start + timedelta(minutes=rng.choice((30, 60, 90))),
+                user_id=user.id
+            ))
+        for _ in range(meetings):
+            start = midnight + timedelta(minutes=rng.randrange(8 * 4, 18 * 4) * 15)
+            db.session.add(Meeting(
+                title='Sync', date=start, duration=rng.choice((15, 30, 45)), platform='zoom', user_id=user.id
+            ))
+    
+    db.session.commit()
+    return schedule
+
+def measure(label, function, repeat):
+    """Print the p50 and p95 of repeat runs and return the last result"""
+    timings = []
+    
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - started)
+    
+    print(f'{label:<12} p50 {percentile(timings, 0.5) * 1000:8.2f} ms  p95 {percentile(timings, 0.95) * 1000:8.2f} ms')
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark multi-day availability')
+    parser.add_argument('--days', type=int, default=90, help='days in the range')
+    parser.add_argument('--events', type=int, default=4, help='events per day')
+    parser.add_argument('--meetings', type=int, default=3, help='meetings per day')
+    parser.add_argument('--repeat', type=int, default=20, help='runs per method')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    
+    database_dir = tempfile.mkdtemp(prefix='calendar-bench-')
+    os.environ.setdefault('DATABASE_URL', f'sqlite:///{os.path.join(database_dir, "bench.db")}')
+    
+    from app import app
+    from models.database import db
+    from models.event import Event
+    from models.meeting import Meeting
+    from models.schedule import Schedule
+    from models.user import User
+    from services import availability
+    
+    if availability.np is None:
+        sys.exit('NumPy is not installed')
+    
+    rng = random.Random(args.seed)
+    first_day = date(2030, 1, 7)
+    last_day = first_day + timedelta(days=args.days - 1)
+    
+    with app.app_context():
+        schedule = seed(db, Event, Meeting, Schedule, User, first_day, args.days, args.events, args.meetings, rng)
+        print(f'{args.days} days, {args.events} events and {args.meetings} meetings per day')
+        
+        def per_day():
+            return {
+                day: availability.available_slots(schedule, day) if availability.is_working_day(schedule, day) else []
+                for day in (first_day + timedelta(days=offset) for offset in range(args.days))
+            }
+        
+        def sweep():
+            numpy, availability.np = availability.np, None
+            try:
+                return availability.available_slots_range(schedule, first_day, last_day)
+            finally:
+                availability.np = numpy
+        
+        def vectorized():
+            return availability.available_slots_range(schedule, first_day, last_day)
+        
+        results = [measure(label, method, args.repeat) for label, method in (
+            ('per day', per_day), ('sweep', sweep), ('vectorized', vectorized)
+        )]
+        
+        slots = sum(len(day_slots) for day_slots in results[-1].values())
+        same = all(result == results[0] for result in results)
+        print(f'{slots} free slots, results {"match" if same else "DIFFER"}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Time /schedule/find-common-slots over many participants
+
+Run from the calendar-app directory:
+
+    python benchmarks/bench_common_slots.py --participants 50 --days 14 --repeat 20
+
+Seeds --participants users with working hours from a few shifts and a busy
+calendar (--events events and --meetings meetings per working day), then
+looks for the earliest common 30 minute slots of all of them over --days days:
+
+  cold  no day bitmap cached, every participant's busy time is loaded
+  warm  every day bitmap cached, only the AND and the run search are left
+
+Reports the p50 and p95 of --repeat runs. A cold run is forced by passing
+data versions no cache entry was stored under. The app uses a throwaway
+SQLite database unless DATABASE_URL is set.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, time as clock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SHIFTS = ((clock(8), clock(17)), (clock(9), clock(18)), (clock(7, 30), clock(16)), (clock(10), clock(19)))
+
+def percentile(values, fraction):
+    """Return the value below which the given fraction of the sorted values fall"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def seed(db, Event, Meeting, Schedule, User, participants, first_day, days, events, meetings, rng):
+    """Create the participants with their schedules and calendars and return the schedules"""
+    users = [User(email=f'bench{i}@example.com', password_hash='x') for i in range(participants)]
+    db.session.add_all(users)
+    db.session.commit()
+    
+    schedules = []
+    for user in users:
+        start_time, end_time = rng.choice(SHIFTS)
+        schedules.append(Schedule(
+            start_date=first_day, end_date=first_day + timedelta(days=days), start_time=start_time,
+            end_time=end_time, user_id=user.id
+        ))
+        
+        for day in range(days):
+            midnight = datetime.combine(first_day + timedelta(days=day), clock())
+            for _ in range(events):
+                start = midnight + timedelta(minutes=rng.randrange(7 * 4, 19 * 4) * 15)
+                db.session.add(Event(
+                    title='Busy', start_date=start, end_date=start + timedelta(minutes=rng.choice((30, 60))),
+                    user_id=user.id
+                ))
+            for _ in range(meetings):
+                start = midnight + timedelta(minutes=rng.randrange(8 * 4, 18 * 4) * 15)
+                db.session.add(Meeting(
+                    title='Sync', date=start, duration=rng.choice((15, 30)), platform='zoom', user_id=user.id
+                ))
+    
+    db.session.add_all(schedules)
+    db.session.commit()
+    return schedules
+
+def measure(label, function, repeat):
+    """Print the p50 and p95 of repeat runs and return the last result"""
+    timings = []
+    
+    for run in range(repeat):
+        started = time.perf_counter()
+        result = function(run)
+        timings.append(time.perf_counter() - started)
+    
+    print(f'{label:<6} p50 {percentile(timings, 0.5) * 1000:8.2f} ms  p95 {percentile(timings, 0.95) * 1000:8.2f} ms')
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark common slots of many participants')
+    parser.add_argument('--participants', type=int, default=50)
+    parser.add_argument('--days', type=int, default=14, help='days in the range')
+    parser.add_argument('--events', type=int, default=1, help='events per day and participant')
+    parser.add_argument('--meetings', type=int, default=0, help='meetings per day and participant')
+    parser.add_argument('--repeat', type=int, default=20, help='runs per method')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    
+    database_dir = tempfile.mkdtemp(prefix='calendar-bench-')
+    os.environ.setdefault('DATABASE_URL', f'sqlite:///{os.path.join(database_dir, "bench.db")}')
+    
+    from app import app
+    from models.database import db
+    from models.event import Event
+    from models.meeting import Meeting
+    from models.schedule import Schedule
+    from models.user import User
+    from services.availability import find_common_slots
+    
+    rng = random.Random(args.seed)
+    first_day = date(2030, 1, 7)
+    last_day = first_day + timedelta(days=args.days - 1)
+    
+    with app.app_context():
+        schedules = seed(
+            db, Event, Meeting, Schedule, User, args.participants, first_day, args.days,
+            args.events, args.meetings, rng
+        )
+        print(f'{args.participants} participants over {args.days} days, '
+              f'{args.events} events and {args.meetings} meetings per day each')
+        
+        def cold(run):
+            versions = {schedule.user_id: -1 - run for schedule in schedules}
+            return find_common_slots(schedules, versions, first_day, last_day, 30, 15, 10)
+        
+        def warm(run):
+            versions = {schedule.user_id: 0 for schedule in schedules}
+            return find_common_slots(schedules, versions, first_day, last_day, 30, 15, 10)
+        
+        measure('cold', cold, args.repeat)
+        warm(0)
+        slots = measure('warm', warm, args.repeat)
+        print(f'{len(slots)} common slots, the first at {slots[0][0] if slots else None}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""Compare a materialized list read with the streaming /export
+
+Run from the calendar-app directory:
+
+    python benchmarks/bench_export.py --events 100000 --meetings 20000 --tasks 20000
+
+Seeds one user with entries spread over five years, then reads all of them:
+
+  list    every row at once with query.all(), encoded in one piece, what
+          calling the list endpoints comes down to
+  ndjson  export_calendar() streamed chunk by chunk, and the same for csv
+  ics     and ics
+
+Reports the time to the first chunk, the total time, the bytes produced and
+the peak memory allocated by Python while producing them (tracemalloc, in a
+separate run so tracing does not skew the times). The app uses a throwaway
+SQLite database unless DATABASE_URL is set.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def seed(db, Event, Meeting, Task, User, counts, rng):
+    """Create one user with the given numbers of events, meetings and tasks and return its id"""
+    user = User(email='bench@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+    
+    first_day = datetime(2026, 1, 1)
+    minutes = 5 * 365 * 24 * 60
+    
+    def moment():
+        return first_day + timedelta(minutes=rng.randrange(minutes // 15) * 15)
+    
+    def rows(count, build):
+        for i in range(count):
+            yield dict(build(i, moment()), user_id=user.id, source='local', created_at=first_day, updated_at=first_day)
+    
+    builders = (
+        (Event, counts[0], lambda i, start: {
+            'title': f'Event {i}', 'description': 'Planning, review; notes', 'start_date': start,
+            'end_date': start + timedelta(minutes=60), 'location': 'Room 1'
+        }),
+        (Meeting, counts[1], lambda i, start: {
+            'title': f'Meeting {i}', 'description': '', 'date': start, 'duration': 30, 'platform': 'zoom',
+            'meeting_link': f'https://us02web.zoom.us/j/{i}', 'participants': 'a@example.com,b@example.com'
+        }),
+        (Task, counts[2], lambda i, start: {
+            'title': f'Task {i}', 'description': '', 'date': start, 'completed': i % 2 == 0, 'assigned_to': ''
+        })
+    )
+    
+    for model, count, build in builders:
+        batch = []
+        for row in rows(count, build):
+            batch.append(row)
+            if len(batch) == 10000:
+                db.session.execute(model.__table__.insert(), batch)
+                batch = []
+        if batch:
+            db.session.execute(model.__table__.insert(), batch)
+    
+    db.session.commit()
+    return user.id
+
+def run(produce):
+    """Consume a producer of byte chunks; return (seconds to first chunk, total seconds, bytes)"""
+    started = time.perf_counter()
+    first = None
+    size = 0
+    
+    for chunk in produce():
+        if first is None:
+            first = time.perf_counter() - started
+        size += len(chunk)
+    
+    return first, time.perf_counter() - started, size
+
+def peak_memory(produce):
+    """Return the peak megabytes Python allocated while consuming a producer"""
+    tracemalloc.start()
+    for _ in produce():
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 2 ** 20
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark streaming calendar exports')
+    parser.add_argument('--events', type=int, default=100000)
+    parser.add_argument('--meetings', type=int, default=20000)
+    parser.add_argument('--tasks', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    
+    database_dir = tempfile.mkdtemp(prefix='calendar-bench-')
+    os.environ.setdefault('DATABASE_URL', f'sqlite:///{os.path.join(database_dir, "bench.db")}')
+    
+    from app import app
+    from models.database import db
+    from models.event import Event
+    from models.meeting import Meeting
+    from models.task import Task
+    from models.user import User
+    from services.serialization import LIST_FIELDS, rows_to_dicts, dumps
+    from services.export_service import export_calendar
+    
+    with app.app_context():
+        user_id = seed(db, Event, Meeting, Task, User, (args.events, args.meetings, args.tasks), random.Random(args.seed))
+        print(f'{args.events:,} events, {args.meetings:,} meetings and {args.tasks:,} tasks over five years')
+        
+        def materialized():
+            rows = []
+            for model in (Event, Meeting, Task):
+                fields = LIST_FIELDS[model]
+                query = db.session.query(*[getattr(model, field) for field in fields]).filter(model.user_id == user_id)
+                rows += rows_to_dicts(query.all(), fields)
+            yield dumps(rows)
+        
+        producers = [('list', materialized)] + [
+            (export_format, lambda export_format=export_format: export_calendar(user_id, export_format))
+            for export_format in ('ndjson', 'csv', 'ics')
+        ]
+        
+        for label, produce in producers:
+            first, total, size = run(produce)
+            print(f'{label:<7} first chunk {first * 1000:8.1f} ms  total {total:6.2f} s  '
+                  f'{size / 2 ** 20:6.1f} MB  peak memory {peak_memory(produce):6.1f} MB')
+
+if __name__ == '__main__':
+    main()
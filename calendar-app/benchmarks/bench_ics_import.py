@@ -0,0 +1,100 @@
+"""Import a large generated .ics file through the streaming importer
+
+Run from the calendar-app directory:
+
+    python benchmarks/bench_ics_import.py --events 100000
+
+Writes an iCalendar file of --events VEVENTs to a temporary directory, a
+tenth of them with a Zoom or Teams link, some with alarms, attendees and
+folded descriptions. It is then imported twice for one user from an open
+file, as an upload is read:
+
+  first   every entry is inserted
+  second  every entry is matched by UID and left unchanged
+
+Reports the counts, the time, the events per second and the growth of the
+peak resident set size across each import, which stays flat whatever the
+file size. The app uses a throwaway SQLite database unless DATABASE_URL is
+set.
+"""
+import argparse
+import os
+import random
+import resource
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LINKS = ('https://us02web.zoom.us/j/{}', 'https://teams.microsoft.com/l/meetup-join/{}')
+
+def write_calendar(path, count, rng):
+    """Write an iCalendar file of count events"""
+    first_day = datetime(2029, 1, 1)
+    
+    with open(path, 'w', newline='') as out:
+        out.write('BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//bench//EN\r\n')
+        for i in range(count):
+            start = first_day + timedelta(minutes=rng.randrange(3 * 365 * 24 * 4) * 15)
+            lines = [
+                'BEGIN:VEVENT',
+                f'UID:event-{i}@bench.example.com',
+                f'DTSTAMP:{start:%Y%m%dT%H%M%S}Z',
+                f'DTSTART;TZID=Europe/Berlin:{start:%Y%m%dT%H%M%S}',
+                f'DTEND;TZID=Europe/Berlin:{start + timedelta(minutes=rng.choice((30, 60, 90))):%Y%m%dT%H%M%S}',
+                f'SUMMARY:Event {i}',
+                'DESCRIPTION:Agenda\\n1. Status\\n2. Next steps\\, owners and a description long enough to be fol',
+                ' ded onto a second line'
+            ]
+            if i % 10 == 0:
+                lines.append(f'LOCATION:{rng.choice(LINKS).format(rng.randrange(10 ** 9))}')
+                lines += [f'ATTENDEE;CN=Person {j}:mailto:person{j}@example.com' for j in range(3)]
+            if i % 4 == 0:
+                lines += ['BEGIN:VALARM', 'ACTION:DISPLAY', 'TRIGGER:-PT15M', 'DESCRIPTION:Reminder', 'END:VALARM']
+            lines.append('END:VEVENT')
+            out.write('\r\n'.join(lines) + '\r\n')
+        out.write('END:VCALENDAR\r\n')
+
+def peak_rss_mb():
+    """Return the peak resident set size of the process in megabytes (Linux reports KiB)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the streaming .ics import')
+    parser.add_argument('--events', type=int, default=100000, help='events in the file')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    
+    work_dir = tempfile.mkdtemp(prefix='calendar-bench-')
+    os.environ.setdefault('DATABASE_URL', f'sqlite:///{os.path.join(work_dir, "bench.db")}')
+    
+    from app import app
+    from models.database import db
+    from models.user import User
+    from services.ics_service import import_ics
+    
+    path = os.path.join(work_dir, 'calendar.ics')
+    write_calendar(path, args.events, random.Random(args.seed))
+    print(f'{args.events:,} events, {os.path.getsize(path) / 2 ** 20:.1f} MB file')
+    
+    # The generated file may go past the limits put on uploads
+    app.config['ICS_IMPORT_MAX_BYTES'] = os.path.getsize(path)
+    app.config['ICS_IMPORT_MAX_EVENTS'] = args.events
+    
+    with app.app_context():
+        user = User(email='bench@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        
+        for label in ('first', 'second'):
+            before = peak_rss_mb()
+            with open(path, 'rb') as stream:
+                counts = import_ics(user.id, stream)
+            
+            print(f'{label:<7} {counts["seconds"]:7.2f} s  {counts["events_per_second"]:7,} events/s  '
+                  f'peak RSS +{peak_rss_mb() - before:.1f} MB  inserted {counts["inserted"]:,}  '
+                  f'updated {counts["updated"]:,}  unchanged {counts["unchanged"]:,}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""Micro-benchmark of provider event normalization on large synthetic payloads
+
+Run from the calendar-app directory:
+
+    python benchmarks/bench_normalization.py --events 100000
+
+Prints the per-event cost of normalizing Google and Graph pages, next to the
+per-event regex and fromisoformat approach the services used before.
+"""
+import argparse
+import gc
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.normalization import normalize_gmail_event, normalize_outlook_event, parse_datetime
+
+def make_gmail_events(count, seed=0):
+    """Build Google Calendar events with a mix of plain, conference and linked entries"""
+    rng = random.Random(seed)
+    base = datetime(2030, 1, 1)
+    events = []
+    
+    for i in range(count):
+        start = base + timedelta(minutes=30 * i)
+        event = {
+            'id': f'g{i}',
+            'status': 'confirmed',
+            'summary': f'Event {i}',
+            'description': 'Agenda: ' + 'lorem ipsum ' * rng.randint(5, 40),
+            'location': 'Room 1',
+            'attendees': [{'email': f'user{j}@example.com'} for j in range(rng.randint(0, 8))]
+        }
+        
+        kind = i % 4
+        if kind == 0:
+            event['start'] = {'date': start.date().isoformat()}
+            event['end'] = {'date': (start + timedelta(days=1)).date().isoformat()}
+        else:
+            event['start'] = {'dateTime': start.isoformat() + 'Z'}
+            event['end'] = {'dateTime': (start + timedelta(minutes=45)).isoformat() + '+01:00'}
+        
+        if kind == 1:
+            event['description'] += ' join https://us02web.zoom.us/j/123456789?pwd=abc'
+        elif kind == 2:
+            event['description'] += ' join https://teams.microsoft.com/l/meetup-join/19-meeting'
+        elif kind == 3:
+            event['conferenceData'] = {'entryPoints': [{'entryPointType': 'video', 'uri': 'https://meet.google.com/abc'}]}
+        
+        if i % 50 == 0:
+            event = {'id': f'g{i}', 'status': 'cancelled'}
+        events.append(event)
+    
+    return events
+
+def make_outlook_events(count, seed=0):
+    """Build Microsoft Graph events with Graph's seven digit fractional seconds"""
+    rng = random.Random(seed)
+    base = datetime(2030, 1, 1)
+    events = []
+    
+    for i in range(count):
+        start = base + timedelta(minutes=30 * i)
+        event = {
+            'id': f'o{i}',
+            'subject': f'Event {i}',
+            'bodyPreview': 'lorem ipsum ' * rng.randint(5, 20),
+            'start': {'dateTime': start.isoformat() + '.0000000', 'timeZone': 'UTC'},
+            'end': {'dateTime': (start + timedelta(minutes=45)).isoformat() + '.0000000', 'timeZone': 'UTC'},
+            'location': {'displayName': 'Room 1'}
+        }
+        
+        if i % 3 == 0:
+            event['onlineMeeting'] = {'joinUrl': 'https://teams.microsoft.com/l/meetup-join/19-meeting'}
+            event['attendees'] = [
+                {'emailAddress': {'address': f'user{j}@example.com'}} for j in range(rng.randint(1, 8))
+            ]
+        
+        if i % 50 == 0:
+            event = {'id': f'o{i}', '@removed': {'reason': 'deleted'}}
+        events.append(event)
+    
+    return events
+
+def legacy_gmail_event(event):
+    """The previous Google transform: patterns compiled per event and two searches"""
+    if event.get('status') == 'cancelled':
+        return {'id': event.get('id'), 'deleted': True}
+    
+    is_meeting = 'conferenceData' in event
+    meeting_link = ''
+    if is_meeting:
+        for entry_point in event.get('conferenceData', {}).get('entryPoints', []):
+            if entry_point.get('entryPointType') == 'video':
+                meeting_link = entry_point.get('uri', '')
+                break
+    
+    if not meeting_link and event.get('description'):
+        zoom_match = re.search(r'https://[a-zA-Z0-9.-]+\.zoom\.us/[a-zA-Z0-9/?.=&-]+', event.get('description', ''))
+        teams_match = re.search(r'https://teams\.microsoft\.com/[a-zA-Z0-9/?.=&-]+', event.get('description', ''))
+        if zoom_match:
+            meeting_link = zoom_match.group(0)
+            is_meeting = True
+        elif teams_match:
+            meeting_link = teams_match.group(0)
+            is_meeting = True
+    
+    event_dict = {
+        'id': event.get('id'),
+        'summary': event.get('summary', 'No Subject'),
+        'description': event.get('description', ''),
+        'start_time': event.get('start', {}).get('dateTime', event.get('start', {}).get('date')),
+        'end_time': event.get('end', {}).get('dateTime', event.get('end', {}).get('date')),
+        'location': event.get('location', ''),
+        'is_meeting': is_meeting,
+        'meeting_link': meeting_link
+    }
+    
+    try:
+        start_time = datetime.fromisoformat(event_dict['start_time'].replace('Z', '+00:00'))
+        end_time = datetime.fromisoformat(event_dict['end_time'].replace('Z', '+00:00'))
+        event_dict['duration'] = int((end_time - start_time).total_seconds() / 60)
+    except:
+        event_dict['duration'] = 30
+    
+    event_dict['attendees'] = ','.join(a.get('email') for a in event.get('attendees', []) if a.get('email'))
+    
+    return event_dict
+
+def legacy_parse(value):
+    """The previous timestamp parse used when storing synced entries"""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def legacy_gmail_pipeline(event):
+    """The previous Google transform followed by the parse of its start and end when stored"""
+    event_dict = legacy_gmail_event(event)
+    if not event_dict.get('deleted'):
+        legacy_parse(event_dict['start_time'])
+        legacy_parse(event_dict['end_time'])
+    return event_dict
+
+def measure(label, function, items, repeat):
+    """Run function over every item, keeping the best of repeat passes"""
+    best = None
+    gc.disable()
+    
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for item in items:
+            function(item)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    
+    gc.enable()
+    print(f'{label:<34} {best * 1e6 / len(items):8.2f} us/event  {len(items) / best:12,.0f} events/s')
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark provider event normalization')
+    parser.add_argument('--events', type=int, default=100000, help='synthetic events per payload')
+    parser.add_argument('--repeat', type=int, default=3, help='passes per measurement, best is kept')
+    args = parser.parse_args()
+    
+    gmail_events = make_gmail_events(args.events)
+    outlook_events = make_outlook_events(args.events)
+    timestamps = [event['end']['dateTime'] for event in gmail_events if 'dateTime' in event.get('end', {})]
+    
+    print(f'{args.events:,} events per payload, best of {args.repeat}')
+    measure('gmail legacy transform + parse', legacy_gmail_pipeline, gmail_events, args.repeat)
+    measure('gmail normalize_gmail_event', normalize_gmail_event, gmail_events, args.repeat)
+    measure('outlook normalize_outlook_event', normalize_outlook_event, outlook_events, args.repeat)
+    measure('timestamp legacy parse', legacy_parse, timestamps, args.repeat)
+    measure('timestamp parse_datetime', parse_datetime, timestamps, args.repeat)
+
+if __name__ == '__main__':
+    main()
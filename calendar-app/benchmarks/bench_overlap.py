@@ -0,0 +1,142 @@
+"""Compare range queries over one user's events on a large calendar
+
+Run from the calendar-app directory:
+
+    python benchmarks/bench_overlap.py --events 100000 --queries 200
+
+Seeds one user with --events events spread over five years: mostly meetings
+of half an hour to two hours, a few multi-day events and a handful spanning
+months. Random week and month windows are then answered three ways:
+
+  containment  start_date >= start AND end_date <= end, what GET /events used
+               to do; it misses events crossing either end of the window
+  scan         start_date < end AND end_date > start on the (user_id,
+               start_date) index, which reads every event starting before end
+  buckets      events_query(), the overlap query through event_time_buckets
+
+Reported per method and window: p50 and p95 latency and rows returned. The
+bucket results are checked against the scan for every window. Indexing cost
+is reported as bucket rows per event and the time to build them.
+The app uses a throwaway SQLite database unless DATABASE_URL is set.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def percentile(values, fraction):
+    """Return the value below which the given fraction of the sorted values fall"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def random_duration(rng):
+    """Draw an event length: mostly meetings, some multi-day events, rare long ones"""
+    roll = rng.random()
+    if roll < 0.005:
+        return timedelta(days=rng.randint(63, 180))
+    if roll < 0.05:
+        return timedelta(days=rng.randint(1, 5))
+    return timedelta(minutes=rng.choice((30, 45, 60, 90, 120)))
+
+def seed(db, Event, User, count, first_day, days, rng):
+    """Create one user holding count events and return its id"""
+    user = User(email='bench@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+    
+    rows = []
+    for i in range(count):
+        start = first_day + timedelta(minutes=rng.randrange(days * 24 * 4) * 15)
+        rows.append({
+            'title': f'Event {i}',
+            'start_date': start,
+            'end_date': start + random_duration(rng),
+            'source': 'local',
+            'user_id': user.id,
+            'created_at': first_day,
+            'updated_at': first_day
+        })
+        if len(rows) == 10000:
+            db.session.execute(Event.__table__.insert(), rows)
+            rows = []
+    
+    if rows:
+        db.session.execute(Event.__table__.insert(), rows)
+    db.session.commit()
+    return user.id
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark event range queries')
+    parser.add_argument('--events', type=int, default=100000, help='events of the user')
+    parser.add_argument('--queries', type=int, default=200, help='random windows per window size')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    
+    database_dir = tempfile.mkdtemp(prefix='calendar-bench-')
+    os.environ.setdefault('DATABASE_URL', f'sqlite:///{os.path.join(database_dir, "bench.db")}')
+    
+    from app import app
+    from models.database import db
+    from models.event import Event
+    from models.event_time_bucket import EventTimeBucket
+    from models.user import User
+    from routes.events import events_query
+    from services.event_buckets import rebuild_event_buckets
+    
+    rng = random.Random(args.seed)
+    first_day = datetime(2028, 1, 1)
+    days = 5 * 365
+    
+    with app.app_context():
+        user_id = seed(db, Event, User, args.events, first_day, days, rng)
+        
+        started = time.perf_counter()
+        rebuild_event_buckets()
+        build_seconds = time.perf_counter() - started
+        bucket_rows = db.session.query(EventTimeBucket).count()
+        print(f'{args.events:,} events, {bucket_rows:,} bucket rows ({bucket_rows / args.events:.2f} per event), '
+              f'built in {build_seconds:.2f} s')
+        
+        def containment(start, end):
+            return Event.query.with_entities(Event.id).filter(
+                Event.user_id == user_id, Event.start_date >= start, Event.end_date <= end
+            ).all()
+        
+        def scan(start, end):
+            return Event.query.with_entities(Event.id).filter(
+                Event.user_id == user_id, Event.start_date < end, Event.end_date > start
+            ).all()
+        
+        def buckets(start, end):
+            return events_query(user_id, start, end).with_entities(Event.id).all()
+        
+        methods = (('containment', containment), ('scan', scan), ('buckets', buckets))
+        
+        for label, length in (('week', timedelta(days=7)), ('month', timedelta(days=30))):
+            windows = [first_day + timedelta(days=rng.randrange(days - length.days)) for _ in range(args.queries)]
+            
+            for name, method in methods:
+                timings = []
+                rows = 0
+                for start in windows:
+                    began = time.perf_counter()
+                    result = method(start, start + length)
+                    timings.append(time.perf_counter() - began)
+                    rows += len(result)
+                
+                print(f'{label:<6} {name:<12} p50 {percentile(timings, 0.5) * 1000:7.2f} ms  '
+                      f'p95 {percentile(timings, 0.95) * 1000:7.2f} ms  {rows / len(windows):8.1f} rows')
+            
+            mismatches = sum(
+                set(buckets(start, start + length)) != set(scan(start, start + length)) for start in windows
+            )
+            print(f'{label:<6} buckets match the scan on {len(windows) - mismatches}/{len(windows)} windows')
+
+if __name__ == '__main__':
+    main()
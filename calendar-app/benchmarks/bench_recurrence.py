@@ -0,0 +1,142 @@
+"""Compare recurring series stored as RRULE masters against materialized occurrences
+
+Run from the calendar-app directory:
+
+    python benchmarks/bench_recurrence.py --series 2000 --queries 200
+
+Seeds two users with the same --series weekly and daily series over two
+years: one as a single master row per series, the other as one row per
+occurrence, the way series had to be stored before. Random week and month
+windows are then answered two ways:
+
+  materialized  events_query() over the user holding every occurrence
+  lazy          events_query(series=True) plus occurrence_rows(), expanding
+                the masters reaching the window; run once with the range
+                cache off (cold) and once with it warm
+
+Reported: rows stored per user, and per method and window p50 and p95
+latency and occurrences returned. The lazy results are checked against
+the materialized ones for every window.
+The app uses a throwaway SQLite database unless DATABASE_URL is set.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def percentile(values, fraction):
+    """Return the value below which the given fraction of the sorted values fall"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def seed(db, Event, User, count, first_day, days, rng):
+    """Create the master user and the materialized user, return their ids"""
+    from services.event_buckets import rebuild_event_buckets
+    from services.recurrence import recurrence_columns, build_rule
+    
+    masters = User(email='masters@example.com', password_hash='x')
+    materialized = User(email='materialized@example.com', password_hash='x')
+    db.session.add_all([masters, materialized])
+    db.session.commit()
+    
+    series = []
+    occurrences = []
+    for i in range(count):
+        start = first_day + timedelta(days=rng.randrange(days // 2), minutes=rng.randrange(9 * 4, 17 * 4) * 15)
+        length = timedelta(minutes=rng.choice((15, 30, 60)))
+        rrule = rng.choice(('FREQ=WEEKLY', 'FREQ=WEEKLY;BYDAY=MO,WE,FR', 'FREQ=DAILY;INTERVAL=2'))
+        rrule += f';UNTIL={(first_day + timedelta(days=days)).strftime("%Y%m%dT000000Z")}'
+        row = {
+            'title': f'Series {i}',
+            'start_date': start,
+            'end_date': start + length,
+            'source': 'local',
+            'created_at': first_day,
+            'updated_at': first_day
+        }
+        columns = recurrence_columns(start, length, rrule)
+        series.append(dict(row, user_id=masters.id, **columns))
+        
+        for occurrence in build_rule(columns['rrule'], start):
+            occurrence = occurrence.replace(tzinfo=None)
+            occurrences.append(dict(row, user_id=materialized.id, start_date=occurrence, end_date=occurrence + length))
+    
+    for rows in (series, occurrences):
+        for offset in range(0, len(rows), 10000):
+            db.session.execute(Event.__table__.insert(), rows[offset:offset + 10000])
+    db.session.commit()
+    rebuild_event_buckets()
+    
+    print(f'{count:,} series: {len(series):,} master rows against {len(occurrences):,} materialized rows')
+    return masters.id, materialized.id
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark lazy expansion of recurring series')
+    parser.add_argument('--series', type=int, default=2000, help='recurring series of each user')
+    parser.add_argument('--queries', type=int, default=200, help='random windows per window size')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    
+    database_dir = tempfile.mkdtemp(prefix='calendar-bench-')
+    os.environ.setdefault('DATABASE_URL', f'sqlite:///{os.path.join(database_dir, "bench.db")}')
+    
+    from app import app
+    from models.database import db
+    from models.event import Event
+    from models.user import User
+    from routes.events import events_query
+    from services import range_cache
+    from services.recurrence import occurrence_rows
+    
+    rng = random.Random(args.seed)
+    first_day = datetime(2028, 1, 1)
+    days = 2 * 365
+    names = ('id', 'start_date', 'end_date')
+    
+    with app.app_context():
+        masters_id, materialized_id = seed(db, Event, User, args.series, first_day, days, rng)
+        
+        def materialized(start, end):
+            return events_query(materialized_id, start, end).with_entities(Event.start_date, Event.end_date).all()
+        
+        def lazy(start, end):
+            query = events_query(masters_id, start, end, series=True)
+            return [(row.start_date, row.end_date) for row in occurrence_rows(Event, query, names, start, end)]
+        
+        for label, length in (('week', timedelta(days=7)), ('month', timedelta(days=30))):
+            windows = [first_day + timedelta(days=rng.randrange(days - length.days)) for _ in range(args.queries)]
+            
+            for name, method, backend in (('materialized', materialized, ''), ('lazy cold', lazy, ''),
+                                          ('lazy warm', lazy, 'services.range_cache.MemoryBackend')):
+                # A fresh cache per run, large enough to hold every expansion
+                app.config['RANGE_CACHE_BACKEND'] = backend
+                app.config['RANGE_CACHE_MAX_ENTRIES'] = args.series * len(windows)
+                range_cache._cache = None
+                if backend:
+                    for start in windows:
+                        method(start, start + length)
+                
+                timings = []
+                rows = 0
+                for start in windows:
+                    began = time.perf_counter()
+                    result = method(start, start + length)
+                    timings.append(time.perf_counter() - began)
+                    rows += len(result)
+                
+                print(f'{label:<6} {name:<13} p50 {percentile(timings, 0.5) * 1000:7.2f} ms  '
+                      f'p95 {percentile(timings, 0.95) * 1000:7.2f} ms  {rows / len(windows):8.1f} occurrences')
+            
+            mismatches = sum(
+                sorted(lazy(start, start + length)) != sorted(materialized(start, start + length)) for start in windows
+            )
+            print(f'{label:<6} lazy expansion matches the materialized rows on {len(windows) - mismatches}/{len(windows)} windows')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+"""Benchmark calendar sync and meeting creation against the fake provider APIs
+
+Run from the calendar-app directory:
+
+    python benchmarks/bench_sync.py --sizes 100 1000 10000 --runs 5
+
+For every calendar size a fresh fake provider server (benchmarks/fake_providers.py)
+is started and the app is pointed at it through PROVIDER_URL_OVERRIDES. Each
+run connects a new user with an expired token, so the token refresh endpoint
+is exercised too, then POSTs /sync/gmail or /sync/outlook and polls the job
+until it finishes. One more sync of the last user measures an incremental
+sync with no changes. Meeting creation POSTs /meetings alternating Zoom and
+Teams, then waits until the worker threads have created every link.
+Reported per scenario: p50 and p95 latency, throughput, SQL queries and
+provider requests per run.
+
+The app uses a throwaway SQLite database unless DATABASE_URL is set.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_providers import FakeProviders
+
+class QueryCounter:
+    """Count SQL statements per thread group (MainThread, sync-worker, ...)"""
+    
+    def __init__(self, engine):
+        from sqlalchemy import event
+        
+        self.counts = {}
+        self.lock = threading.Lock()
+        event.listen(engine, 'before_cursor_execute', self._count)
+    
+    def _count(self, *args):
+        group = threading.current_thread().name.split('_')[0]
+        with self.lock:
+            self.counts[group] = self.counts.get(group, 0) + 1
+    
+    def get(self, group):
+        with self.lock:
+            return self.counts.get(group, 0)
+
+def percentile(values, fraction):
+    """Return the value below which the given fraction of the sorted values fall"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def expired_token():
+    """Token JSON that forces a refresh against the fake token endpoint"""
+    return json.dumps({'access_token': 'stale', 'refresh_token': 'fake-refresh', 'expires_at': int(time.time()) - 60})
+
+def valid_token():
+    return json.dumps({'access_token': 'fake', 'expires_at': int(time.time()) + 3600})
+
+class Bench:
+    def __init__(self, app, poll_interval):
+        from models.database import db
+        
+        self.app = app
+        self.client = app.test_client()
+        self.poll_interval = poll_interval
+        self.user_count = 0
+        
+        with app.app_context():
+            self.counter = QueryCounter(db.engine)
+    
+    def create_user(self, **tokens):
+        """Create a user and return (user_id, auth headers)"""
+        from flask_jwt_extended import create_access_token
+        from models.database import db
+        from models.user import User
+        
+        self.user_count += 1
+        with self.app.app_context():
+            user = User(email=f'bench{self.user_count}@example.com', password_hash='x', **tokens)
+            db.session.add(user)
+            db.session.commit()
+            token = create_access_token(identity=user.id)
+            return user.id, {'Authorization': f'Bearer {token}'}
+    
+    def sync(self, provider, headers):
+        """Trigger a sync and wait for its job; return (seconds, queries, job)"""
+        main_before = self.counter.get('MainThread')
+        worker_before = self.counter.get('sync-worker')
+        started = time.perf_counter()
+        
+        response = self.client.post(f'/sync/{provider}', headers=headers)
+        if response.status_code != 202:
+            raise RuntimeError(f'/sync/{provider} answered {response.status_code}: {response.get_json()}')
+        status_url = response.get_json()['status_url']
+        main_queries = self.counter.get('MainThread') - main_before
+        
+        while True:
+            job = self.client.get(status_url, headers=headers).get_json()
+            if job['status'] not in ('queued', 'running'):
+                break
+            time.sleep(self.poll_interval)
+        
+        elapsed = time.perf_counter() - started
+        # Status polls are not part of the sync, only the enqueue and the worker count
+        queries = main_queries + self.counter.get('sync-worker') - worker_before
+        return elapsed, queries, job
+    
+    def bench_sync(self, fake, provider, size, runs):
+        token_column = f'{provider}_token'
+        latencies = []
+        queries = []
+        requests_made = []
+        errors = 0
+        headers = None
+        
+        for _ in range(runs):
+            _, headers = self.create_user(**{token_column: expired_token()})
+            fake.reset_stats()
+            
+            elapsed, query_count, job = self.sync(provider, headers)
+            # Failed jobs and partial fetches, e.g. under injected errors
+            if job['status'] != 'succeeded' or job['counts'].get('inserted') != size:
+                errors += 1
+            
+            latencies.append(elapsed)
+            queries.append(query_count)
+            requests_made.append(sum(fake.stats()['requests'].values()))
+        
+        rows = [self._row(f'sync {provider} full', size, latencies, queries, requests_made, size, errors)]
+        
+        # The last user now holds a cursor; nothing changed since
+        fake.reset_stats()
+        elapsed, query_count, job = self.sync(provider, headers)
+        rows.append(self._row(f'sync {provider} incremental', size, [elapsed], [query_count],
+                              [sum(fake.stats()['requests'].values())], size, int(job['status'] != 'succeeded')))
+        return rows
+    
+    def bench_meetings(self, fake, count):
+        """Create meetings, then wait for the worker threads to create their links; return both rows"""
+        from models.database import db
+        from models.meeting import Meeting
+        from services.link_provisioning import LinkProvisioner
+        
+        user_id, headers = self.create_user(zoom_token=valid_token(), teams_token=valid_token())
+        fake.reset_stats()
+        latencies = []
+        queries = []
+        errors = 0
+        start = datetime.utcnow() + timedelta(days=1)
+        first_created = time.perf_counter()
+        
+        for i in range(count):
+            body = {
+                'title': f'Meeting {i}',
+                'date': (start + timedelta(minutes=30 * i)).isoformat(),
+                'duration': 30,
+                'platform': 'zoom' if i % 2 == 0 else 'teams'
+            }
+            before = self.counter.get('MainThread')
+            started = time.perf_counter()
+            response = self.client.post('/meetings', headers=headers, json=body)
+            latencies.append(time.perf_counter() - started)
+            queries.append(self.counter.get('MainThread') - before)
+            
+            # The link is created after the response, so the provider is not called yet
+            if response.status_code != 201 or response.get_json().get('link_status') != 'pending':
+                errors += 1
+        
+        # Provider requests all come from the worker threads and count toward the links
+        rows = [self._row('create meeting', count, latencies, queries, [0], 1, errors)]
+        
+        # Links count as provisioned once none is pending; the loop of
+        # scheduler.py runs here too, retrying the failed attempts
+        provisioner = LinkProvisioner(self.app, interval=self.poll_interval, workers=4)
+        with self.app.app_context():
+            while True:
+                statuses = dict(db.session.query(Meeting.link_status, db.func.count()).filter(
+                    Meeting.user_id == user_id
+                ).group_by(Meeting.link_status).all())
+                if not statuses.get('pending'):
+                    break
+                provisioner.run_once()
+                time.sleep(self.poll_interval)
+        provisioner.executor.shutdown()
+        
+        rows.append(self._row('provision meeting links', count, [time.perf_counter() - first_created], [0],
+                              [sum(fake.stats()['requests'].values())], count,
+                              statuses.get('failed', 0)))
+        return rows
+    
+    @staticmethod
+    def _row(scenario, size, latencies, queries, requests_made, items, errors):
+        median = percentile(latencies, 0.5)
+        return {
+            'scenario': scenario,
+            'size': size,
+            'runs': len(latencies),
+            'errors': errors,
+            'p50_ms': round(median * 1000, 1),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 1),
+            'items_per_s': round(items / median) if median else 0,
+            'queries': round(sum(queries) / len(queries), 1),
+            'provider_requests': round(sum(requests_made) / len(requests_made), 1)
+        }
+
+def print_table(rows):
+    columns = ('scenario', 'size', 'runs', 'errors', 'p50_ms', 'p95_ms', 'items_per_s', 'queries', 'provider_requests')
+    widths = {column: max(len(column), *(len(str(row[column])) for row in rows)) for column in columns}
+    
+    print('  '.join(column.ljust(widths[column]) for column in columns))
+    for row in rows:
+        print('  '.join(str(row[column]).ljust(widths[column]) for column in columns))
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark syncs and meeting creation against fake providers')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000], help='events per calendar')
+    parser.add_argument('--runs', type=int, default=5, help='full syncs per provider and size')
+    parser.add_argument('--max-meetings', type=int, default=1000, help='meetings created per size at most')
+    parser.add_argument('--page-size', type=int, default=250, help='largest page the fake providers return')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds the fake providers add per request')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of provider requests failing with 503')
+    parser.add_argument('--rate-limit', type=int, help='provider requests per second before 429')
+    parser.add_argument('--poll-interval', type=float, default=0.005, help='seconds between job status polls')
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    args = parser.parse_args()
+    
+    # The app creates its tables on import, so the database must be chosen first
+    database_dir = tempfile.mkdtemp(prefix='calendar-bench-')
+    os.environ.setdefault('DATABASE_URL', f'sqlite:///{os.path.join(database_dir, "bench.db")}')
+    from app import app
+    
+    # Retries after injected failures should not dominate the timings
+    app.config['PROVIDER_HTTP_BACKOFF_FACTOR'] = 0.05
+    app.config['LINK_RETRY_DELAY'] = 0
+    bench = Bench(app, args.poll_interval)
+    rows = []
+    
+    for size in args.sizes:
+        fake = FakeProviders(events=size, page_size=args.page_size, latency=args.latency,
+                             error_rate=args.error_rate, rate_limit=args.rate_limit).start()
+        app.config['PROVIDER_URL_OVERRIDES'] = fake.overrides()
+        
+        try:
+            rows.extend(bench.bench_sync(fake, 'gmail', size, args.runs))
+            rows.extend(bench.bench_sync(fake, 'outlook', size, args.runs))
+            rows.extend(bench.bench_meetings(fake, min(size, args.max_meetings)))
+        finally:
+            fake.stop()
+        
+        if not args.json:
+            print_table(rows[-5:])
+            print()
+    
+    if args.json:
+        print(json.dumps(rows, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,299 @@
+"""Local stand-in for the provider APIs the services call
+
+One threaded HTTP server answers every endpoint the services use:
+
+    GET  /calendar/v3/calendars/primary/events   Google events list
+    POST /token                                  Google OAuth token
+    GET  /v1.0/me/calendarView/delta             Graph calendar view delta
+    POST /v1.0/me/onlineMeetings                 Graph (Teams) meeting creation
+    POST /common/oauth2/v2.0/token               Microsoft OAuth token
+    POST /v2/users/me/meetings                   Zoom meeting creation
+
+Point the app at it with PROVIDER_URL_OVERRIDES (see FakeProviders.overrides).
+Page size, latency, injected 5xx errors and a rate limit answered with 429
+are configurable. Run standalone with:
+
+    python benchmarks/fake_providers.py --port 8900 --events 1000 --latency 0.02
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+# Origins of the real APIs, all answered by the fake server
+PROVIDER_ORIGINS = (
+    'https://www.googleapis.com',
+    'https://oauth2.googleapis.com',
+    'https://graph.microsoft.com',
+    'https://login.microsoftonline.com',
+    'https://api.zoom.us'
+)
+
+def google_event(i, start):
+    """Build the Google Calendar payload of synthetic event i"""
+    event = {
+        'id': f'g{i}',
+        'status': 'confirmed',
+        'summary': f'Event {i}',
+        'description': 'Synthetic event ' * 8,
+        'location': 'Room 1',
+        'start': {'dateTime': start.isoformat() + 'Z'},
+        'end': {'dateTime': (start + timedelta(minutes=45)).isoformat() + 'Z'},
+        'attendees': [{'email': f'user{j}@example.com'} for j in range(i % 5)]
+    }
+    
+    if i % 5 == 0:
+        event['description'] += f' https://us02web.zoom.us/j/{i}'
+    
+    return event
+
+def graph_event(i, start):
+    """Build the Microsoft Graph payload of synthetic event i"""
+    event = {
+        'id': f'o{i}',
+        'subject': f'Event {i}',
+        'bodyPreview': 'Synthetic event ' * 8,
+        'start': {'dateTime': start.isoformat() + '.0000000', 'timeZone': 'UTC'},
+        'end': {'dateTime': (start + timedelta(minutes=45)).isoformat() + '.0000000', 'timeZone': 'UTC'},
+        'location': {'displayName': 'Room 1'}
+    }
+    
+    if i % 5 == 0:
+        event['onlineMeeting'] = {'joinUrl': f'https://teams.microsoft.com/l/meetup-join/{i}'}
+        event['attendees'] = [{'emailAddress': {'address': f'user{j}@example.com'}} for j in range(i % 7 + 1)]
+    
+    return event
+
+class FakeProviders:
+    """Threaded HTTP server emulating Google Calendar, Graph, Zoom and the OAuth endpoints
+    
+    Every calendar holds `events` entries spread over the next `window_days`
+    days. A sync token or delta link handed out after a full read reports no
+    changes. Pages hold at most `page_size` entries, or fewer when the client
+    asks for fewer. Each request waits `latency` seconds, fails with a 503
+    with probability `error_rate` and is answered with 429 once more than
+    `rate_limit` requests per second arrive.
+    """
+    
+    def __init__(self, host='127.0.0.1', port=0, events=1000, page_size=250, latency=0.0,
+                 error_rate=0.0, rate_limit=None, window_days=30, seed=0):
+        self.events = events
+        self.page_size = page_size
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = {}  # path -> count
+        self.statuses = {}  # status code -> count
+        self.window = []  # Arrival times within the last second, for the rate limit
+        
+        # Events start an hour from now so they fall inside the app's sync window
+        first = datetime.utcnow().replace(microsecond=0) + timedelta(hours=1)
+        step = (window_days - 1) * 86400 / max(events, 1)
+        self.starts = [first + timedelta(seconds=int(step * i)) for i in range(events)]
+        
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+    
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+    
+    def overrides(self):
+        """Return the PROVIDER_URL_OVERRIDES sending every provider origin here"""
+        return {origin: self.url for origin in PROVIDER_ORIGINS}
+    
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+    
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+    
+    def reset_stats(self):
+        with self.lock:
+            self.requests.clear()
+            self.statuses.clear()
+    
+    def stats(self):
+        with self.lock:
+            return {'requests': dict(self.requests), 'statuses': dict(self.statuses)}
+    
+    def _admit(self, path):
+        """Count a request and decide whether it is rate limited or fails"""
+        now = time.monotonic()
+        
+        with self.lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+            
+            if self.rate_limit:
+                self.window = [arrived for arrived in self.window if now - arrived < 1]
+                if len(self.window) >= self.rate_limit:
+                    return 429
+                self.window.append(now)
+            
+            if self.error_rate and self.random.random() < self.error_rate:
+                return 503
+        
+        return None
+    
+    def _record(self, status):
+        with self.lock:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+    
+    def google_events(self, query):
+        """Answer a Google events list page"""
+        if 'syncToken' in query:
+            return 200, {'items': [], 'nextSyncToken': query['syncToken']}
+        
+        offset = int(query.get('pageToken', 0))
+        size = min(self.page_size, int(query.get('maxResults', self.page_size)))
+        items = [google_event(i, self.starts[i]) for i in range(offset, min(offset + size, self.events))]
+        
+        body = {'items': items}
+        if offset + size < self.events:
+            body['nextPageToken'] = str(offset + size)
+        else:
+            body['nextSyncToken'] = f'sync-{uuid.uuid4().hex}'
+        return 200, body
+    
+    def graph_delta(self, query, prefer):
+        """Answer a Graph calendarView delta page"""
+        if '$deltatoken' in query:
+            return 200, {'value': [], '@odata.deltaLink': f'{self.url}/v1.0/me/calendarView/delta?$deltatoken={query["$deltatoken"]}'}
+        
+        size = self.page_size
+        if prefer and 'odata.maxpagesize=' in prefer:
+            size = min(size, int(prefer.split('odata.maxpagesize=')[1].split(',')[0]))
+        
+        offset = int(query.get('$skiptoken', 0))
+        items = [graph_event(i, self.starts[i]) for i in range(offset, min(offset + size, self.events))]
+        
+        body = {'value': items}
+        if offset + size < self.events:
+            body['@odata.nextLink'] = f'{self.url}/v1.0/me/calendarView/delta?$skiptoken={offset + size}'
+        else:
+            body['@odata.deltaLink'] = f'{self.url}/v1.0/me/calendarView/delta?$deltatoken={uuid.uuid4().hex}'
+        return 200, body
+    
+    def token(self):
+        """Answer an OAuth code exchange or refresh"""
+        return 200, {
+            'access_token': f'fake-{uuid.uuid4().hex}',
+            'refresh_token': 'fake-refresh',
+            'expires_in': 3600,
+            'token_type': 'Bearer'
+        }
+    
+    def zoom_meeting(self, body):
+        meeting_id = self.random.randint(10 ** 9, 10 ** 10)
+        return 201, {
+            'id': meeting_id,
+            'topic': body.get('topic'),
+            'start_time': body.get('start_time'),
+            'duration': body.get('duration'),
+            'join_url': f'https://us02web.zoom.us/j/{meeting_id}',
+            'password': 'fake'
+        }
+    
+    def teams_meeting(self, body):
+        meeting_id = uuid.uuid4().hex
+        return 201, {
+            'id': meeting_id,
+            'subject': body.get('subject'),
+            'startDateTime': body.get('startDateTime'),
+            'endDateTime': body.get('endDateTime'),
+            'joinWebUrl': f'https://teams.microsoft.com/l/meetup-join/{meeting_id}'
+        }
+    
+    def _handler(self):
+        fake = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive, like the real APIs
+            disable_nagle_algorithm = True  # Headers and body go out in separate writes
+            
+            def _respond(self, status, body, headers=None):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+                fake._record(status)
+            
+            def _dispatch(self, method):
+                parts = urlsplit(self.path)
+                query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+                
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length) if length else b''
+                
+                if fake.latency:
+                    time.sleep(fake.latency)
+                
+                failure = fake._admit(parts.path)
+                if failure == 429:
+                    return self._respond(429, {'error': 'rate limited'}, {'Retry-After': '1'})
+                if failure:
+                    return self._respond(failure, {'error': 'injected failure'})
+                
+                if method == 'GET' and parts.path == '/calendar/v3/calendars/primary/events':
+                    return self._respond(*fake.google_events(query))
+                if method == 'GET' and parts.path == '/v1.0/me/calendarView/delta':
+                    return self._respond(*fake.graph_delta(query, self.headers.get('Prefer')))
+                if method == 'POST' and parts.path in ('/token', '/common/oauth2/v2.0/token'):
+                    return self._respond(*fake.token())
+                if method == 'POST' and parts.path == '/v2/users/me/meetings':
+                    return self._respond(*fake.zoom_meeting(json.loads(raw or b'{}')))
+                if method == 'POST' and parts.path == '/v1.0/me/onlineMeetings':
+                    return self._respond(*fake.teams_meeting(json.loads(raw or b'{}')))
+                
+                return self._respond(404, {'error': f'no fake for {method} {parts.path}'})
+            
+            def do_GET(self):
+                self._dispatch('GET')
+            
+            def do_POST(self):
+                self._dispatch('POST')
+            
+            def log_message(self, *args):
+                pass
+        
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve fake provider APIs locally')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--events', type=int, default=1000, help='events per calendar')
+    parser.add_argument('--page-size', type=int, default=250, help='largest page returned')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests failing with 503')
+    parser.add_argument('--rate-limit', type=int, help='requests per second before answering 429')
+    args = parser.parse_args()
+    
+    fake = FakeProviders(args.host, args.port, args.events, args.page_size, args.latency,
+                         args.error_rate, args.rate_limit)
+    print(f'Fake providers on {fake.url}, start the app with:')
+    print('PROVIDER_URL_OVERRIDES=' + ','.join(f'{origin}={target}' for origin, target in fake.overrides().items()))
+    
+    try:
+        fake.server.serve_forever()
+    except KeyboardInterrupt:
+        fake.server.server_close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import sys
+from datetime import datetime, timedelta
+from app import app
+from models.database import db
+from models.event import Event
+from models.meeting import Meeting
+from models.task import Task
+from routes.events import events_query
+from routes.tasks import tasks_query
+from routes.meetings import meetings_query
+from routes.calendar import calendar_query
+from services.migrations import MIGRATIONS, DESTRUCTIVE_MIGRATIONS, pending_migrations, run_migrations
+from services.pagination import page_query
+from services.query_plans import find_table_scans
+from services.sync_scheduler import ACTIVITY_MODELS, last_edits_query
+
+def plan_checks():
+    """Return (name, statement) for the list endpoint, sync lookup and scheduler queries"""
+    start = datetime.utcnow()
+    end = start + timedelta(days=30)
+    
+    return [
+        ('GET /events', events_query(1).statement),
+        ('GET /events?start_date&end_date', events_query(1, start, end).statement),
+        ('GET /events?start_date', events_query(1, start).statement),
+        ('GET /events?end_date', events_query(1, end_date=end).statement),
+        ('GET /events?source', events_query(1, start, end, source='gmail').statement),
+        ('GET /events?limit&cursor', page_query(events_query(1), Event.start_date, Event.id, 100, (start, 1)).statement),
+        ('GET /tasks', tasks_query(1).statement),
+        ('GET /tasks?start_date&end_date', tasks_query(1, start, end).statement),
+        ('GET /tasks?limit&cursor', page_query(tasks_query(1), Task.date, Task.id, 100, (start, 1)).statement),
+        ('GET /meetings', meetings_query(1).statement),
+        ('GET /meetings?start_date&end_date', meetings_query(1, start, end, platform='zoom').statement),
+        ('GET /meetings?limit&cursor', page_query(meetings_query(1), Meeting.date, Meeting.id, 100, (start, 1)).statement),
+        ('GET /calendar?start&end', calendar_query(1, start, end)),
+        ('sync event lookup', db.session.query(Event.id).filter(
+            Event.user_id == 1, Event.source == 'gmail', Event.source_id.in_(['a', 'b'])
+        ).statement),
+        ('sync meeting lookup', db.session.query(Meeting.id).filter(
+            Meeting.user_id == 1, Meeting.source == 'gmail', Meeting.source_id.in_(['a', 'b'])
+        ).statement)
+    ] + [
+        (f'scheduler {model.__tablename__} activity', last_edits_query(model).statement) for model in ACTIVITY_MODELS
+    ]
+
+def check_plans():
+    """EXPLAIN every checked query; return False if any of them scans a table"""
+    ok = True
+    
+    for name, statement in plan_checks():
+        scans = find_table_scans(statement)
+        if scans:
+            ok = False
+            print(f'FAIL {name}: ' + '; '.join(scans))
+        else:
+            print(f'ok   {name}')
+    
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply schema migrations and check query plans')
+    parser.add_argument('--status', action='store_true', help='list migrations and whether they are applied')
+    parser.add_argument('--check-plans', action='store_true', help='fail if a list endpoint query scans a table')
+    parser.add_argument('--apply-destructive', action='store_true',
+                        help='also apply the pending migrations that delete rows')
+    args = parser.parse_args()
+    
+    with app.app_context():
+        # Importing the app applies every migration that keeps the rows; the others only run on request
+        if args.apply_destructive:
+            run_migrations(destructive=True)
+        
+        if args.status:
+            pending = dict(pending_migrations())
+            for version, description, _ in MIGRATIONS:
+                state = 'applied'
+                if version in pending:
+                    state = 'pending (--apply-destructive)' if version in DESTRUCTIVE_MIGRATIONS else 'pending'
+                print(f"{version} {state}  {description}")
+        
+        if args.check_plans and not check_plans():
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,26 @@
+from datetime import datetime
+from models.database import db
+
+class CalendarShare(db.Model):
+    __tablename__ = 'calendar_shares'
+    __table_args__ = (
+        db.UniqueConstraint('owner_id', 'grantee_email'),
+        db.Index('ix_calendar_shares_grantee_owner', 'grantee_email', 'owner_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    grantee_email = db.Column(db.String(120), nullable=False)  # Account allowed to look for slots in the owner's calendar
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Foreign keys
+    owner_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'grantee_email': self.grantee_email,
+            'created_at': self.created_at.isoformat()
+        }
+    
+    def __repr__(self):
+        return f'<CalendarShare {self.owner_id} {self.grantee_email}>'
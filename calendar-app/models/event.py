@@ -3,6 +3,12 @@ from models.database import db
 
 class Event(db.Model):
     __tablename__ = 'events'
+    __table_args__ = (
+        db.Index('ix_events_user_start', 'user_id', 'start_date'),
+        db.Index('uq_events_user_source_source_id', 'user_id', 'source', 'source_id', unique=True),
+        db.Index('ix_events_user_rrule_until', 'user_id', 'rrule_until'),
+        db.Index('ix_events_source_user_updated', 'source', 'user_id', 'updated_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
@@ -10,7 +16,12 @@ class Event(db.Model):
     start_date = db.Column(db.DateTime, nullable=False)
     end_date = db.Column(db.DateTime, nullable=False)
     location = db.Column(db.String(200))
-    source = db.Column(db.String(20), default='local')  # 'local', 'outlook', 'gmail'
+    source = db.Column(db.String(20), default='local')  # 'local', 'outlook', 'gmail', 'ics'
+    source_id = db.Column(db.String(255))  # Provider event id for synced entries
+    rrule = db.Column(db.Text)  # RFC 5545 RRULE of a recurring series, e.g. 'FREQ=WEEKLY;BYDAY=MO'
+    exdates = db.Column(db.Text)  # Comma-separated UTC starts of the occurrences left out
+    rrule_timezone = db.Column(db.String(64))  # Zone whose wall-clock times the series repeats at
+    rrule_until = db.Column(db.DateTime)  # End of the last occurrence, only set on series masters
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -25,6 +36,9 @@ class Event(db.Model):
             'start_date': self.start_date.isoformat(),
             'end_date': self.end_date.isoformat(),
             'location': self.location,
+            'rrule': self.rrule,
+            'exdates': self.exdates,
+            'rrule_timezone': self.rrule_timezone,
             'source': self.source,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
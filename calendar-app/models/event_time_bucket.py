@@ -0,0 +1,15 @@
+from models.database import db
+
+# One row per day an event overlaps, maintained by services/event_buckets.py
+class EventTimeBucket(db.Model):
+    __tablename__ = 'event_time_buckets'
+    __table_args__ = (
+        db.Index('ix_event_time_buckets_event', 'event_id'),
+    )
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    bucket = db.Column(db.Integer, primary_key=True)  # Days since 1970-01-01, or LONG_BUCKET
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id', ondelete='CASCADE'), primary_key=True)
+    
+    def __repr__(self):
+        return f'<EventTimeBucket {self.user_id} {self.bucket} {self.event_id}>'
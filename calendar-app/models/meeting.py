@@ -3,6 +3,13 @@ from models.database import db
 
 class Meeting(db.Model):
     __tablename__ = 'meetings'
+    __table_args__ = (
+        db.Index('ix_meetings_user_date', 'user_id', 'date'),
+        db.Index('uq_meetings_user_source_source_id', 'user_id', 'source', 'source_id', unique=True),
+        db.Index('ix_meetings_user_rrule_until', 'user_id', 'rrule_until'),
+        db.Index('ix_meetings_link_status_retry_at', 'link_status', 'link_retry_at'),
+        db.Index('ix_meetings_source_user_updated', 'source', 'user_id', 'updated_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
@@ -11,8 +18,16 @@ class Meeting(db.Model):
     duration = db.Column(db.Integer, nullable=False)  # Duration in minutes
     platform = db.Column(db.String(20), nullable=False)  # 'zoom', 'teams'
     meeting_link = db.Column(db.String(255))
+    link_status = db.Column(db.String(20), default='ready')  # 'pending' until a worker has created the link, 'ready', 'failed'
+    link_attempts = db.Column(db.Integer, default=0)  # Provisioning attempts that failed so far
+    link_retry_at = db.Column(db.DateTime)  # When a pending link is tried next, held ahead while an attempt runs
     participants = db.Column(db.Text)  # Comma-separated list of email addresses
-    source = db.Column(db.String(20), default='local')  # 'local', 'outlook', 'gmail'
+    source = db.Column(db.String(20), default='local')  # 'local', 'outlook', 'gmail', 'ics'
+    source_id = db.Column(db.String(255))  # Provider event id for synced entries
+    rrule = db.Column(db.Text)  # RFC 5545 RRULE of a recurring series, e.g. 'FREQ=WEEKLY;BYDAY=MO'
+    exdates = db.Column(db.Text)  # Comma-separated UTC starts of the occurrences left out
+    rrule_timezone = db.Column(db.String(64))  # Zone whose wall-clock times the series repeats at
+    rrule_until = db.Column(db.DateTime)  # End of the last occurrence, only set on series masters
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -28,7 +43,11 @@ class Meeting(db.Model):
             'duration': self.duration,
             'platform': self.platform,
             'meeting_link': self.meeting_link,
+            'link_status': self.link_status,
             'participants': self.participants,
+            'rrule': self.rrule,
+            'exdates': self.exdates,
+            'rrule_timezone': self.rrule_timezone,
             'source': self.source,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
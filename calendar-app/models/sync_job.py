@@ -0,0 +1,40 @@
+import json
+from datetime import datetime
+from models.database import db
+
+class SyncJob(db.Model):
+    __tablename__ = 'sync_jobs'
+    __table_args__ = (
+        # NULL never collides, so only one job per user and provider can hold the slot
+        db.Index('uq_sync_jobs_user_provider_active', 'user_id', 'provider', 'active', unique=True),
+    )
+    
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    provider = db.Column(db.String(20), nullable=False)  # 'outlook', 'gmail'
+    status = db.Column(db.String(20), nullable=False, default='queued')  # 'queued', 'running', 'succeeded', 'failed'
+    counts = db.Column(db.Text)  # JSON encoded sync counts, updated as chunks are written
+    error = db.Column(db.Text)
+    active = db.Column(db.Boolean)  # True while queued or running, NULL once finished
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Foreign keys
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'provider': self.provider,
+            'status': self.status,
+            'counts': json.loads(self.counts) if self.counts else {},
+            'error': self.error,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
+    
+    def __repr__(self):
+        return f'<SyncJob {self.id} {self.status}>'
@@ -0,0 +1,30 @@
+from datetime import datetime
+from models.database import db
+
+class SyncState(db.Model):
+    __tablename__ = 'sync_states'
+    __table_args__ = (db.UniqueConstraint('user_id', 'provider'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    provider = db.Column(db.String(20), nullable=False)  # 'outlook', 'gmail'
+    cursor = db.Column(db.Text)  # Google nextSyncToken or Graph deltaLink
+    full_synced_at = db.Column(db.DateTime)
+    last_synced_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Foreign keys
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'provider': self.provider,
+            'full_synced_at': self.full_synced_at.isoformat() if self.full_synced_at else None,
+            'last_synced_at': self.last_synced_at.isoformat() if self.last_synced_at else None,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
+    
+    def __repr__(self):
+        return f'<SyncState {self.user_id} {self.provider}>'
@@ -3,6 +3,11 @@ from models.database import db
 
 class Task(db.Model):
     __tablename__ = 'tasks'
+    __table_args__ = (
+        db.Index('ix_tasks_user_date', 'user_id', 'date'),
+        db.Index('ix_tasks_user_completed_date', 'user_id', 'completed', 'date'),
+        db.Index('ix_tasks_source_user_updated', 'source', 'user_id', 'updated_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
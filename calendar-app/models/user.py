@@ -23,6 +23,9 @@ class User(db.Model):
     events = db.relationship('Event', backref='user', lazy=True, cascade='all, delete-orphan')
     meetings = db.relationship('Meeting', backref='user', lazy=True, cascade='all, delete-orphan')
     schedule = db.relationship('Schedule', backref='user', uselist=False, cascade='all, delete-orphan')
+    sync_states = db.relationship('SyncState', backref='user', lazy=True, cascade='all, delete-orphan')
+    sync_jobs = db.relationship('SyncJob', backref='user', lazy=True, cascade='all, delete-orphan')
+    calendar_shares = db.relationship('CalendarShare', backref='owner', lazy=True, cascade='all, delete-orphan')
     
     def __repr__(self):
         return f'<User {self.email}>'
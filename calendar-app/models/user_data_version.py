@@ -0,0 +1,12 @@
+from datetime import datetime
+from models.database import db
+
+class UserDataVersion(db.Model):
+    __tablename__ = 'user_data_versions'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)  # Bumped by every write to the user's calendar
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<UserDataVersion {self.user_id} {self.version}>'
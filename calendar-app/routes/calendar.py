@@ -0,0 +1,208 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from sqlalchemy import select, union_all, literal, null, type_coerce
+from models.database import db
+from models.task import Task
+from models.event import Event
+from models.meeting import Meeting
+from services.event_buckets import overlap_filter
+from services.recurrence import series_filter, expand_series
+from services.data_versions import versioned
+
+calendar_bp = Blueprint('calendar', __name__)
+
+def _null(type_):
+    """Placeholder for a column another entry type does not have, typed for result processing"""
+    return type_coerce(null(), type_)
+
+def _series_columns(model=None):
+    """Rule columns of series masters, placeholders in the branches of single entries"""
+    if model is None:
+        return (_null(db.Text).label('rrule'), _null(db.Text).label('exdates'), _null(db.String).label('rrule_timezone'))
+    return (model.rrule, model.exdates, model.rrule_timezone)
+
+def _event_columns(entry_type):
+    """Calendar columns of an events branch, tagged with entry_type"""
+    return (
+        literal(entry_type).label('type'),
+        Event.id, Event.title, Event.description,
+        Event.start_date.label('start_at'),
+        Event.end_date.label('end_at'),
+        Event.location,
+        _null(db.Boolean).label('completed'),
+        _null(db.String).label('assigned_to'),
+        _null(db.Integer).label('duration'),
+        _null(db.String).label('platform'),
+        _null(db.String).label('meeting_link'),
+        _null(db.Text).label('participants'),
+        _null(db.String).label('link_status'),
+        Event.source, Event.created_at, Event.updated_at
+    )
+
+def _meeting_columns(entry_type):
+    """Calendar columns of a meetings branch, tagged with entry_type"""
+    return (
+        literal(entry_type).label('type'),
+        Meeting.id, Meeting.title, Meeting.description,
+        Meeting.date.label('start_at'),
+        _null(db.DateTime).label('end_at'),
+        _null(db.String).label('location'),
+        _null(db.Boolean).label('completed'),
+        _null(db.String).label('assigned_to'),
+        Meeting.duration, Meeting.platform, Meeting.meeting_link, Meeting.participants, Meeting.link_status,
+        Meeting.source, Meeting.created_at, Meeting.updated_at
+    )
+
+# Row types calendar_query() returns series masters as, with the model and entry type they expand to
+SERIES_TYPES = {'event_series': (Event, 'event'), 'meeting_series': (Meeting, 'meeting')}
+
+def calendar_query(user_id, start, end):
+    """Build one UNION ALL statement returning every entry of a user in [start, end)
+    
+    Events are included while they overlap the range, found through their
+    time buckets, tasks and meetings when they start in it. Rows share one
+    column layout with a type discriminator and come back sorted by start
+    time. Tasks and meetings are served by their (user_id, start) index.
+    Recurring series come back as one event_series or meeting_series row
+    per master holding its rule, found through the (user_id, rrule_until)
+    index; calendar_rows() expands them.
+    """
+    events = select(*_event_columns('event'), *_series_columns()).where(
+        *overlap_filter(user_id, start, end),
+        Event.rrule_until.is_(None)
+    )
+    
+    meetings = select(*_meeting_columns('meeting'), *_series_columns()).where(
+        Meeting.user_id == user_id,
+        Meeting.date >= start,
+        Meeting.date < end,
+        Meeting.rrule_until.is_(None)
+    )
+    
+    tasks = select(
+        literal('task').label('type'),
+        Task.id, Task.title, Task.description,
+        Task.date.label('start_at'),
+        _null(db.DateTime).label('end_at'),
+        _null(db.String).label('location'),
+        Task.completed, Task.assigned_to,
+        _null(db.Integer).label('duration'),
+        _null(db.String).label('platform'),
+        _null(db.String).label('meeting_link'),
+        _null(db.Text).label('participants'),
+        _null(db.String).label('link_status'),
+        Task.source, Task.created_at, Task.updated_at,
+        *_series_columns()
+    ).where(
+        Task.user_id == user_id,
+        Task.date >= start,
+        Task.date < end
+    )
+    
+    event_series = select(*_event_columns('event_series'), *_series_columns(Event)).where(
+        *series_filter(Event, user_id, start, end)
+    )
+    
+    meeting_series = select(*_meeting_columns('meeting_series'), *_series_columns(Meeting)).where(
+        *series_filter(Meeting, user_id, start, end)
+    )
+    
+    return union_all(events, meetings, tasks, event_series, meeting_series).order_by('start_at', 'type', 'id')
+
+def calendar_rows(rows, start, end):
+    """Replace the series masters among calendar_query() rows by their occurrences in [start, end), in start order"""
+    entries = []
+    masters = {series_type: [] for series_type in SERIES_TYPES}
+    
+    for row in rows:
+        if row.type in masters:
+            masters[row.type].append(row._mapping)
+        else:
+            entries.append(row)
+    
+    if not any(masters.values()):
+        return entries
+    
+    for series_type, (model, entry_type) in SERIES_TYPES.items():
+        # The expansion reads the start (and end) under the model's column names
+        if model is Event:
+            series = [dict(master, start_date=master['start_at'], end_date=master['end_at']) for master in masters[series_type]]
+        else:
+            series = [dict(master, date=master['start_at']) for master in masters[series_type]]
+        
+        for master, occurrence_start, occurrence_end in expand_series(model, series, start, end):
+            entries.append(SimpleNamespace(**dict(
+                master,
+                type=entry_type,
+                start_at=occurrence_start,
+                end_at=occurrence_end if model is Event else None,
+                recurrence_id=occurrence_start
+            )))
+    
+    return sorted(entries, key=lambda row: (row.start_at, row.type, row.id))
+
+def _entry(row):
+    """Serialize a calendar row like the entry type's to_dict(), tagged with its type"""
+    entry = {
+        'type': row.type,
+        'id': row.id,
+        'title': row.title,
+        'description': row.description,
+        'source': row.source,
+        'created_at': row.created_at.isoformat(),
+        'updated_at': row.updated_at.isoformat()
+    }
+    
+    if row.type == 'event':
+        entry['start_date'] = row.start_at.isoformat()
+        entry['end_date'] = row.end_at.isoformat()
+        entry['location'] = row.location
+    elif row.type == 'meeting':
+        entry['date'] = row.start_at.isoformat()
+        entry['end_date'] = (row.start_at + timedelta(minutes=row.duration)).isoformat()
+        entry['duration'] = row.duration
+        entry['platform'] = row.platform
+        entry['meeting_link'] = row.meeting_link
+        entry['participants'] = row.participants
+        entry['link_status'] = row.link_status
+    else:
+        entry['date'] = row.start_at.isoformat()
+        entry['completed'] = row.completed
+        entry['assigned_to'] = row.assigned_to
+    
+    # Occurrences of a recurring series share its id and tell apart by their start in it
+    if getattr(row, 'recurrence_id', None):
+        entry['recurrence_id'] = row.recurrence_id.isoformat()
+    
+    return entry
+
+@calendar_bp.route('', methods=['GET'])
+@jwt_required()
+@versioned
+def get_calendar():
+    current_user_id = get_jwt_identity()
+    
+    # Validate required fields
+    start = request.args.get('start')
+    end = request.args.get('end')
+    
+    if not start or not end:
+        return jsonify({"error": "Start and end are required"}), 400
+    
+    try:
+        start = datetime.fromisoformat(start)
+        end = datetime.fromisoformat(end)
+    except ValueError:
+        return jsonify({"error": "Start and end must be ISO 8601 dates"}), 400
+    
+    # Tasks, events, meetings and series masters in one round trip, already sorted by start
+    rows = db.session.execute(calendar_query(current_user_id, start, end)).all()
+    
+    # Recurring series expanded for the range only, merged in the same order
+    rows = calendar_rows(rows, start, end)
+    
+    entries = [_entry(row) for row in rows]
+    
+    return jsonify(entries), 200
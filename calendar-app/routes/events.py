@@ -3,37 +3,99 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
 from models.database import db
 from models.event import Event
+from services.pagination import InvalidPage, parse_page_args, paginate
+from services.serialization import InvalidFields, parse_fields, select_fields, rows_to_dicts, dumps
+from services.data_versions import versioned, bump_version
+from services.batch import InvalidBatch, apply_batch
+from services.range_cache import cached_list, mark_span_changed
+from services.event_buckets import overlap_filter
+from services.recurrence import InvalidRecurrence, recurrence_columns, series_filter, occurrence_rows, rows_with_occurrences
 
 events_bp = Blueprint('events', __name__)
 
+def events_query(user_id, start_date=None, end_date=None, source=None, series=False):
+    """Build the query behind GET /events
+    
+    A date range selects the events overlapping it, found through the time
+    bucket index of the user, so events crossing either end of the range are
+    included. Without one the (user_id, start_date) index serves the list.
+    
+    With both ends of a range recurring series are left out, to be expanded
+    into their occurrences instead; series=True builds the query of their
+    masters. Without a full range masters are listed as stored.
+    """
+    if series:
+        query = Event.query.filter(*series_filter(Event, user_id, start_date, end_date))
+    elif start_date and end_date:
+        query = Event.query.filter(*overlap_filter(user_id, start_date, end_date), Event.rrule_until.is_(None))
+    elif start_date or end_date:
+        query = Event.query.filter(*overlap_filter(user_id, start_date, end_date))
+    else:
+        query = Event.query.filter_by(user_id=user_id)
+    
+    # Apply filters if provided
+    if source:
+        query = query.filter_by(source=source)
+    
+    return query
+
 @events_bp.route('', methods=['GET'])
 @jwt_required()
+@versioned
 def get_events():
     current_user_id = get_jwt_identity()
     
     # Get query parameters for filtering
+    try:
+        limit, after = parse_page_args(request.args)
+        fields = parse_fields(Event, request.args.get('fields'))
+    except (InvalidPage, InvalidFields) as e:
+        return jsonify({"error": str(e)}), 400
+    
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
+    start_date = datetime.fromisoformat(start_date) if start_date else None
+    end_date = datetime.fromisoformat(end_date) if end_date else None
     source = request.args.get('source')
     
-    # Base query
-    query = Event.query.filter_by(user_id=current_user_id)
-    
-    # Apply filters if provided
-    if start_date:
-        query = query.filter(Event.start_date >= datetime.fromisoformat(start_date))
-    if end_date:
-        query = query.filter(Event.end_date <= datetime.fromisoformat(end_date))
-    if source:
-        query = query.filter_by(source=source)
-    
-    # Execute query and convert to dict
-    events = [event.to_dict() for event in query.all()]
+    query = events_query(
+        current_user_id,
+        start_date=start_date,
+        end_date=end_date,
+        source=source
+    )
     
-    return jsonify(events), 200
+    # Plain column tuples encoded straight to JSON, no ORM objects or to_dict()
+    query, names = select_fields(query, Event, fields, required=('id', 'start_date'))
+    
+    def load():
+        # Occurrences of the recurring series in the range, expanded only for it
+        occurrences = []
+        if start_date and end_date:
+            series = events_query(current_user_id, start_date, end_date, source, series=True)
+            occurrences = occurrence_rows(Event, series, names, start_date, end_date)
+        
+        # Without limit or cursor the whole list is returned, as before
+        if limit is None:
+            if not occurrences:
+                return dumps(rows_to_dicts(query.all(), fields))
+            rows = sorted(query.all() + occurrences, key=lambda row: (row.start_date, row.id))
+            return dumps(rows_with_occurrences(rows, fields))
+        
+        # One page ordered by (start, id), resuming after the cursor
+        page, next_cursor = paginate(query, Event.start_date, Event.id, limit, after, extra=occurrences)
+        
+        return dumps({
+            "items": rows_with_occurrences(page, fields),
+            "next_cursor": next_cursor
+        })
+    
+    # Repeated reads of a range are served from memory until a write touches it
+    return cached_list(Event, current_user_id, start_date, end_date, load)
 
 @events_bp.route('/<int:event_id>', methods=['GET'])
 @jwt_required()
+@versioned
 def get_event(event_id):
     current_user_id = get_jwt_identity()
     
@@ -54,18 +116,32 @@ def create_event():
     if not data or not data.get('title') or not data.get('start_date') or not data.get('end_date'):
         return jsonify({"error": "Title, start date, and end date are required"}), 400
     
+    start_date = datetime.fromisoformat(data['start_date'])
+    end_date = datetime.fromisoformat(data['end_date'])
+    
+    # A recurring event is one master row with its rule, expanded at read time
+    try:
+        recurrence = recurrence_columns(
+            start_date, end_date - start_date, data.get('rrule'), data.get('exdates'), data.get('rrule_timezone')
+        )
+    except InvalidRecurrence as e:
+        return jsonify({"error": str(e)}), 400
+    
     # Create new event
     new_event = Event(
         title=data['title'],
         description=data.get('description', ''),
-        start_date=datetime.fromisoformat(data['start_date']),
-        end_date=datetime.fromisoformat(data['end_date']),
+        start_date=start_date,
+        end_date=end_date,
         location=data.get('location', ''),
         source=data.get('source', 'local'),
-        user_id=current_user_id
+        user_id=current_user_id,
+        **recurrence
     )
     
     db.session.add(new_event)
+    mark_span_changed(current_user_id, Event, new_event.start_date, new_event.rrule_until or new_event.end_date)
+    bump_version(current_user_id)
     db.session.commit()
     
     return jsonify(new_event.to_dict()), 201
@@ -81,6 +157,9 @@ def update_event(event_id):
     if not event:
         return jsonify({"error": "Event not found"}), 404
     
+    # The cached ranges the event leaves are invalidated as well as the ones it moves to
+    mark_span_changed(current_user_id, Event, event.start_date, event.rrule_until or event.end_date)
+    
     # Update event fields
     if 'title' in data:
         event.title = data['title']
@@ -93,6 +172,21 @@ def update_event(event_id):
     if 'location' in data:
         event.location = data['location']
     
+    # The series columns follow the new start, length and rule
+    if event.rrule or data.get('rrule'):
+        try:
+            recurrence = recurrence_columns(
+                event.start_date, event.end_date - event.start_date, data.get('rrule', event.rrule),
+                data.get('exdates', event.exdates), data.get('rrule_timezone', event.rrule_timezone)
+            )
+        except InvalidRecurrence as e:
+            db.session.rollback()
+            return jsonify({"error": str(e)}), 400
+        for field, value in recurrence.items():
+            setattr(event, field, value)
+    
+    mark_span_changed(current_user_id, Event, event.start_date, event.rrule_until or event.end_date)
+    bump_version(current_user_id)
     db.session.commit()
     
     return jsonify(event.to_dict()), 200
@@ -108,7 +202,24 @@ def delete_event(event_id):
         return jsonify({"error": "Event not found"}), 404
     
     db.session.delete(event)
+    mark_span_changed(current_user_id, Event, event.start_date, event.rrule_until or event.end_date)
+    bump_version(current_user_id)
     db.session.commit()
     
     return jsonify({"message": "Event deleted successfully"}), 200
 
+@events_bp.route('/batch', methods=['POST'])
+@jwt_required()
+def batch_events():
+    current_user_id = get_jwt_identity()
+    
+    # Every item is validated before any is written, then all commit together
+    try:
+        results = apply_batch(Event, current_user_id, request.get_json())
+    except InvalidBatch as e:
+        return jsonify({"error": str(e), "errors": e.errors}), 400
+    
+    db.session.commit()
+    
+    return jsonify(results), 200
+
@@ -0,0 +1,40 @@
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import datetime
+from services.export_service import EXPORT_TYPES, EXPORT_FORMATS, export_calendar
+
+export_bp = Blueprint('export', __name__)
+
+@export_bp.route('', methods=['GET'])
+@jwt_required()
+def export():
+    current_user_id = get_jwt_identity()
+    export_format = request.args.get('format', 'ndjson')
+    
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"Format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    
+    types = tuple(name.strip() for name in request.args.get('types', ','.join(EXPORT_TYPES)).split(',') if name.strip())
+    unknown = [name for name in types if name not in EXPORT_TYPES]
+    if unknown or not types:
+        return jsonify({"error": f"Types must be among: {', '.join(EXPORT_TYPES)}"}), 400
+    
+    try:
+        start = request.args.get('start')
+        end = request.args.get('end')
+        start = datetime.fromisoformat(start) if start else None
+        end = datetime.fromisoformat(end) if end else None
+    except ValueError:
+        return jsonify({"error": "Start and end must be ISO 8601 dates"}), 400
+    
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    
+    # Rows are read and encoded while the response is sent, never all at once
+    chunks = export_calendar(current_user_id, export_format, types, start, end, host=request.host.split(':')[0])
+    
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename=calendar-export.{extension}"}
+    )
+
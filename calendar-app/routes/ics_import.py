@@ -0,0 +1,34 @@
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from services.ics_service import import_ics
+
+import_bp = Blueprint('import', __name__)
+
+@import_bp.route('/ics', methods=['POST'])
+@jwt_required()
+def import_ics_file():
+    current_user_id = get_jwt_identity()
+    
+    # Uploads announcing their size are refused before anything is read
+    max_bytes = current_app.config['ICS_IMPORT_MAX_BYTES']
+    if request.content_length and request.content_length > max_bytes:
+        return jsonify({"error": f"Uploads are limited to {max_bytes} bytes"}), 413
+    
+    # A multipart upload is spooled to disk by Werkzeug; a raw text/calendar body is read off the socket
+    upload = request.files.get('file')
+    if upload is not None:
+        stream = upload.stream
+    elif request.mimetype == 'text/calendar':
+        stream = request.stream
+    else:
+        return jsonify({"error": "Upload an .ics file as 'file' or send a text/calendar body"}), 400
+    
+    # Events are parsed and written chunk by chunk while the upload is read
+    counts = import_ics(current_user_id, stream)
+    
+    # The chunks committed before an error stay imported and are counted
+    if 'error' in counts:
+        return jsonify(counts), 413 if counts.get('limit_exceeded') else 500
+    
+    return jsonify(counts), 200
+
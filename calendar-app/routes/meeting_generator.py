@@ -4,6 +4,7 @@ from models.database import db
 from models.user import User
 from services.zoom_service import create_zoom_meeting
 from services.teams_service import create_teams_meeting
+from services.token_manager import get_access_token
 
 meeting_generator_bp = Blueprint('meeting_generator', __name__)
 
@@ -30,7 +31,7 @@ def generate_meeting():
             return jsonify({"error": "Zoom not connected"}), 401
         
         meeting_info = create_zoom_meeting(
-            token=user.zoom_token,
+            access_token=get_access_token(user, 'zoom'),
             topic=data['title'],
             start_time=data['date'],
             duration=data['duration'],
@@ -48,7 +49,7 @@ def generate_meeting():
             return jsonify({"error": "Microsoft Teams not connected"}), 401
         
         meeting_info = create_teams_meeting(
-            token=user.teams_token,
+            access_token=get_access_token(user, 'teams'),
             subject=data['title'],
             start_time=data['date'],
             duration=data['duration'],
@@ -1,43 +1,111 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime
+from datetime import datetime, timedelta
 from models.database import db
 from models.meeting import Meeting
-from services.meeting_service import generate_meeting_link
+from services.pagination import InvalidPage, parse_page_args, paginate
+from services.serialization import InvalidFields, parse_fields, select_fields, rows_to_dicts, dumps
+from services.link_provisioning import link_columns, enqueue_links
+from services.data_versions import versioned, bump_version
+from services.batch import InvalidBatch, apply_batch
+from services.range_cache import cached_list, mark_changed, mark_span_changed
+from services.recurrence import InvalidRecurrence, recurrence_columns, series_filter, occurrence_rows, rows_with_occurrences
 
 meetings_bp = Blueprint('meetings', __name__)
 
+def _mark_changed(user_id, meeting):
+    """Invalidate the cached ranges a meeting, or every occurrence of a recurring one, shows up in"""
+    if meeting.rrule_until:
+        mark_span_changed(user_id, Meeting, meeting.date, meeting.rrule_until)
+    else:
+        mark_changed(user_id, Meeting, meeting.date)
+
+def meetings_query(user_id, start_date=None, end_date=None, platform=None, source=None, series=False):
+    """Build the query behind GET /meetings, served by the (user_id, date) index
+    
+    With both ends of a range recurring series are left out, to be expanded
+    into their occurrences instead; series=True builds the query of their
+    masters, served by the (user_id, rrule_until) index.
+    """
+    if series:
+        query = Meeting.query.filter(*series_filter(Meeting, user_id, start_date, end_date))
+    else:
+        query = Meeting.query.filter_by(user_id=user_id)
+        
+        # Apply filters if provided
+        if start_date:
+            query = query.filter(Meeting.date >= start_date)
+        if end_date:
+            query = query.filter(Meeting.date <= end_date)
+        if start_date and end_date:
+            query = query.filter(Meeting.rrule_until.is_(None))
+    
+    if platform:
+        query = query.filter_by(platform=platform)
+    if source:
+        query = query.filter_by(source=source)
+    
+    return query
+
 @meetings_bp.route('', methods=['GET'])
 @jwt_required()
+@versioned
 def get_meetings():
     current_user_id = get_jwt_identity()
     
     # Get query parameters for filtering
+    try:
+        limit, after = parse_page_args(request.args)
+        fields = parse_fields(Meeting, request.args.get('fields'))
+    except (InvalidPage, InvalidFields) as e:
+        return jsonify({"error": str(e)}), 400
+    
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
+    start_date = datetime.fromisoformat(start_date) if start_date else None
+    end_date = datetime.fromisoformat(end_date) if end_date else None
     platform = request.args.get('platform')
     source = request.args.get('source')
     
-    # Base query
-    query = Meeting.query.filter_by(user_id=current_user_id)
+    query = meetings_query(
+        current_user_id,
+        start_date=start_date,
+        end_date=end_date,
+        platform=platform,
+        source=source
+    )
     
-    # Apply filters if provided
-    if start_date:
-        query = query.filter(Meeting.date >= datetime.fromisoformat(start_date))
-    if end_date:
-        query = query.filter(Meeting.date <= datetime.fromisoformat(end_date))
-    if platform:
-        query = query.filter_by(platform=platform)
-    if source:
-        query = query.filter_by(source=source)
+    # Plain column tuples encoded straight to JSON, no ORM objects or to_dict()
+    query, names = select_fields(query, Meeting, fields, required=('id', 'date'))
     
-    # Execute query and convert to dict
-    meetings = [meeting.to_dict() for meeting in query.all()]
+    def load():
+        # Occurrences of the recurring series in the range, expanded only for it
+        occurrences = []
+        if start_date and end_date:
+            series = meetings_query(current_user_id, start_date, end_date, platform, source, series=True)
+            occurrences = occurrence_rows(Meeting, series, names, start_date, end_date, end_inclusive=True)
+        
+        # Without limit or cursor the whole list is returned, as before
+        if limit is None:
+            if not occurrences:
+                return dumps(rows_to_dicts(query.all(), fields))
+            rows = sorted(query.all() + occurrences, key=lambda row: (row.date, row.id))
+            return dumps(rows_with_occurrences(rows, fields))
+        
+        # One page ordered by (start, id), resuming after the cursor
+        page, next_cursor = paginate(query, Meeting.date, Meeting.id, limit, after, extra=occurrences)
+        
+        return dumps({
+            "items": rows_with_occurrences(page, fields),
+            "next_cursor": next_cursor
+        })
     
-    return jsonify(meetings), 200
+    # Repeated reads of a range are served from memory until a write touches it
+    return cached_list(Meeting, current_user_id, start_date, end_date, load)
 
 @meetings_bp.route('/<int:meeting_id>', methods=['GET'])
 @jwt_required()
+@versioned
 def get_meeting(meeting_id):
     current_user_id = get_jwt_identity()
     
@@ -58,31 +126,37 @@ def create_meeting():
     if not data or not data.get('title') or not data.get('date') or not data.get('duration') or not data.get('platform'):
         return jsonify({"error": "Title, date, duration, and platform are required"}), 400
     
-    # Generate meeting link
-    meeting_link = generate_meeting_link(
-        platform=data['platform'],
-        title=data['title'],
-        date=data['date'],
-        duration=data['duration'],
-        user_id=current_user_id
-    )
+    # A recurring meeting is one master row with its rule, expanded at read time
+    date = datetime.fromisoformat(data['date'])
+    try:
+        recurrence = recurrence_columns(
+            date, timedelta(minutes=data['duration']), data.get('rrule'), data.get('exdates'), data.get('rrule_timezone')
+        )
+    except InvalidRecurrence as e:
+        return jsonify({"error": str(e)}), 400
     
-    # Create new meeting
+    # Create new meeting; a Zoom or Teams link is created after the commit,
+    # and shows up with link_status 'ready' once it is there
     new_meeting = Meeting(
         title=data['title'],
         description=data.get('description', ''),
-        date=datetime.fromisoformat(data['date']),
+        date=date,
         duration=data['duration'],
         platform=data['platform'],
-        meeting_link=meeting_link,
         participants=data.get('participants', ''),
         source=data.get('source', 'local'),
-        user_id=current_user_id
+        user_id=current_user_id,
+        **link_columns(data['platform']),
+        **recurrence
     )
     
     db.session.add(new_meeting)
+    _mark_changed(current_user_id, new_meeting)
+    bump_version(current_user_id)
     db.session.commit()
     
+    enqueue_links([new_meeting.id])
+    
     return jsonify(new_meeting.to_dict()), 201
 
 @meetings_bp.route('/<int:meeting_id>', methods=['PUT'])
@@ -96,6 +170,9 @@ def update_meeting(meeting_id):
     if not meeting:
         return jsonify({"error": "Meeting not found"}), 404
     
+    # The cached ranges the meeting leaves are invalidated as well as the ones it moves to
+    _mark_changed(current_user_id, meeting)
+    
     # Update meeting fields
     if 'title' in data:
         meeting.title = data['title']
@@ -107,21 +184,58 @@ def update_meeting(meeting_id):
         meeting.duration = data['duration']
     if 'platform' in data and data['platform'] != meeting.platform:
         meeting.platform = data['platform']
-        # Regenerate meeting link if platform changes
-        meeting.meeting_link = generate_meeting_link(
-            platform=meeting.platform,
-            title=meeting.title,
-            date=meeting.date.isoformat(),
-            duration=meeting.duration,
-            user_id=current_user_id
-        )
+        # Regenerate meeting link if platform changes, after the commit
+        for field, value in link_columns(meeting.platform).items():
+            setattr(meeting, field, value)
     if 'participants' in data:
         meeting.participants = data['participants']
     
+    # The series columns follow the new start, length and rule
+    if meeting.rrule or data.get('rrule'):
+        try:
+            recurrence = recurrence_columns(
+                meeting.date, timedelta(minutes=meeting.duration), data.get('rrule', meeting.rrule),
+                data.get('exdates', meeting.exdates), data.get('rrule_timezone', meeting.rrule_timezone)
+            )
+        except InvalidRecurrence as e:
+            db.session.rollback()
+            return jsonify({"error": str(e)}), 400
+        for field, value in recurrence.items():
+            setattr(meeting, field, value)
+    
+    _mark_changed(current_user_id, meeting)
+    bump_version(current_user_id)
     db.session.commit()
     
+    enqueue_links([meeting.id])
+    
     return jsonify(meeting.to_dict()), 200
 
+@meetings_bp.route('/<int:meeting_id>/link', methods=['POST'])
+@jwt_required()
+def retry_meeting_link(meeting_id):
+    current_user_id = get_jwt_identity()
+    
+    meeting = Meeting.query.filter_by(id=meeting_id, user_id=current_user_id).first()
+    
+    if not meeting:
+        return jsonify({"error": "Meeting not found"}), 404
+    
+    if meeting.link_status != 'failed':
+        return jsonify({"error": "Only a failed meeting link can be retried"}), 409
+    
+    # Start over with a fresh set of attempts
+    for field, value in link_columns(meeting.platform).items():
+        setattr(meeting, field, value)
+    
+    _mark_changed(current_user_id, meeting)
+    bump_version(current_user_id)
+    db.session.commit()
+    
+    enqueue_links([meeting.id])
+    
+    return jsonify(meeting.to_dict()), 202
+
 @meetings_bp.route('/<int:meeting_id>', methods=['DELETE'])
 @jwt_required()
 def delete_meeting(meeting_id):
@@ -133,7 +247,33 @@ def delete_meeting(meeting_id):
         return jsonify({"error": "Meeting not found"}), 404
     
     db.session.delete(meeting)
+    _mark_changed(current_user_id, meeting)
+    bump_version(current_user_id)
     db.session.commit()
     
     return jsonify({"message": "Meeting deleted successfully"}), 200
 
+def _pending_links(values, stored):
+    """Batch hook leaving the link of created meetings and of ones changing platform to the provisioning threads"""
+    if stored is not None and values.get('platform', stored['platform']) == stored['platform']:
+        return
+    
+    values.update(link_columns(values['platform']))
+
+@meetings_bp.route('/batch', methods=['POST'])
+@jwt_required()
+def batch_meetings():
+    current_user_id = get_jwt_identity()
+    
+    # Every item is validated before any is written, then all commit together
+    try:
+        results = apply_batch(Meeting, current_user_id, request.get_json(), prepare=_pending_links)
+    except InvalidBatch as e:
+        return jsonify({"error": str(e), "errors": e.errors}), 400
+    
+    db.session.commit()
+    
+    enqueue_links([item["id"] for item in results["create"] + results["update"]])
+    
+    return jsonify(results), 200
+
@@ -1,13 +1,20 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, time
+from sqlalchemy import or_, func
+from sqlalchemy.exc import IntegrityError
 from models.database import db
 from models.schedule import Schedule
+from models.calendar_share import CalendarShare
+from models.user import User
+from services.data_versions import versioned, bump_version, get_versions
+from services.availability import is_working_day, available_slots, available_slots_range, format_minutes, find_common_slots
 
 schedule_bp = Blueprint('schedule', __name__)
 
 @schedule_bp.route('', methods=['GET'])
 @jwt_required()
+@versioned
 def get_schedule():
     current_user_id = get_jwt_identity()
     
@@ -46,6 +53,7 @@ def create_schedule():
         existing_schedule.end_time = time.fromisoformat(data['end_time'])
         existing_schedule.slot_duration = data.get('slot_duration', 30)
         
+        bump_version(current_user_id)
         db.session.commit()
         
         return jsonify(existing_schedule.to_dict()), 200
@@ -68,6 +76,7 @@ def create_schedule():
         )
         
         db.session.add(new_schedule)
+        bump_version(current_user_id)
         db.session.commit()
         
         return jsonify(new_schedule.to_dict()), 201
@@ -83,18 +92,26 @@ def delete_schedule():
         return jsonify({"error": "Schedule not found"}), 404
     
     db.session.delete(schedule)
+    bump_version(current_user_id)
     db.session.commit()
     
     return jsonify({"message": "Schedule deleted successfully"}), 200
 
+def _slot_dicts(slots):
+    """Format (start, end) minute slots as HH:MM:SS pairs"""
+    return [{"start": format_minutes(start), "end": format_minutes(end)} for start, end in slots]
+
 @schedule_bp.route('/available-slots', methods=['GET'])
 @jwt_required()
+@versioned
 def get_available_slots():
     current_user_id = get_jwt_identity()
     date_str = request.args.get('date')
+    start_str = request.args.get('start')
+    end_str = request.args.get('end')
     
-    if not date_str:
-        return jsonify({"error": "Date parameter is required"}), 400
+    if not date_str and not (start_str and end_str):
+        return jsonify({"error": "Date parameter or start and end are required"}), 400
     
     # Get user's schedule
     schedule = Schedule.query.filter_by(user_id=current_user_id).first()
@@ -102,6 +119,26 @@ def get_available_slots():
     if not schedule:
         return jsonify({"error": "No schedule found"}), 404
     
+    # Every day of a range in one response
+    if not date_str:
+        try:
+            first_day = datetime.fromisoformat(start_str).date()
+            last_day = datetime.fromisoformat(end_str).date()
+        except ValueError:
+            return jsonify({"error": "Start and end must be ISO 8601 dates"}), 400
+        
+        if last_day < first_day:
+            return jsonify({"error": "End must not be before start"}), 400
+        if (last_day - first_day).days >= current_app.config['AVAILABILITY_MAX_DAYS']:
+            return jsonify({"error": f"Ranges are limited to {current_app.config['AVAILABILITY_MAX_DAYS']} days"}), 400
+        
+        days = [
+            {"date": day.isoformat(), "slots": _slot_dicts(slots)}
+            for day, slots in available_slots_range(schedule, first_day, last_day).items()
+        ]
+        
+        return jsonify({"days": days}), 200
+    
     # Parse the requested date
     requested_date = datetime.fromisoformat(date_str).date()
     
@@ -110,45 +147,143 @@ def get_available_slots():
         return jsonify({"message": "Date is outside of scheduled range", "slots": []}), 200
     
     # Check if day is a working day
-    day_of_week = requested_date.weekday()  # 0 = Monday, 6 = Sunday
-    is_working_day = False
-    
-    if day_of_week == 0 and schedule.monday:
-        is_working_day = True
-    elif day_of_week == 1 and schedule.tuesday:
-        is_working_day = True
-    elif day_of_week == 2 and schedule.wednesday:
-        is_working_day = True
-    elif day_of_week == 3 and schedule.thursday:
-        is_working_day = True
-    elif day_of_week == 4 and schedule.friday:
-        is_working_day = True
-    elif day_of_week == 5 and schedule.saturday:
-        is_working_day = True
-    elif day_of_week == 6 and schedule.sunday:
-        is_working_day = True
-    
-    if not is_working_day:
+    if not is_working_day(schedule, requested_date):
         return jsonify({"message": "Not a working day", "slots": []}), 200
     
-    # Generate time slots
-    slots = []
-    current_time = schedule.start_time
-    end_time = schedule.end_time
-    
-    while current_time < end_time:
-        slot_end = time(
-            current_time.hour + ((current_time.minute + schedule.slot_duration) // 60),
-            (current_time.minute + schedule.slot_duration) % 60
-        )
-        
-        if slot_end <= end_time:
-            slots.append({
-                "start": current_time.isoformat(),
-                "end": slot_end.isoformat()
-            })
-        
-        current_time = slot_end
+    # Working hours split into slots, minus the user's events and meetings
+    slots = _slot_dicts(available_slots(schedule, requested_date))
     
     return jsonify({"slots": slots}), 200
 
+def _normalize_email(email):
+    """Return an email the way shares store and compare it"""
+    return email.strip().lower()
+
+@schedule_bp.route('/shares', methods=['GET'])
+@jwt_required()
+def get_shares():
+    current_user_id = get_jwt_identity()
+    
+    shares = CalendarShare.query.filter_by(owner_id=current_user_id).order_by(CalendarShare.grantee_email).all()
+    
+    return jsonify([share.to_dict() for share in shares]), 200
+
+@schedule_bp.route('/shares', methods=['POST'])
+@jwt_required()
+def create_share():
+    current_user_id = get_jwt_identity()
+    data = request.get_json()
+    
+    if not data or not isinstance(data.get('email'), str) or not data['email'].strip():
+        return jsonify({"error": "Email is required"}), 400
+    email = _normalize_email(data['email'])
+    
+    # Emails without an account can be granted too, so the answer does not tell whether one exists
+    share = CalendarShare.query.filter_by(owner_id=current_user_id, grantee_email=email).first()
+    if share:
+        return jsonify(share.to_dict()), 200
+    
+    share = CalendarShare(owner_id=current_user_id, grantee_email=email)
+    try:
+        with db.session.begin_nested():
+            db.session.add(share)
+    except IntegrityError:
+        # Granted by a concurrent request
+        share = CalendarShare.query.filter_by(owner_id=current_user_id, grantee_email=email).first()
+        return jsonify(share.to_dict()), 200
+    db.session.commit()
+    
+    return jsonify(share.to_dict()), 201
+
+@schedule_bp.route('/shares/<int:share_id>', methods=['DELETE'])
+@jwt_required()
+def delete_share(share_id):
+    current_user_id = get_jwt_identity()
+    
+    share = CalendarShare.query.filter_by(id=share_id, owner_id=current_user_id).first()
+    
+    if not share:
+        return jsonify({"error": "Share not found"}), 404
+    
+    db.session.delete(share)
+    db.session.commit()
+    
+    return jsonify({"message": "Share deleted successfully"}), 200
+
+@schedule_bp.route('/find-common-slots', methods=['POST'])
+@jwt_required()
+def find_common_slots_route():
+    current_user_id = get_jwt_identity()
+    data = request.get_json()
+    
+    # Validate required fields
+    if not data or not data.get('start') or not data.get('end'):
+        return jsonify({"error": "Start and end are required"}), 400
+    
+    user_ids = data.get('user_ids', [])
+    emails = data.get('emails', [])
+    if not isinstance(user_ids, list) or not isinstance(emails, list):
+        return jsonify({"error": "user_ids and emails must be lists"}), 400
+    if not all(isinstance(email, str) for email in emails):
+        return jsonify({"error": "emails must be strings"}), 400
+    emails = {_normalize_email(email) for email in emails}
+    
+    try:
+        first_day = datetime.fromisoformat(data['start']).date()
+        last_day = datetime.fromisoformat(data['end']).date()
+        user_ids = {int(user_id) for user_id in user_ids}
+        duration = int(data.get('duration', 30))
+        step = int(data.get('step', 15))
+        limit = int(data.get('limit', 10))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Start and end must be ISO 8601 dates and user_ids, duration, step and limit integers"}), 400
+    
+    if last_day < first_day:
+        return jsonify({"error": "End must not be before start"}), 400
+    if (last_day - first_day).days >= current_app.config['AVAILABILITY_MAX_DAYS']:
+        return jsonify({"error": f"Ranges are limited to {current_app.config['AVAILABILITY_MAX_DAYS']} days"}), 400
+    if duration <= 0 or step <= 0 or limit <= 0:
+        return jsonify({"error": "Duration, step and limit must be positive"}), 400
+    limit = min(limit, current_app.config['COMMON_SLOTS_MAX_RESULTS'])
+    
+    # Only calendars shared with the current user can be searched. Accounts
+    # that do not exist get the same answer as ones that did not share, so
+    # the endpoint does not tell which exist.
+    # Emails are compared trimmed and lower-cased, however the account or the share spelled them
+    current_email = _normalize_email(db.session.query(User.email).filter_by(id=current_user_id).scalar())
+    owner_email = func.lower(func.trim(User.email))
+    shared = db.session.query(User.id, owner_email).join(CalendarShare, CalendarShare.owner_id == User.id).filter(
+        CalendarShare.grantee_email == current_email,
+        or_(User.id.in_(user_ids), owner_email.in_(emails))
+    ).all()
+    
+    denied_ids = sorted(user_ids - {user_id for user_id, _ in shared} - {current_user_id})
+    denied_emails = sorted(emails - {email for _, email in shared} - {current_email})
+    if denied_ids or denied_emails:
+        return jsonify({
+            "error": "Some participants have not shared their calendar with you",
+            "user_ids": denied_ids,
+            "emails": denied_emails
+        }), 403
+    
+    # The current user always takes part
+    user_ids.update(user_id for user_id, _ in shared)
+    user_ids.add(current_user_id)
+    
+    if len(user_ids) > current_app.config['COMMON_SLOTS_MAX_PARTICIPANTS']:
+        return jsonify({"error": f"At most {current_app.config['COMMON_SLOTS_MAX_PARTICIPANTS']} participants are allowed"}), 400
+    
+    schedules = {schedule.user_id: schedule for schedule in Schedule.query.filter(Schedule.user_id.in_(user_ids))}
+    unscheduled = sorted(user_ids - schedules.keys())
+    if unscheduled:
+        return jsonify({"error": "No schedule found for some participants", "user_ids": unscheduled}), 400
+    
+    slots = find_common_slots(
+        list(schedules.values()), get_versions(user_ids), first_day, last_day, duration, step, limit,
+        not_before=datetime.utcnow()
+    )
+    
+    return jsonify({
+        "participants": sorted(user_ids),
+        "slots": [{"start": start.isoformat(), "end": end.isoformat()} for start, end in slots]
+    }), 200
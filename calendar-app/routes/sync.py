@@ -1,13 +1,14 @@
 from flask import Blueprint, request, jsonify, redirect, url_for, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
+import time
 from models.database import db
 from models.user import User
-from models.task import Task
-from models.event import Event
-from models.meeting import Meeting
-from services.outlook_service import get_outlook_auth_url, get_outlook_token, get_outlook_events
-from services.gmail_service import get_gmail_auth_url, get_gmail_token, get_gmail_events
-from datetime import datetime
+from models.sync_state import SyncState
+from models.sync_job import SyncJob
+from services.outlook_service import get_outlook_auth_url, get_outlook_token
+from services.gmail_service import get_gmail_auth_url, get_gmail_token
+from services.sync_jobs import enqueue_sync, run_concurrent_sync, SyncQueueFull
+from services.token_manager import stamp_token
 
 sync_bp = Blueprint('sync', __name__)
 
@@ -35,7 +36,9 @@ def outlook_callback():
     # Save token to user
     user = User.query.get(state)
     if user:
-        user.outlook_token = token
+        user.outlook_token = stamp_token(token)
+        # A new connection starts over with a full sync
+        SyncState.query.filter_by(user_id=user.id, provider='outlook').delete()
         db.session.commit()
     
     # Redirect to frontend
@@ -50,78 +53,18 @@ def sync_outlook():
     if not user or not user.outlook_token:
         return jsonify({"error": "Outlook not connected"}), 401
     
-    # Get events from Outlook
-    outlook_events = get_outlook_events(user.outlook_token)
-    
-    # Process and save events
-    for event in outlook_events:
-        # Check if it's a meeting
-        if event.get('is_meeting'):
-            # Check if meeting already exists
-            existing = Meeting.query.filter_by(
-                user_id=current_user_id,
-                source='outlook',
-                source_id=event.get('id')
-            ).first()
-            
-            if existing:
-                # Update existing meeting
-                existing.title = event.get('subject')
-                existing.description = event.get('body', '')
-                existing.date = datetime.fromisoformat(event.get('start_time'))
-                existing.duration = event.get('duration')
-                existing.meeting_link = event.get('meeting_link', '')
-                existing.participants = event.get('attendees', '')
-            else:
-                # Create new meeting
-                new_meeting = Meeting(
-                    title=event.get('subject'),
-                    description=event.get('body', ''),
-                    date=datetime.fromisoformat(event.get('start_time')),
-                    duration=event.get('duration'),
-                    platform='teams' if 'teams' in event.get('meeting_link', '').lower() else 'other',
-                    meeting_link=event.get('meeting_link', ''),
-                    participants=event.get('attendees', ''),
-                    source='outlook',
-                    source_id=event.get('id'),
-                    user_id=current_user_id
-                )
-                db.session.add(new_meeting)
-        else:
-            # Regular event
-            existing = Event.query.filter_by(
-                user_id=current_user_id,
-                source='outlook',
-                source_id=event.get('id')
-            ).first()
-            
-            if existing:
-                # Update existing event
-                existing.title = event.get('subject')
-                existing.description = event.get('body', '')
-                existing.start_date = datetime.fromisoformat(event.get('start_time'))
-                existing.end_date = datetime.fromisoformat(event.get('end_time'))
-                existing.location = event.get('location', '')
-            else:
-                # Create new event
-                new_event = Event(
-                    title=event.get('subject'),
-                    description=event.get('body', ''),
-                    start_date=datetime.fromisoformat(event.get('start_time')),
-                    end_date=datetime.fromisoformat(event.get('end_time')),
-                    location=event.get('location', ''),
-                    source='outlook',
-                    source_id=event.get('id'),
-                    user_id=current_user_id
-                )
-                db.session.add(new_event)
-    
-    db.session.commit()
+    # Run the sync in the background, merging into a job already in flight
+    try:
+        job, created = enqueue_sync(current_user_id, 'outlook')
+    except SyncQueueFull:
+        return jsonify({"error": "Too many syncs in progress, try again later"}), 503
     
     return jsonify({
-        "message": "Outlook calendar synced successfully",
-        "events_synced": len(outlook_events)
-    }), 200
+        "message": "Outlook calendar sync queued" if created else "Outlook calendar sync already in progress",
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": url_for('sync.get_sync_job', job_id=job.id)
+    }), 202
 
 @sync_bp.route('/gmail/auth', methods=['GET'])
 @jwt_required()
@@ -147,7 +90,9 @@ def gmail_callback():
     # Save token to user
     user = User.query.get(state)
     if user:
-        user.gmail_token = token
+        user.gmail_token = stamp_token(token)
+        # A new connection starts over with a full sync
+        SyncState.query.filter_by(user_id=user.id, provider='gmail').delete()
         db.session.commit()
     
     # Redirect to frontend
@@ -162,76 +107,46 @@ def sync_gmail():
     if not user or not user.gmail_token:
         return jsonify({"error": "Gmail not connected"}), 401
     
-    # Get events from Gmail
-    gmail_events = get_gmail_events(user.gmail_token)
-    
-    # Process and save events
-    for event in gmail_events:
-        # Check if it's a meeting
-        if event.get('is_meeting'):
-            # Check if meeting already exists
-            existing = Meeting.query.filter_by(
-                user_id=current_user_id,
-                source='gmail',
-                source_id=event.get('id')
-            ).first()
-            
-            if existing:
-                # Update existing meeting
-                existing.title = event.get('summary')
-                existing.description = event.get('description', '')
-                existing.date = datetime.fromisoformat(event.get('start_time'))
-                existing.duration = event.get('duration')
-                existing.meeting_link = event.get('meeting_link', '')
-                existing.participants = event.get('attendees', '')
-            else:
-                # Create new meeting
-                new_meeting = Meeting(
-                    title=event.get('summary'),
-                    description=event.get('description', ''),
-                    date=datetime.fromisoformat(event.get('start_time')),
-                    duration=event.get('duration'),
-                    platform='zoom' if 'zoom' in event.get('meeting_link', '').lower() else 'other',
-                    meeting_link=event.get('meeting_link', ''),
-                    participants=event.get('attendees', ''),
-                    source='gmail',
-                    source_id=event.get('id'),
-                    user_id=current_user_id
-                )
-                db.session.add(new_meeting)
-        else:
-            # Regular event
-            existing = Event.query.filter_by(
-                user_id=current_user_id,
-                source='gmail',
-                source_id=event.get('id')
-            ).first()
-            
-            if existing:
-                # Update existing event
-                existing.title = event.get('summary')
-                existing.description = event.get('description', '')
-                existing.start_date = datetime.fromisoformat(event.get('start_time'))
-                existing.end_date = datetime.fromisoformat(event.get('end_time'))
-                existing.location = event.get('location', '')
-            else:
-                # Create new event
-                new_event = Event(
-                    title=event.get('summary'),
-                    description=event.get('description', ''),
-                    start_date=datetime.fromisoformat(event.get('start_time')),
-                    end_date=datetime.fromisoformat(event.get('end_time')),
-                    location=event.get('location', ''),
-                    source='gmail',
-                    source_id=event.get('id'),
-                    user_id=current_user_id
-                )
-                db.session.add(new_event)
-    
-    db.session.commit()
+    # Run the sync in the background, merging into a job already in flight
+    try:
+        job, created = enqueue_sync(current_user_id, 'gmail')
+    except SyncQueueFull:
+        return jsonify({"error": "Too many syncs in progress, try again later"}), 503
+    
+    return jsonify({
+        "message": "Gmail calendar sync queued" if created else "Gmail calendar sync already in progress",
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": url_for('sync.get_sync_job', job_id=job.id)
+    }), 202
+
+@sync_bp.route('/all', methods=['POST'])
+@jwt_required()
+def sync_all():
+    current_user_id = get_jwt_identity()
+    user = User.query.get(current_user_id)
+    
+    if not user or not (user.outlook_token or user.gmail_token):
+        return jsonify({"error": "No calendar connected"}), 401
+    
+    # Sync every connected provider in parallel, reusing jobs already in flight
+    started = time.perf_counter()
+    results = run_concurrent_sync(user)
     
     return jsonify({
-        "message": "Gmail calendar synced successfully",
-        "events_synced": len(gmail_events)
+        "message": "Calendars synced",
+        "providers": results,
+        "total_seconds": round(time.perf_counter() - started, 3)
     }), 200
 
+@sync_bp.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_sync_job(job_id):
+    current_user_id = get_jwt_identity()
+    
+    job = SyncJob.query.filter_by(id=job_id, user_id=current_user_id).first()
+    
+    if not job:
+        return jsonify({"error": "Sync job not found"}), 404
+    
+    return jsonify(job.to_dict()), 200
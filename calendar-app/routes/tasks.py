@@ -3,37 +3,76 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
 from models.database import db
 from models.task import Task
+from services.pagination import InvalidPage, parse_page_args, paginate
+from services.serialization import InvalidFields, parse_fields, select_fields, rows_to_dicts, dumps
+from services.data_versions import versioned, bump_version
+from services.batch import InvalidBatch, apply_batch
+from services.range_cache import cached_list, mark_changed
 
 tasks_bp = Blueprint('tasks', __name__)
 
+def tasks_query(user_id, start_date=None, end_date=None, source=None):
+    """Build the query behind GET /tasks, served by the (user_id, date) index"""
+    query = Task.query.filter_by(user_id=user_id)
+    
+    # Apply filters if provided
+    if start_date:
+        query = query.filter(Task.date >= start_date)
+    if end_date:
+        query = query.filter(Task.date <= end_date)
+    if source:
+        query = query.filter_by(source=source)
+    
+    return query
+
 @tasks_bp.route('', methods=['GET'])
 @jwt_required()
+@versioned
 def get_tasks():
     current_user_id = get_jwt_identity()
     
     # Get query parameters for filtering
+    try:
+        limit, after = parse_page_args(request.args)
+        fields = parse_fields(Task, request.args.get('fields'))
+    except (InvalidPage, InvalidFields) as e:
+        return jsonify({"error": str(e)}), 400
+    
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
+    start_date = datetime.fromisoformat(start_date) if start_date else None
+    end_date = datetime.fromisoformat(end_date) if end_date else None
     source = request.args.get('source')
     
-    # Base query
-    query = Task.query.filter_by(user_id=current_user_id)
-    
-    # Apply filters if provided
-    if start_date:
-        query = query.filter(Task.date >= datetime.fromisoformat(start_date))
-    if end_date:
-        query = query.filter(Task.date <= datetime.fromisoformat(end_date))
-    if source:
-        query = query.filter_by(source=source)
-    
-    # Execute query and convert to dict
-    tasks = [task.to_dict() for task in query.all()]
+    query = tasks_query(
+        current_user_id,
+        start_date=start_date,
+        end_date=end_date,
+        source=source
+    )
     
-    return jsonify(tasks), 200
+    # Plain column tuples encoded straight to JSON, no ORM objects or to_dict()
+    query, _ = select_fields(query, Task, fields, required=('id', 'date'))
+    
+    def load():
+        # Without limit or cursor the whole list is returned, as before
+        if limit is None:
+            return dumps(rows_to_dicts(query.all(), fields))
+        
+        # One page ordered by (start, id), resuming after the cursor
+        page, next_cursor = paginate(query, Task.date, Task.id, limit, after)
+        
+        return dumps({
+            "items": rows_to_dicts(page, fields),
+            "next_cursor": next_cursor
+        })
+    
+    # Repeated reads of a range are served from memory until a write touches it
+    return cached_list(Task, current_user_id, start_date, end_date, load)
 
 @tasks_bp.route('/<int:task_id>', methods=['GET'])
 @jwt_required()
+@versioned
 def get_task(task_id):
     current_user_id = get_jwt_identity()
     
@@ -65,6 +104,8 @@ def create_task():
     )
     print(new_task)
     db.session.add(new_task)
+    mark_changed(new_task.user_id, Task, new_task.date)
+    bump_version(new_task.user_id)
     db.session.commit()
     
     return jsonify(new_task.to_dict()), 201
@@ -80,6 +121,9 @@ def update_task(task_id):
     if not task:
         return jsonify({"error": "Task not found"}), 404
     
+    # The cached ranges the task leaves are invalidated as well as the ones it moves to
+    mark_changed(current_user_id, Task, task.date)
+    
     # Update task fields
     if 'title' in data:
         task.title = data['title']
@@ -92,6 +136,8 @@ def update_task(task_id):
     if 'assigned_to' in data:
         task.assigned_to = data['assigned_to']
     
+    mark_changed(current_user_id, Task, task.date)
+    bump_version(current_user_id)
     db.session.commit()
     
     return jsonify(task.to_dict()), 200
@@ -107,7 +153,24 @@ def delete_task(task_id):
         return jsonify({"error": "Task not found"}), 404
     
     db.session.delete(task)
+    mark_changed(current_user_id, Task, task.date)
+    bump_version(current_user_id)
     db.session.commit()
     
     return jsonify({"message": "Task deleted successfully"}), 200
 
+@tasks_bp.route('/batch', methods=['POST'])
+@jwt_required()
+def batch_tasks():
+    current_user_id = get_jwt_identity()
+    
+    # Every item is validated before any is written, then all commit together
+    try:
+        results = apply_batch(Task, current_user_id, request.get_json())
+    except InvalidBatch as e:
+        return jsonify({"error": str(e), "errors": e.errors}), 400
+    
+    db.session.commit()
+    
+    return jsonify(results), 200
+
@@ -0,0 +1,100 @@
+import argparse
+import json
+import logging
+import signal
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from app import app
+from services.sync_scheduler import SyncScheduler
+from services.link_provisioning import LinkProvisioner
+
+logger = logging.getLogger('scheduler')
+
+def parse_limits(values, defaults):
+    """Merge provider=value overrides from the command line into the configured limits"""
+    limits = dict(defaults)
+    for value in values or []:
+        provider, _, limit = value.partition('=')
+        limits[provider] = float(limit)
+    return limits
+
+def serve_stats(stats, port):
+    """Expose the stats returned by stats() as JSON on http://localhost:<port>/"""
+    class StatsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = json.dumps(stats()).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, *args):
+            pass
+    
+    server = ThreadingHTTPServer(('127.0.0.1', port), StatsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def log_stats(stats, stop_event, every):
+    """Log queue depth and lag periodically"""
+    while not stop_event.wait(every):
+        logger.info('Scheduler stats: %s', json.dumps(stats()))
+
+def main():
+    config = app.config
+    
+    parser = argparse.ArgumentParser(description='Sync every connected calendar and create pending meeting links in the background')
+    parser.add_argument('--interval', type=int, default=config['SCHEDULER_INTERVAL'], help='seconds between syncs of a calendar')
+    parser.add_argument('--jitter', type=float, default=config['SCHEDULER_JITTER'], help='fraction of the interval to randomize by')
+    parser.add_argument('--max-concurrency', type=int, default=config['SCHEDULER_MAX_CONCURRENCY'], help='syncs running at once')
+    parser.add_argument('--provider-concurrency', action='append', metavar='PROVIDER=N', help='syncs running at once per provider')
+    parser.add_argument('--provider-rate', action='append', metavar='PROVIDER=RATE', help='sync starts per second per provider')
+    parser.add_argument('--refresh', type=int, default=config['SCHEDULER_USER_REFRESH'], help='seconds between user list reloads')
+    parser.add_argument('--stats-port', type=int, help='serve queue depth and lag as JSON on this port')
+    parser.add_argument('--stats-every', type=int, default=60, help='seconds between stats log lines')
+    parser.add_argument('--link-workers', type=int, default=config['LINK_WORKERS'], help='meeting links created at once')
+    parser.add_argument('--once', action='store_true', help='sync every calendar and create the due links once, then exit')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    
+    provider_concurrency = parse_limits(args.provider_concurrency, config['SCHEDULER_PROVIDER_CONCURRENCY'])
+    scheduler = SyncScheduler(
+        app,
+        interval=args.interval,
+        jitter=args.jitter,
+        max_concurrency=args.max_concurrency,
+        provider_concurrency={provider: int(limit) for provider, limit in provider_concurrency.items()},
+        provider_rates=parse_limits(args.provider_rate, config['SCHEDULER_PROVIDER_RATES']),
+        refresh_interval=args.refresh
+    )
+    
+    provisioner = LinkProvisioner(app, interval=config['LINK_SWEEP_INTERVAL'], workers=args.link_workers)
+    
+    def stop(*_):
+        scheduler.stop()
+        provisioner.stop()
+    
+    def stats():
+        return dict(scheduler.stats(), links=provisioner.stats())
+    
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    
+    if args.stats_port:
+        serve_stats(stats, args.stats_port)
+    threading.Thread(target=log_stats, args=(stats, scheduler.stop_event, args.stats_every), daemon=True).start()
+    
+    # Pending meeting links are retried on a thread of their own next to the syncs
+    links = threading.Thread(target=provisioner.run, kwargs={'once': args.once}, name='link-provisioner')
+    links.start()
+    
+    scheduler.run(once=args.once)
+    if not args.once:
+        provisioner.stop()
+    links.join()
+    logger.info('Scheduler stopped: %s', json.dumps(stats()))
+
+if __name__ == '__main__':
+    main()
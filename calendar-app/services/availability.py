@@ -0,0 +1,387 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from models.database import db
+from models.event import Event
+from models.meeting import Meeting
+from services.event_buckets import overlap_filter
+from services.range_cache import get_cache
+from services.recurrence import SERIES_FIELDS, series_filter, expand_series
+
+try:
+    import numpy as np
+except ImportError:  # Ranges fall back to one sweep per day
+    np = None
+
+MINUTES_PER_DAY = 24 * 60
+
+# Schedule flags by date.weekday()
+WEEKDAY_FIELDS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+
+# Free minutes of one day as a bitmap, bit 0 at midnight
+DAY_MASK = (1 << MINUTES_PER_DAY) - 1
+
+# Longest meeting looked for before the day, so one running past midnight still blocks it
+MAX_MEETING_LENGTH = timedelta(days=1)
+
+def minutes_of(value):
+    """Return the minutes since midnight of a time"""
+    return value.hour * 60 + value.minute
+
+def format_minutes(minutes):
+    """Format minutes since midnight as HH:MM:SS, wrapping past midnight"""
+    minutes %= MINUTES_PER_DAY
+    return f'{minutes // 60:02d}:{minutes % 60:02d}:00'
+
+def is_working_day(schedule, day):
+    """Tell whether a date is inside the schedule's range and on one of its working weekdays"""
+    if day < schedule.start_date or day > schedule.end_date:
+        return False
+    return bool(getattr(schedule, WEEKDAY_FIELDS[day.weekday()]))
+
+def working_window(schedule):
+    """Return the [start, end) minutes of a working day, past 1440 for a shift ending after midnight"""
+    start = minutes_of(schedule.start_time)
+    end = minutes_of(schedule.end_time)
+    
+    if end <= start:
+        end += MINUTES_PER_DAY
+    return start, end
+
+def series_busy(user_ids, start, end):
+    """Return {user_id: (events, meetings)} of the occurrences of users' recurring series, laid out like load_busy()"""
+    busy = {user_id: ([], []) for user_id in user_ids}
+    
+    for model, window_start in ((Event, start), (Meeting, start - MAX_MEETING_LENGTH)):
+        columns = [model.user_id] + [getattr(model, field) for field in SERIES_FIELDS[model]]
+        masters = db.session.execute(select(*columns).where(*series_filter(model, list(user_ids), window_start, end)))
+        
+        for master, occurrence_start, occurrence_end in expand_series(model, (row._mapping for row in masters), window_start, end):
+            events, meetings = busy[master['user_id']]
+            if model is Event:
+                events.append((occurrence_start, occurrence_end))
+            else:
+                meetings.append((occurrence_start, master['duration']))
+    
+    return busy
+
+def load_busy(user_id, start, end):
+    """Load the (start, end) of a user's events and the (start, duration) of their meetings overlapping [start, end)
+    
+    Recurring series are expanded into their occurrences in the range.
+    """
+    events = db.session.execute(select(Event.start_date, Event.end_date).where(
+        *overlap_filter(user_id, start, end),
+        Event.rrule_until.is_(None)
+    )).all()
+    
+    meetings = db.session.execute(select(Meeting.date, Meeting.duration).where(
+        Meeting.user_id == user_id,
+        Meeting.date > start - MAX_MEETING_LENGTH,
+        Meeting.date < end,
+        Meeting.rrule_until.is_(None)
+    )).all()
+    
+    series_events, series_meetings = series_busy([user_id], start, end)[user_id]
+    return events + series_events, meetings + series_meetings
+
+def _minute_intervals(origin, events, meetings):
+    """Turn (start, end) events and (start, duration) meetings into [start, end) minutes after origin"""
+    minute = timedelta(minutes=1)
+    
+    # Round starts down and ends up so a partly busy minute counts as busy
+    intervals = [((event_start - origin) // minute, -((origin - event_end) // minute)) for event_start, event_end in events]
+    
+    for meeting_start, duration in meetings:
+        meeting_start = (meeting_start - origin) // minute
+        intervals.append((meeting_start, meeting_start + duration))
+    
+    # Zero-length entries still take up the minute they are at
+    return [(busy_start, max(busy_end, busy_start + 1)) for busy_start, busy_end in intervals]
+
+def busy_intervals(user_id, start, end):
+    """Return the [start, end) minutes after start at which the user's events and meetings overlap [start, end)"""
+    return _minute_intervals(start, *load_busy(user_id, start, end))
+
+def busy_intervals_by_user(user_ids, start, end):
+    """Return {user_id: busy_intervals()} for several users, with one query for events and one for meetings
+    
+    Their recurring series take one more query for each.
+    """
+    user_ids = list(user_ids)
+    events = {user_id: [] for user_id in user_ids}
+    meetings = {user_id: [] for user_id in user_ids}
+    
+    for user_id, event_start, event_end in db.session.execute(select(Event.user_id, Event.start_date, Event.end_date).where(
+        *overlap_filter(user_ids, start, end),
+        Event.rrule_until.is_(None)
+    )):
+        events[user_id].append((event_start, event_end))
+    
+    for user_id, meeting_start, duration in db.session.execute(select(Meeting.user_id, Meeting.date, Meeting.duration).where(
+        Meeting.user_id.in_(user_ids),
+        Meeting.date > start - MAX_MEETING_LENGTH,
+        Meeting.date < end,
+        Meeting.rrule_until.is_(None)
+    )):
+        meetings[user_id].append((meeting_start, duration))
+    
+    for user_id, (series_events, series_meetings) in series_busy(user_ids, start, end).items():
+        events[user_id] += series_events
+        meetings[user_id] += series_meetings
+    
+    return {user_id: _minute_intervals(start, events[user_id], meetings[user_id]) for user_id in user_ids}
+
+def merge_intervals(intervals):
+    """Sort [start, end) intervals and coalesce the ones that overlap or touch"""
+    merged = []
+    
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    
+    return merged
+
+def free_slots(window_start, window_end, slot_duration, busy):
+    """Return the (start, end) slots of the working window that miss every busy interval
+    
+    Slots are laid out back to back from window_start, all in minutes. busy
+    is sorted and coalesced, so one sweep over both lists is enough.
+    """
+    slots = []
+    index = 0
+    
+    for slot_start in range(window_start, window_end - slot_duration + 1, slot_duration):
+        slot_end = slot_start + slot_duration
+        
+        # Busy intervals ending before this slot cannot reach any later one
+        while index < len(busy) and busy[index][1] <= slot_start:
+            index += 1
+        
+        if index == len(busy) or busy[index][0] >= slot_end:
+            slots.append((slot_start, slot_end))
+    
+    return slots
+
+def available_slots(schedule, day):
+    """Return the free (start, end) minute slots of a schedule's working hours on a date"""
+    window_start, window_end = working_window(schedule)
+    midnight = datetime.combine(day, datetime.min.time())
+    
+    busy = busy_intervals(
+        schedule.user_id,
+        midnight + timedelta(minutes=window_start),
+        midnight + timedelta(minutes=window_end)
+    )
+    # Busy minutes count from the window start; shift them onto the day's minutes
+    busy = merge_intervals((start + window_start, end + window_start) for start, end in busy)
+    
+    return free_slots(window_start, window_end, schedule.slot_duration, busy)
+
+def _range_slots_vectorized(schedule, first_day, days):
+    """Compute the free slots of consecutive days with NumPy, see available_slots_range()"""
+    window_start, window_end = working_window(schedule)
+    slot_duration = schedule.slot_duration
+    origin = datetime.combine(first_day, datetime.min.time())
+    # Minutes from the first midnight to the end of the last working window
+    total = (days - 1) * MINUTES_PER_DAY + window_end
+    
+    events, meetings = load_busy(
+        schedule.user_id,
+        origin + timedelta(minutes=window_start),
+        origin + timedelta(minutes=total)
+    )
+    
+    # Busy intervals as minutes from the first midnight, rounded outwards like busy_intervals()
+    epoch = np.datetime64(origin, 's')
+    starts = np.empty(0, dtype=np.int64)
+    ends = np.empty(0, dtype=np.int64)
+    # Result rows are unzipped first; NumPy converts plain lists far faster
+    if events:
+        event_starts, event_ends = zip(*events)
+        starts = (np.array(event_starts, dtype='datetime64[s]') - epoch).astype(np.int64) // 60
+        ends = -((epoch - np.array(event_ends, dtype='datetime64[s]')).astype(np.int64) // 60)
+    if meetings:
+        meeting_starts, durations = zip(*meetings)
+        meeting_starts = (np.array(meeting_starts, dtype='datetime64[s]') - epoch).astype(np.int64) // 60
+        starts = np.concatenate((starts, meeting_starts))
+        ends = np.concatenate((ends, meeting_starts + np.array(durations, dtype=np.int64)))
+    ends = np.maximum(ends, starts + 1)
+    
+    # Occupancy bitmap of every minute: +1 where an interval starts, -1 where
+    # it ends, summed up. Its running total counts busy minutes before each one.
+    changes = np.bincount(np.clip(starts, 0, total), minlength=total + 1)
+    changes -= np.bincount(np.clip(ends, 0, total), minlength=total + 1)
+    busy_minutes = np.cumsum(changes[:-1]) > 0
+    busy_before = np.concatenate(([0], np.cumsum(busy_minutes)))
+    
+    # Working-day mask from the weekday flags and the schedule's date range
+    weekday_flags = np.array([bool(getattr(schedule, field)) for field in WEEKDAY_FIELDS])
+    ordinals = first_day.toordinal() + np.arange(days)
+    working = weekday_flags[(first_day.weekday() + np.arange(days)) % 7]
+    working &= (ordinals >= schedule.start_date.toordinal()) & (ordinals <= schedule.end_date.toordinal())
+    working_days = np.flatnonzero(working)
+    
+    # One row of slot starts per working day; a slot is free without busy minutes
+    offsets = np.arange(window_start, window_end - slot_duration + 1, slot_duration)
+    starts = working_days[:, None] * MINUTES_PER_DAY + offsets[None, :]
+    free = busy_before[starts + slot_duration] == busy_before[starts]
+    
+    slots = {first_day + timedelta(days=day): [] for day in range(days)}
+    for day, row in zip(working_days.tolist(), free):
+        slots[first_day + timedelta(days=day)] = [
+            (start, start + slot_duration) for start in offsets[row].tolist()
+        ]
+    return slots
+
+def available_slots_range(schedule, first_day, last_day):
+    """Return {date: free (start, end) minute slots} for every date from first_day to last_day
+    
+    With NumPy the whole range is one occupancy bitmap, built from a single
+    busy query and masked with the working days. Without it each working
+    day is swept on its own.
+    """
+    days = (last_day - first_day).days + 1
+    
+    if np is not None:
+        return _range_slots_vectorized(schedule, first_day, days)
+    
+    slots = {}
+    for day in (first_day + timedelta(days=offset) for offset in range(days)):
+        slots[day] = available_slots(schedule, day) if is_working_day(schedule, day) else []
+    return slots
+
+def _minute_range(start, end):
+    """Return a bitmap with the bits of minutes [start, end) set"""
+    return ((1 << (end - start)) - 1) << start if end > start else 0
+
+def working_bitmap(schedule, first_day, days):
+    """Return a bitmap of the working minutes of consecutive days, bit 0 at the first midnight"""
+    window_start, window_end = working_window(schedule)
+    total = days * MINUTES_PER_DAY
+    bits = 0
+    
+    # Start a day early, a shift running past midnight reaches into the first day
+    for offset in range(-1, days):
+        if is_working_day(schedule, first_day + timedelta(days=offset)):
+            midnight = offset * MINUTES_PER_DAY
+            bits |= _minute_range(max(0, midnight + window_start), min(total, midnight + window_end))
+    
+    return bits
+
+def free_bitmap(schedule, first_day, days, busy):
+    """Return a bitmap of the minutes of consecutive days the schedule's user works and is not busy
+    
+    busy holds the user's [start, end) busy minutes after the first midnight.
+    """
+    total = days * MINUTES_PER_DAY
+    bits = working_bitmap(schedule, first_day, days)
+    
+    for start, end in busy:
+        bits &= ~_minute_range(max(0, start), min(total, end))
+    
+    return bits
+
+def day_bitmaps(schedules, first_day, days, versions):
+    """Return {user_id: the free_bitmap() of each of consecutive days} for several schedules
+    
+    Bitmaps are cached per user, day and data version, from versions; a
+    write to the user's calendar or schedule makes their cached days
+    unreachable. The days missing from the cache are computed together,
+    with one busy query for every user missing one.
+    """
+    cache = get_cache()
+    dates = [first_day + timedelta(days=offset) for offset in range(days)]
+    bitmaps = {}
+    keys = {}
+    
+    for schedule in schedules:
+        user_id = schedule.user_id
+        keys[user_id] = [f'free:{user_id}:{day.isoformat()}:{versions[user_id]}' for day in dates]
+        bitmaps[user_id] = [cache.get(key) if cache else None for key in keys[user_id]]
+    
+    missing = {
+        schedule.user_id: [offset for offset, bits in enumerate(bitmaps[schedule.user_id]) if bits is None]
+        for schedule in schedules
+    }
+    missing = {user_id: offsets for user_id, offsets in missing.items() if offsets}
+    if not missing:
+        return bitmaps
+    
+    first = min(offsets[0] for offsets in missing.values())
+    span = max(offsets[-1] for offsets in missing.values()) - first + 1
+    origin = datetime.combine(dates[first], datetime.min.time())
+    busy = busy_intervals_by_user(missing, origin, origin + timedelta(days=span))
+    
+    for schedule in schedules:
+        user_id = schedule.user_id
+        if user_id not in missing:
+            continue
+        
+        bits = free_bitmap(schedule, dates[first], span, busy[user_id])
+        for offset in missing[user_id]:
+            bitmaps[user_id][offset] = (bits >> ((offset - first) * MINUTES_PER_DAY)) & DAY_MASK
+            if cache:
+                cache.set(keys[user_id][offset], bitmaps[user_id][offset])
+    
+    return bitmaps
+
+def common_slot_starts(bitmaps, duration, step, limit):
+    """Return the earliest minutes at which every bitmap has duration free minutes in a row
+    
+    Starts are multiples of step. At most limit are returned.
+    """
+    common = bitmaps[0]
+    for bits in bitmaps[1:]:
+        common &= bits
+    
+    # Bit i of runs ends up set when bits i to i + covered - 1 of common all are,
+    # doubling covered with every shift
+    runs = common
+    covered = 1
+    while covered < duration and runs:
+        shift = min(covered, duration - covered)
+        runs &= runs >> shift
+        covered += shift
+    
+    # Bits at every multiple of step: (2^(step*n) - 1) / (2^step - 1) = 1 + 2^step + 2^(2*step) + ...
+    length = runs.bit_length()
+    count = -(-length // step)
+    runs &= ((1 << (step * count)) - 1) // ((1 << step) - 1)
+    
+    starts = []
+    while runs and len(starts) < limit:
+        lowest = runs & -runs
+        starts.append(lowest.bit_length() - 1)
+        runs ^= lowest
+    return starts
+
+def find_common_slots(schedules, versions, first_day, last_day, duration, step, limit, not_before=None):
+    """Return the earliest (start, end) datetimes from first_day to last_day every schedule's user is free
+    
+    Each user's free minutes come from their working hours minus their
+    events and meetings, as a bitmap per day; the bitmaps of all users are
+    intersected with a bitwise AND. versions maps user ids to their data
+    version. Slots starting before not_before are left out.
+    """
+    days = (last_day - first_day).days + 1
+    origin = datetime.combine(first_day, datetime.min.time())
+    bitmaps = []
+    
+    for user_bitmaps in day_bitmaps(schedules, first_day, days, versions).values():
+        bits = 0
+        for offset, day_bits in enumerate(user_bitmaps):
+            bits |= day_bits << (offset * MINUTES_PER_DAY)
+        bitmaps.append(bits)
+    
+    if not_before is not None and not_before > origin:
+        # Round up, a slot may not start in a minute that has begun
+        passed = -((origin - not_before) // timedelta(minutes=1))
+        bitmaps.append(~_minute_range(0, passed))
+    
+    return [
+        (origin + timedelta(minutes=start), origin + timedelta(minutes=start + duration))
+        for start in common_slot_starts(bitmaps, duration, step, limit)
+    ]
@@ -0,0 +1,303 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import insert, update, delete, bindparam
+from models.database import db
+from models.task import Task
+from models.event import Event
+from models.meeting import Meeting
+from services.data_versions import bump_version
+from services.range_cache import mark_changed, mark_span_changed
+from services.event_buckets import index_events, unindex_events
+from services.recurrence import InvalidRecurrence, recurrence_columns
+
+class InvalidBatch(ValueError):
+    """Raised for a batch with operations that do not validate, none of which were applied"""
+    
+    def __init__(self, message, errors=()):
+        super().__init__(message)
+        self.errors = list(errors)
+
+def _text(value):
+    if not isinstance(value, str):
+        raise ValueError('must be a string')
+    return value
+
+def _datetime(value):
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError('must be an ISO 8601 datetime')
+
+def _boolean(value):
+    if not isinstance(value, bool):
+        raise ValueError('must be true or false')
+    return value
+
+def _optional_text(value):
+    if value is not None and not isinstance(value, str):
+        raise ValueError('must be a string or null')
+    return value
+
+def _dates(value):
+    if value is not None and not isinstance(value, str) and not (
+        isinstance(value, list) and all(isinstance(item, str) for item in value)
+    ):
+        raise ValueError('must be a list of ISO 8601 datetimes')
+    return value
+
+def _minutes(value):
+    if not isinstance(value, int) or isinstance(value, bool) or value <= 0:
+        raise ValueError('must be a positive number of minutes')
+    return value
+
+# Fields a batch item may set, with the parser of their JSON value
+BATCH_FIELDS = {
+    Task: {'title': _text, 'description': _text, 'date': _datetime, 'completed': _boolean, 'assigned_to': _text,
+           'source': _text},
+    Event: {'title': _text, 'description': _text, 'start_date': _datetime, 'end_date': _datetime, 'location': _text,
+            'rrule': _optional_text, 'exdates': _dates, 'rrule_timezone': _optional_text, 'source': _text},
+    Meeting: {'title': _text, 'description': _text, 'date': _datetime, 'duration': _minutes, 'platform': _text,
+              'participants': _text, 'rrule': _optional_text, 'exdates': _dates, 'rrule_timezone': _optional_text,
+              'source': _text}
+}
+
+# Fields a create needs, which an update may not clear either
+REQUIRED_FIELDS = {
+    Task: ('title', 'date'),
+    Event: ('title', 'start_date', 'end_date'),
+    Meeting: ('title', 'date', 'duration', 'platform')
+}
+
+# Values of the optional fields a create leaves out, as POST does
+CREATE_DEFAULTS = {
+    Task: {'description': '', 'completed': False, 'assigned_to': '', 'source': 'local'},
+    Event: {'description': '', 'location': '', 'source': 'local'},
+    Meeting: {'description': '', 'participants': '', 'source': 'local'}
+}
+
+# Fields only a create may set
+CREATE_ONLY_FIELDS = ('source',)
+
+# Other names the frontend sends fields under
+FIELD_ALIASES = {Task: {'assignedTo': 'assigned_to'}}
+
+# Fields the series columns of a recurring entry are computed from
+SERIES_INPUTS = {
+    Event: ('start_date', 'end_date', 'rrule', 'exdates', 'rrule_timezone'),
+    Meeting: ('date', 'duration', 'rrule', 'exdates', 'rrule_timezone')
+}
+
+def _mark_changed(user_id, model, values):
+    """Invalidate the cached ranges a row with these column values shows up in"""
+    if values.get('rrule_until'):
+        start = values['start_date'] if model is Event else values['date']
+        mark_span_changed(user_id, model, start, values['rrule_until'])
+    elif model is Event:
+        mark_span_changed(user_id, model, values['start_date'], values['end_date'])
+    else:
+        mark_changed(user_id, model, values['date'])
+
+def _parse_item(model, item, creating):
+    """Return the column values of a create or update item, raising ValueError for an invalid one"""
+    if not isinstance(item, dict):
+        raise ValueError('Item must be an object')
+    
+    aliases = FIELD_ALIASES.get(model, {})
+    values = {}
+    
+    for key, value in item.items():
+        field = aliases.get(key, key)
+        if field == 'id' and not creating:
+            continue
+        if field not in BATCH_FIELDS[model] or (field in CREATE_ONLY_FIELDS and not creating):
+            raise ValueError(f'Unknown field: {key}')
+        try:
+            values[field] = BATCH_FIELDS[model][field](value)
+        except ValueError as e:
+            raise ValueError(f'{key} {e}')
+    
+    for field in REQUIRED_FIELDS[model]:
+        if (creating or field in values) and not values.get(field):
+            raise ValueError(f'{field} is required')
+    
+    if creating:
+        values = dict(CREATE_DEFAULTS[model], **values)
+    return values
+
+def _series_columns(model, row):
+    """Return the series columns of a row's values, raising InvalidRecurrence for an unusable rule"""
+    if model is Event:
+        start, length = row['start_date'], row['end_date'] - row['start_date']
+    else:
+        start, length = row['date'], timedelta(minutes=row['duration'])
+    return recurrence_columns(start, length, row.get('rrule'), row.get('exdates'), row.get('rrule_timezone'))
+
+def _item_id(item):
+    """Return the id an update or delete item targets"""
+    row_id = item.get('id') if isinstance(item, dict) else item
+    if not isinstance(row_id, int) or isinstance(row_id, bool):
+        raise ValueError('id must be an integer')
+    return row_id
+
+def parse_batch(model, data):
+    """Validate a batch body of create, update and delete lists
+    
+    Returns (creates, updates, deletes): the column values of every create,
+    (id, changed values) of every update and the ids to delete. Raises
+    InvalidBatch listing every invalid item.
+    """
+    if not isinstance(data, dict):
+        raise InvalidBatch('Expected an object with create, update and delete lists')
+    
+    operations = {op: data.get(op) or [] for op in ('create', 'update', 'delete')}
+    if not all(isinstance(items, list) for items in operations.values()):
+        raise InvalidBatch('create, update and delete must be lists')
+    
+    total = sum(len(items) for items in operations.values())
+    if total > current_app.config['BATCH_MAX_ITEMS']:
+        raise InvalidBatch(f"Batches are limited to {current_app.config['BATCH_MAX_ITEMS']} items")
+    
+    errors = []
+    creates = []
+    updates = []
+    deletes = []
+    seen = set()
+    
+    for op, items in operations.items():
+        for index, item in enumerate(items):
+            try:
+                if op == 'create':
+                    creates.append(_parse_item(model, item, creating=True))
+                    continue
+                
+                row_id = _item_id(item)
+                if row_id in seen:
+                    raise ValueError(f'id {row_id} appears more than once')
+                seen.add(row_id)
+                
+                if op == 'update':
+                    updates.append((row_id, _parse_item(model, item, creating=False)))
+                else:
+                    deletes.append(row_id)
+            except ValueError as e:
+                errors.append({"op": op, "index": index, "error": str(e)})
+    
+    if errors:
+        raise InvalidBatch('Invalid batch', errors)
+    return creates, updates, deletes
+
+def _bulk_update(model, rows):
+    """Update many rows by primary key, one executemany statement per set of changed columns"""
+    table = model.__table__
+    groups = {}
+    
+    for row_id, values in rows:
+        groups.setdefault(tuple(sorted(values)), []).append((row_id, values))
+    
+    for fields, group in groups.items():
+        statement = update(table).where(table.c.id == bindparam('_id')).values(
+            {field: bindparam(f'_{field}') for field in fields}
+        )
+        db.session.execute(statement, [
+            {'_id': row_id, **{f'_{field}': values[field] for field in fields}} for row_id, values in group
+        ])
+
+def apply_batch(model, user_id, data, prepare=None):
+    """Validate a batch of creates, updates and deletes of a user's rows and write it with bulk statements
+    
+    Every item is validated, and the rows to update or delete are looked up
+    with one query, before anything is written; one invalid item rejects the
+    whole batch with InvalidBatch. prepare(values, stored) may add columns to
+    the values of a create (stored is None) or an update (stored holds the
+    row's current values). Updates go out as executemany statements and
+    deletes as one statement. Creates are inserted one statement each so
+    their ids can be returned. The caller commits.
+    
+    Returns the per-item results, in request order within each operation.
+    """
+    creates, updates, deletes = parse_batch(model, data)
+    
+    # Current values of the rows the batch touches, which must belong to the user
+    fields = tuple(BATCH_FIELDS[model]) + (('rrule_until',) if model in SERIES_INPUTS else ())
+    ids = [row_id for row_id, _ in updates] + deletes
+    stored = {}
+    if ids:
+        rows = db.session.query(model.id, *[getattr(model, field) for field in fields]).filter(
+            model.user_id == user_id,
+            model.id.in_(ids)
+        )
+        stored = {row[0]: dict(zip(fields, row[1:])) for row in rows}
+    
+    errors = [
+        {"op": op, "index": index, "error": f'{model.__name__} {row_id} not found'}
+        for op, row_ids in (('update', [row_id for row_id, _ in updates]), ('delete', deletes))
+        for index, row_id in enumerate(row_ids) if row_id not in stored
+    ]
+    if errors:
+        raise InvalidBatch('Invalid batch', errors)
+    
+    # Series columns follow the start, length and rule of every create and of updates changing them
+    if model in SERIES_INPUTS:
+        for op, index, values, current in [
+            ('create', index, values, {}) for index, values in enumerate(creates)
+        ] + [
+            ('update', index, values, stored[row_id]) for index, (row_id, values) in enumerate(updates)
+            if any(field in values for field in SERIES_INPUTS[model])
+        ]:
+            try:
+                values.update(_series_columns(model, dict(current, **values)))
+            except InvalidRecurrence as e:
+                errors.append({"op": op, "index": index, "error": str(e)})
+        
+        if errors:
+            raise InvalidBatch('Invalid batch', errors)
+    
+    table = model.__table__
+    created = []
+    
+    for values in creates:
+        if prepare:
+            prepare(values, None)
+        row = dict(values, user_id=user_id)
+        created.append(db.session.execute(insert(table).values(row)).inserted_primary_key[0])
+        _mark_changed(user_id, model, row)
+    
+    for row_id, values in updates:
+        if prepare:
+            prepare(values, stored[row_id])
+        # The cached ranges a row leaves are invalidated as well as the ones it moves to
+        _mark_changed(user_id, model, stored[row_id])
+        _mark_changed(user_id, model, dict(stored[row_id], **values))
+    
+    if updates:
+        _bulk_update(model, [(row_id, values) for row_id, values in updates if values])
+    
+    if deletes:
+        for row_id in deletes:
+            _mark_changed(user_id, model, stored[row_id])
+        if model is Event:
+            unindex_events(deletes)
+        db.session.execute(delete(table).where(table.c.id.in_(deletes)))
+    
+    # Keep the time buckets of created and moved events in step
+    if model is Event:
+        moved = [
+            (row_id, values) for row_id, values in updates
+            if 'start_date' in values or 'end_date' in values
+        ]
+        index_events(user_id, [
+            (row_id, values['start_date'], values['end_date'])
+            for row_id, values in zip(created, creates)
+        ] + [
+            (row_id, values.get('start_date', stored[row_id]['start_date']), values.get('end_date', stored[row_id]['end_date']))
+            for row_id, values in moved
+        ])
+    
+    if creates or updates or deletes:
+        bump_version(user_id)
+    
+    return {
+        "create": [{"id": row_id, "status": 201} for row_id in created],
+        "update": [{"id": row_id, "status": 200} for row_id, _ in updates],
+        "delete": [{"id": row_id, "status": 200} for row_id in deletes]
+    }
@@ -0,0 +1,79 @@
+from datetime import datetime
+from functools import wraps
+from flask import request, make_response, g
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from models.database import db
+from models.user_data_version import UserDataVersion
+
+def get_version(user_id):
+    """Return the data version of a user, 0 before their first write"""
+    version = db.session.query(UserDataVersion.version).filter_by(user_id=user_id).scalar()
+    return version or 0
+
+def get_versions(user_ids):
+    """Return {user_id: data version} of several users in one query"""
+    versions = dict.fromkeys(user_ids, 0)
+    versions.update(db.session.query(UserDataVersion.user_id, UserDataVersion.version).filter(
+        UserDataVersion.user_id.in_(versions)
+    ).all())
+    return versions
+
+def bump_version(user_id):
+    """Increment the data version of a user in the current transaction
+    
+    Call it next to every write to the user's tasks, events, meetings or
+    schedule so it commits together with the change. The increment runs in
+    the database, so concurrent writers never hand out the same version.
+    """
+    table = UserDataVersion.__table__
+    statement = update(table).where(table.c.user_id == user_id).values(
+        version=table.c.version + 1,
+        updated_at=datetime.utcnow()
+    )
+    
+    if db.session.execute(statement).rowcount:
+        return
+    
+    # First write of the user; another writer may create the row at the same time
+    try:
+        with db.session.begin_nested():
+            db.session.add(UserDataVersion(user_id=user_id, version=1))
+    except IntegrityError:
+        db.session.execute(statement)
+
+def make_etag(user_id, version):
+    """Build the entity tag of a user's data at a version"""
+    return f'{user_id}-{version}'
+
+def versioned(view):
+    """Answer a read endpoint with 304 Not Modified while the user's data version is unchanged
+    
+    The version is read before the view runs, so a write landing in between
+    can only make the ETag older than the data, never newer. A matching
+    If-None-Match costs one primary key lookup and the view is not called.
+    The version is left in g.data_version for the view. Use below
+    @jwt_required().
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        user_id = get_jwt_identity()
+        g.data_version = get_version(user_id)
+        etag = make_etag(user_id, g.data_version)
+        
+        if request.if_none_match.contains_weak(etag):
+            response = make_response('', 304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        
+        # Let the client keep the body but revalidate it on every request.
+        # A view answering from a cache has set the version of its body.
+        if not response.get_etag()[0]:
+            response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    
+    return wrapper
@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, delete, union_all, or_, event, inspect
+from models.database import db
+from models.event import Event
+from models.event_time_bucket import EventTimeBucket
+
+EPOCH = datetime(1970, 1, 1)
+BUCKET_WIDTH = timedelta(days=1)
+
+# Events spanning more buckets than this get a single row in LONG_BUCKET,
+# which every overlap query reads, instead of one row per day
+MAX_EVENT_BUCKETS = 62
+LONG_BUCKET = -2 ** 31
+
+def bucket_of(moment):
+    """Return the bucket number of a naive UTC datetime"""
+    return (moment - EPOCH) // BUCKET_WIDTH
+
+def event_buckets(start, end):
+    """Return the buckets an event from start to end is indexed under"""
+    first = bucket_of(start)
+    last = bucket_of(max(start, end))
+    
+    if last - first >= MAX_EVENT_BUCKETS:
+        return [LONG_BUCKET]
+    return list(range(first, last + 1))
+
+def _bucket_rows(user_id, event_id, start, end):
+    return [{'user_id': user_id, 'bucket': bucket, 'event_id': event_id} for bucket in event_buckets(start, end)]
+
+def index_events(user_id, events):
+    """Write the bucket rows of (id, start, end) events, replacing any they had
+    
+    Events written through the ORM are indexed on flush. Call this for the
+    ones written with bulk statements, after they got their ids, in the
+    same transaction. The caller commits.
+    """
+    events = list(events)
+    if not events:
+        return
+    
+    unindex_events([event_id for event_id, _, _ in events])
+    db.session.execute(insert(EventTimeBucket.__table__), [
+        row for event_id, start, end in events for row in _bucket_rows(user_id, event_id, start, end)
+    ])
+
+def unindex_events(event_ids):
+    """Delete the bucket rows of events, before deleting them with a bulk statement"""
+    if event_ids:
+        db.session.execute(delete(EventTimeBucket.__table__).where(EventTimeBucket.event_id.in_(event_ids)))
+
+def overlap_filter(user_id, start=None, end=None):
+    """Return the criteria selecting a user's events that overlap [start, end)
+    
+    user_id can also be a list, for the events of several users. Either
+    bound can be None for an open range. Candidates come from the
+    bucket index, which only reads the buckets of the range plus the long
+    events, and are then checked exactly against start < end and end > start.
+    Zero-length events count when they start inside the range.
+    
+    The bucket rows already belong to the user. Do not filter events on
+    user_id as well: the planner would walk the (user_id, start_date) index
+    over every event starting before end instead of the candidates.
+    """
+    if isinstance(user_id, (list, tuple, set)):
+        owner = EventTimeBucket.user_id.in_(user_id)
+    else:
+        owner = EventTimeBucket.user_id == user_id
+    
+    window = [owner]
+    if start:
+        window.append(EventTimeBucket.bucket >= bucket_of(start))
+    if end:
+        window.append(EventTimeBucket.bucket <= bucket_of(end))
+    
+    # Two index range reads; an OR of them would only use the user_id prefix
+    candidates = union_all(
+        select(EventTimeBucket.event_id).where(*window),
+        select(EventTimeBucket.event_id).where(owner, EventTimeBucket.bucket == LONG_BUCKET)
+    )
+    
+    criteria = [Event.id.in_(candidates)]
+    if start:
+        criteria.append(or_(Event.end_date > start, Event.start_date >= start))
+    if end:
+        criteria.append(Event.start_date < end)
+    return criteria
+
+def rebuild_event_buckets(chunk_size=1000):
+    """Re-index every stored event, e.g. for a database created before the bucket table"""
+    db.session.execute(delete(EventTimeBucket.__table__))
+    
+    last_id = 0
+    while True:
+        rows = db.session.query(Event.id, Event.user_id, Event.start_date, Event.end_date).filter(
+            Event.id > last_id
+        ).order_by(Event.id).limit(chunk_size).all()
+        if not rows:
+            break
+        
+        db.session.execute(insert(EventTimeBucket.__table__), [
+            row for event_id, user_id, start, end in rows for row in _bucket_rows(user_id, event_id, start, end)
+        ])
+        last_id = rows[-1].id
+    
+    db.session.commit()
+
+@event.listens_for(Event, 'after_insert')
+def _index_inserted_event(mapper, connection, target):
+    connection.execute(
+        insert(EventTimeBucket.__table__),
+        _bucket_rows(target.user_id, target.id, target.start_date, target.end_date)
+    )
+
+@event.listens_for(Event, 'after_update')
+def _index_updated_event(mapper, connection, target):
+    state = inspect(target)
+    if not (state.attrs.start_date.history.has_changes() or state.attrs.end_date.history.has_changes()):
+        return
+    
+    table = EventTimeBucket.__table__
+    connection.execute(delete(table).where(table.c.event_id == target.id))
+    connection.execute(insert(table), _bucket_rows(target.user_id, target.id, target.start_date, target.end_date))
+
+@event.listens_for(Event, 'before_delete')
+def _unindex_deleted_event(mapper, connection, target):
+    table = EventTimeBucket.__table__
+    connection.execute(delete(table).where(table.c.event_id == target.id))
@@ -0,0 +1,220 @@
+import csv
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from flask import current_app
+from sqlalchemy import or_
+from models.database import db
+from models.task import Task
+from models.event import Event
+from models.meeting import Meeting
+from services.serialization import LIST_FIELDS, dumps
+
+# Entry types an export can hold, in the order they are written
+EXPORT_TYPES = ('events', 'meetings', 'tasks')
+
+EXPORT_MODELS = {'events': Event, 'meetings': Meeting, 'tasks': Task}
+
+# Format name -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'ics': ('text/calendar', 'ics'),
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson')
+}
+
+# Columns of a CSV export, the union of every entry type's
+CSV_COLUMNS = ('type', 'id', 'title', 'description', 'start', 'end', 'location', 'duration', 'platform',
+               'meeting_link', 'participants', 'completed', 'assigned_to', 'rrule', 'exdates', 'rrule_timezone',
+               'source', 'created_at', 'updated_at')
+
+# Bytes gathered before a chunk of the response is sent
+BUFFER_BYTES = 64 * 1024
+
+# Longest ICS content line in octets before it is folded
+ICS_LINE_OCTETS = 75
+
+def export_rows(model, user_id, start=None, end=None):
+    """Stream the list columns of a user's entries of one type in [start, end), in start order
+    
+    Rows are fetched yield_per EXPORT_CHUNK_SIZE at a time, with a
+    server-side cursor where the driver has one, so a multi-year export
+    never holds more than a chunk. Events are included while they overlap
+    the range and read along the (user_id, start_date) index, like tasks
+    and meetings along (user_id, date). Recurring series are exported once,
+    as their master with its rule, when any occurrence can fall in the range.
+    """
+    fields = LIST_FIELDS[model] + (('source_id',) if model is not Task else ())
+    start_column = Event.start_date if model is Event else model.date
+    
+    query = db.session.query(*[getattr(model, field) for field in fields]).filter(model.user_id == user_id)
+    if start:
+        if model is Event:
+            query = query.filter(or_(Event.end_date > start, Event.start_date >= start, Event.rrule_until >= start))
+        elif model is Meeting:
+            query = query.filter(or_(Meeting.date >= start, Meeting.rrule_until >= start))
+        else:
+            query = query.filter(start_column >= start)
+    if end:
+        query = query.filter(start_column < end)
+    
+    for row in query.order_by(start_column, model.id).yield_per(current_app.config['EXPORT_CHUNK_SIZE']):
+        yield dict(zip(fields, row))
+
+def _kind(entry_type):
+    """Return the singular type tag of an export type, e.g. 'event'"""
+    return entry_type[:-1]
+
+def ndjson_lines(entries):
+    """Encode (type, row) entries as one JSON object per line"""
+    for entry_type, row in entries:
+        row.pop('source_id', None)
+        yield dumps(dict(row, type=_kind(entry_type))) + b'\n'
+
+class _Echo:
+    """File-like object handing back what csv.writer writes, to emit one row at a time"""
+    
+    def write(self, value):
+        return value
+
+def csv_lines(entries):
+    """Encode (type, row) entries as CSV rows under a header of every entry type's columns"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_COLUMNS).encode()
+    
+    for entry_type, row in entries:
+        start = row.get('start_date') or row.get('date')
+        end = row.get('end_date')
+        if end is None and row.get('duration') is not None:
+            end = start + timedelta(minutes=row['duration'])
+        
+        values = dict(row, type=_kind(entry_type), start=start, end=end)
+        yield writer.writerow([
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for value in (values.get(column) for column in CSV_COLUMNS)
+        ]).encode()
+
+def _ics_text(value):
+    """Escape a TEXT property value"""
+    return (value or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n')
+
+def _ics_time(value):
+    """Format a naive UTC datetime as an ICS UTC DATE-TIME"""
+    return value.strftime('%Y%m%dT%H%M%SZ')
+
+def _ics_series_time(name, value, row):
+    """Format a start or end property; a series with a zone is written in its wall-clock time so it repeats there"""
+    if not row.get('rrule_timezone'):
+        return f'{name}:{_ics_time(value)}'
+    
+    local = value.replace(tzinfo=timezone.utc).astimezone(ZoneInfo(row['rrule_timezone']))
+    return f"{name};TZID={row['rrule_timezone']}:{local:%Y%m%dT%H%M%S}"
+
+def _ics_recurrence(row):
+    """Return the RRULE and EXDATE lines of a recurring event's master"""
+    if not row.get('rrule'):
+        return []
+    
+    lines = [f"RRULE:{row['rrule']}"]
+    if row['exdates']:
+        exdates = [datetime.fromisoformat(value) for value in row['exdates'].split(',')]
+        lines += [_ics_series_time('EXDATE', value, row) for value in exdates]
+    return lines
+
+def _fold(line):
+    """Fold a content line at 75 octets, continuing on lines that start with a space"""
+    data = line.encode()
+    if len(data) <= ICS_LINE_OCTETS:
+        return data + b'\r\n'
+    
+    parts = []
+    while data:
+        size = ICS_LINE_OCTETS if not parts else ICS_LINE_OCTETS - 1
+        # Never split inside a UTF-8 sequence
+        while size < len(data) and (data[size] & 0xC0) == 0x80:
+            size -= 1
+        parts.append(data[:size])
+        data = data[size:]
+    return b'\r\n '.join(parts) + b'\r\n'
+
+def _uid(entry_type, row, host):
+    """Return the UID of an entry; imported ones keep theirs so a re-import matches them"""
+    if row.get('source') == 'ics' and row.get('source_id'):
+        return row['source_id']
+    return f"{_kind(entry_type)}-{row['id']}@{host}"
+
+def ics_lines(entries, host):
+    """Encode (type, row) entries as an iCalendar stream: events and meetings as VEVENTs, tasks as VTODOs"""
+    yield b'BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//calendar-app//export//EN\r\n'
+    
+    for entry_type, row in entries:
+        lines = ['BEGIN:VTODO' if entry_type == 'tasks' else 'BEGIN:VEVENT']
+        lines.append(f'UID:{_uid(entry_type, row, host)}')
+        lines.append(f"DTSTAMP:{_ics_time(row['updated_at'] or row['created_at'])}")
+        
+        if entry_type == 'events':
+            lines.append(_ics_series_time('DTSTART', row['start_date'], row))
+            lines.append(_ics_series_time('DTEND', row['end_date'], row))
+            lines += _ics_recurrence(row)
+            if row['location']:
+                lines.append(f"LOCATION:{_ics_text(row['location'])}")
+        elif entry_type == 'meetings':
+            lines.append(_ics_series_time('DTSTART', row['date'], row))
+            lines.append(f"DURATION:PT{row['duration']}M")
+            lines += _ics_recurrence(row)
+            if row['meeting_link']:
+                lines.append(f"CONFERENCE;VALUE=URI:{row['meeting_link']}")
+            lines += [f'ATTENDEE:mailto:{email.strip()}' for email in (row['participants'] or '').split(',') if email.strip()]
+        else:
+            lines.append(f"DUE:{_ics_time(row['date'])}")
+            lines.append('STATUS:COMPLETED' if row['completed'] else 'STATUS:NEEDS-ACTION')
+        
+        lines.append(f"SUMMARY:{_ics_text(row['title'])}")
+        if row['description']:
+            lines.append(f"DESCRIPTION:{_ics_text(row['description'])}")
+        lines.append('END:VTODO' if entry_type == 'tasks' else 'END:VEVENT')
+        
+        yield b''.join(_fold(line) for line in lines)
+    
+    yield b'END:VCALENDAR\r\n'
+
+def buffered(chunks):
+    """Join small byte chunks into ones of about BUFFER_BYTES
+    
+    The first chunk, the header or the first row, is passed on as it comes
+    so the response starts without waiting for a full buffer.
+    """
+    buffer = []
+    size = 0
+    
+    for index, chunk in enumerate(chunks):
+        if index == 0:
+            yield chunk
+            continue
+        
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= BUFFER_BYTES:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+    
+    if buffer:
+        yield b''.join(buffer)
+
+def export_calendar(user_id, export_format, types=EXPORT_TYPES, start=None, end=None, host='calendar-app'):
+    """Return a generator of the bytes of a user's export in one of EXPORT_FORMATS
+    
+    Nothing is read before the generator is iterated; each entry type is
+    then streamed from the database in turn. Wrap it in
+    stream_with_context() so the session outlives the view.
+    """
+    entries = (
+        (entry_type, row)
+        for entry_type in types
+        for row in export_rows(EXPORT_MODELS[entry_type], user_id, start, end)
+    )
+    
+    if export_format == 'ics':
+        return buffered(ics_lines(entries, host))
+    if export_format == 'csv':
+        return buffered(csv_lines(entries))
+    return buffered(ndjson_lines(entries))
@@ -2,7 +2,12 @@ import requests
 from flask import current_app
 import json
 import base64
-import re
+from datetime import datetime, timedelta
+from services import http_client
+from services.sync_service import SyncCursor, SyncFetchError
+from services.normalization import normalize_gmail_event
+
+GOOGLE_EVENTS_URL = "https://www.googleapis.com/calendar/v3/calendars/primary/events"
 
 def get_gmail_auth_url(user_id):
     """Generate the authorization URL for Google Calendar API"""
@@ -34,7 +39,11 @@ def get_gmail_token(code):
         "grant_type": "authorization_code"
     }
     
-    response = requests.post(token_url, data=data)
+    try:
+        response = http_client.post(token_url, data=data)
+    except requests.RequestException:
+        # Handle error
+        return None
     
     if response.status_code == 200:
         return json.dumps(response.json())
@@ -55,7 +64,11 @@ def refresh_gmail_token(refresh_token):
         "grant_type": "refresh_token"
     }
     
-    response = requests.post(token_url, data=data)
+    try:
+        response = http_client.post(token_url, data=data)
+    except requests.RequestException:
+        # Handle error
+        return None
     
     if response.status_code == 200:
         return json.dumps(response.json())
@@ -63,23 +76,27 @@ def refresh_gmail_token(refresh_token):
         # Handle error
         return None
 
-def get_gmail_events(token_json):
-    """Fetch calendar events from Google Calendar"""
-    token_data = json.loads(token_json)
-    access_token = token_data.get('access_token')
+def _start_full_gmail_sync(cursor):
+    """Switch the cursor to a full fetch of the sync window and return its query"""
+    now = datetime.utcnow()
+    cursor.start_full_sync(now, now + timedelta(days=current_app.config['SYNC_WINDOW_DAYS']))
     
-    if not access_token:
-        # Try to refresh token if no access token
-        refresh_token = token_data.get('refresh_token')
-        if refresh_token:
-            new_token_json = refresh_gmail_token(refresh_token)
-            if new_token_json:
-                token_data = json.loads(new_token_json)
-                access_token = token_data.get('access_token')
-            else:
-                return []
-        else:
-            return []
+    # Recurring series come as their masters, expanded when they are read
+    return {
+        'timeMin': cursor.window_start.isoformat() + 'Z',
+        'timeMax': cursor.window_end.isoformat() + 'Z'
+    }
+
+def get_gmail_events(access_token, cursor=None):
+    """Yield calendar events from Google Calendar, following every page
+    
+    With a cursor holding a sync token only the changes since that token are
+    fetched, including deletions. An expired token (410 Gone) falls back to a
+    full fetch of the sync window. Once the last page is read the next sync
+    token is recorded on the cursor and it is marked complete.
+    Raises SyncFetchError when a page cannot be read.
+    """
+    cursor = cursor or SyncCursor()
     
     # Get events from Google Calendar API
     headers = {
@@ -87,82 +104,35 @@ def get_gmail_events(token_json):
         "Content-Type": "application/json"
     }
     
-    # Get events for the next 30 days
-    from datetime import datetime, timedelta
-    now = datetime.utcnow()
-    time_min = now.isoformat() + 'Z'
-    time_max = (now + timedelta(days=30)).isoformat() + 'Z'
-    
-    url = f"https://www.googleapis.com/calendar/v3/calendars/primary/events?timeMin={time_min}&timeMax={time_max}&singleEvents=true"
-    
-    response = requests.get(url, headers=headers)
-    
-    if response.status_code == 200:
-        events_data = response.json().get('items', [])
+    if cursor.token:
+        params = {'syncToken': cursor.token}
+    else:
+        params = _start_full_gmail_sync(cursor)
+    params['maxResults'] = current_app.config['SYNC_PAGE_SIZE']
+    
+    while True:
+        try:
+            response = http_client.get(GOOGLE_EVENTS_URL, headers=headers, params=params)
+        except requests.RequestException as e:
+            raise SyncFetchError(f"Google Calendar request failed: {e}") from e
         
-        # Transform to our format
-        events = []
-        for event in events_data:
-            # Check if it's a meeting (has conferencing data)
-            is_meeting = 'conferenceData' in event
-            
-            # Extract meeting link if available
-            meeting_link = ''
-            if is_meeting:
-                for entry_point in event.get('conferenceData', {}).get('entryPoints', []):
-                    if entry_point.get('entryPointType') == 'video':
-                        meeting_link = entry_point.get('uri', '')
-                        break
-            
-            # Check description for meeting links if not found in conferenceData
-            if not meeting_link and event.get('description'):
-                # Look for Zoom or Teams links in description
-                zoom_pattern = r'https://[a-zA-Z0-9.-]+\.zoom\.us/[a-zA-Z0-9/?.=&-]+'
-                teams_pattern = r'https://teams\.microsoft\.com/[a-zA-Z0-9/?.=&-]+'
-                
-                zoom_match = re.search(zoom_pattern, event.get('description', ''))
-                teams_match = re.search(teams_pattern, event.get('description', ''))
-                
-                if zoom_match:
-                    meeting_link = zoom_match.group(0)
-                    is_meeting = True
-                elif teams_match:
-                    meeting_link = teams_match.group(0)
-                    is_meeting = True
-            
-            event_dict = {
-                'id': event.get('id'),
-                'summary': event.get('summary', 'No Subject'),
-                'description': event.get('description', ''),
-                'start_time': event.get('start', {}).get('dateTime', event.get('start', {}).get('date')),
-                'end_time': event.get('end', {}).get('dateTime', event.get('end', {}).get('date')),
-                'location': event.get('location', ''),
-                'is_meeting': is_meeting,
-                'meeting_link': meeting_link
-            }
-            
-            # Calculate duration in minutes
-            try:
-                start_time = datetime.fromisoformat(event_dict['start_time'].replace('Z', '+00:00'))
-                end_time = datetime.fromisoformat(event_dict['end_time'].replace('Z', '+00:00'))
-                duration = int((end_time - start_time).total_seconds() / 60)
-                event_dict['duration'] = duration
-            except:
-                event_dict['duration'] = 30  # Default duration
-            
-            # Get attendees
-            attendees = []
-            for attendee in event.get('attendees', []):
-                email = attendee.get('email')
-                if email:
-                    attendees.append(email)
-            
-            event_dict['attendees'] = ','.join(attendees)
-            
-            events.append(event_dict)
+        if response.status_code == 410 and not cursor.full_sync:
+            # Sync token expired, start over with a full fetch
+            params = _start_full_gmail_sync(cursor)
+            params['maxResults'] = current_app.config['SYNC_PAGE_SIZE']
+            continue
         
-        return events
-    else:
-        # Handle error
-        return []
-
+        if response.status_code != 200:
+            raise SyncFetchError(f"Google Calendar returned {response.status_code}: {response.text[:200]}")
+        
+        data = response.json()
+        for event in data.get('items', []):
+            yield normalize_gmail_event(event)
+        
+        page_token = data.get('nextPageToken')
+        if not page_token:
+            cursor.next_token = data.get('nextSyncToken')
+            cursor.complete = True
+            return
+        
+        params['pageToken'] = page_token
@@ -0,0 +1,134 @@
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, ResponseError
+from urllib3.util.retry import Retry
+from flask import current_app, has_app_context
+
+# Used outside an app context, e.g. by scripts driving the services directly
+DEFAULT_SETTINGS = {
+    'PROVIDER_HTTP_POOL_MAXSIZE': 10,
+    'PROVIDER_HTTP_CONNECT_TIMEOUT': 3.05,
+    'PROVIDER_HTTP_READ_TIMEOUT': 30,
+    'PROVIDER_HTTP_MAX_RETRIES': 3,
+    'PROVIDER_HTTP_BACKOFF_FACTOR': 0.5,
+    'PROVIDER_HTTP_MAX_RETRY_AFTER': 30,
+    'PROVIDER_URL_OVERRIDES': {}
+}
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+class ProviderRetry(Retry):
+    """Retry policy for provider APIs
+    
+    Idempotent requests are retried on 429 and 5xx responses. Other requests,
+    such as creating a meeting, are only replayed on 429 since the provider
+    rejected them without doing any work. Retry-After is honored in both cases
+    up to max_retry_after seconds; a response asking for a longer wait is
+    handed back to the caller instead of holding its thread.
+    """
+    
+    def __init__(self, *args, max_retry_after=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_retry_after = max_retry_after
+    
+    def new(self, **kwargs):
+        retry = super().new(**kwargs)
+        retry.max_retry_after = self.max_retry_after
+        return retry
+    
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        retry_after = self.get_retry_after(response) if response is not None else None
+        if retry_after is not None and self.max_retry_after is not None and retry_after > self.max_retry_after:
+            # Ends the retries; without raise_on_status urllib3 returns this response
+            raise MaxRetryError(_pool, url, ResponseError(f'Retry-After of {retry_after:.0f}s is too long'))
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+    
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if self.total and status_code == 429:
+            return True
+        return super().is_retry(method, status_code, has_retry_after)
+
+def _setting(name):
+    """Read an HTTP client setting from the app config, falling back to the defaults"""
+    if has_app_context():
+        return current_app.config.get(name, DEFAULT_SETTINGS[name])
+    return DEFAULT_SETTINGS[name]
+
+def _create_session():
+    """Create a session with a keep-alive connection pool and the retry policy"""
+    retry = ProviderRetry(
+        total=_setting('PROVIDER_HTTP_MAX_RETRIES'),
+        backoff_factor=_setting('PROVIDER_HTTP_BACKOFF_FACTOR'),
+        status_forcelist=RETRY_STATUS_CODES,
+        respect_retry_after_header=True,
+        max_retry_after=_setting('PROVIDER_HTTP_MAX_RETRY_AFTER'),
+        raise_on_status=False  # Hand the last response back to the caller
+    )
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=_setting('PROVIDER_HTTP_POOL_MAXSIZE'),
+        max_retries=retry
+    )
+    
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def get_session(url):
+    """Return the pooled session for the host of a URL"""
+    parts = urlsplit(url)
+    key = (parts.scheme, parts.netloc)
+    
+    session = _sessions.get(key)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = _sessions[key] = _create_session()
+    
+    return session
+
+def _rewrite_url(url):
+    """Point a provider URL at the origin configured in PROVIDER_URL_OVERRIDES, if any"""
+    overrides = _setting('PROVIDER_URL_OVERRIDES')
+    if not overrides:
+        return url
+    
+    parts = urlsplit(url)
+    origin = f'{parts.scheme}://{parts.netloc}'
+    if origin in overrides:
+        return overrides[origin] + url[len(origin):]
+    return url
+
+def request(method, url, **kwargs):
+    """Send a request through the pooled session for its host
+    
+    A (connect, read) timeout is applied unless the caller passes one.
+    """
+    url = _rewrite_url(url)
+    kwargs.setdefault('timeout', (
+        _setting('PROVIDER_HTTP_CONNECT_TIMEOUT'),
+        _setting('PROVIDER_HTTP_READ_TIMEOUT')
+    ))
+    return get_session(url).request(method, url, **kwargs)
+
+def get(url, **kwargs):
+    """Send a GET request to a provider API"""
+    return request('GET', url, **kwargs)
+
+def post(url, **kwargs):
+    """Send a POST request to a provider API"""
+    return request('POST', url, **kwargs)
+
+def close_sessions():
+    """Close every pooled session, e.g. before a worker process forks"""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -0,0 +1,337 @@
+import hashlib
+import logging
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from flask import current_app
+from models.database import db
+from services.normalization import NormalizedEvent, DEFAULT_TITLE, DEFAULT_DURATION, find_meeting_link
+from services.sync_service import apply_sync_batch, iter_chunks
+
+logger = logging.getLogger(__name__)
+
+# Source the imported rows are stored under, so re-imports match them by UID
+ICS_SOURCE = 'ics'
+
+# Longest content line kept, folded or not; the rest of a longer line is dropped
+MAX_LINE_BYTES = 64 * 1024
+
+# Properties that carry a meeting's join link, in order of preference
+CONFERENCE_PROPERTIES = ('X-GOOGLE-CONFERENCE', 'X-MICROSOFT-SKYPETEAMSMEETINGURL', 'X-MICROSOFT-ONLINEMEETINGURL',
+                         'CONFERENCE', 'URL')
+
+DURATION_PATTERN = re.compile(
+    r'(?P<sign>[+-])?P(?:(?P<weeks>\d+)W)?(?:(?P<days>\d+)D)?'
+    r'(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+)S)?)?$'
+)
+
+TEXT_ESCAPES = re.compile(r'\\(.)')
+
+class IcsLimitExceeded(Exception):
+    """Raised when an upload goes past ICS_IMPORT_MAX_BYTES or ICS_IMPORT_MAX_EVENTS"""
+
+def _read_lines(stream, max_bytes=None):
+    """Yield the decoded lines of a binary stream, without their line breaks
+    
+    Raises IcsLimitExceeded once more than max_bytes were read.
+    """
+    read = 0
+    
+    def readline():
+        nonlocal read
+        line = stream.readline(MAX_LINE_BYTES)
+        read += len(line)
+        if max_bytes is not None and read > max_bytes:
+            raise IcsLimitExceeded(f"Uploads are limited to {max_bytes} bytes")
+        return line
+    
+    while True:
+        line = readline()
+        if not line:
+            return
+        
+        # Skip the rest of an overlong line instead of reading it into memory
+        if not line.endswith(b'\n') and len(line) == MAX_LINE_BYTES:
+            while True:
+                rest = readline()
+                if not rest or rest.endswith(b'\n'):
+                    break
+        
+        yield line.rstrip(b'\r\n').decode('utf-8', 'replace')
+
+def unfold_lines(lines):
+    """Join folded content lines: a line starting with a space or tab continues the one before"""
+    current = None
+    
+    for line in lines:
+        if line[:1] in (' ', '\t'):
+            if current is not None and len(current) < MAX_LINE_BYTES:
+                current += line[1:]
+            continue
+        
+        if current:
+            yield current
+        current = line
+    
+    if current:
+        yield current
+
+def parse_property(line):
+    """Split a content line into its upper-case name, {parameter: value} and value"""
+    # The value starts at the first colon outside a quoted parameter value;
+    # scan for it only when a quote comes first
+    index = line.find(':')
+    if index == -1:
+        return None, {}, ''
+    
+    if '"' in line[:index]:
+        quoted = False
+        for index, char in enumerate(line):
+            if char == '"':
+                quoted = not quoted
+            elif char == ':' and not quoted:
+                break
+        else:
+            return None, {}, ''
+    
+    if index == len(line) or ';' not in line[:index]:
+        return line[:index].upper(), {}, line[index + 1:]
+    
+    name, *params = line[:index].split(';')
+    parameters = {}
+    for param in params:
+        key, _, value = param.partition('=')
+        parameters[key.upper()] = value.strip('"')
+    
+    return name.upper(), parameters, line[index + 1:]
+
+def unescape_text(value):
+    """Undo the backslash escapes of a TEXT value"""
+    return TEXT_ESCAPES.sub(lambda match: '\n' if match.group(1) in 'nN' else match.group(1), value)
+
+def parse_ics_datetime(value, parameters):
+    """Parse a DATE or DATE-TIME value into a naive UTC datetime, or None
+    
+    Times with a TZID are converted from that zone. Floating times, and
+    zones the tz database does not know, are taken as UTC.
+    """
+    # Sliced by hand, strptime is several times slower for these fixed layouts
+    value = value.strip()
+    try:
+        if parameters.get('VALUE') == 'DATE' or len(value) == 8:
+            return datetime(int(value[0:4]), int(value[4:6]), int(value[6:8]))
+        if value[8:9] not in ('T', 't'):
+            return None
+        parsed = datetime(
+            int(value[0:4]), int(value[4:6]), int(value[6:8]),
+            int(value[9:11]), int(value[11:13]), int(value[13:15])
+        )
+    except ValueError:
+        return None
+    
+    tzid = parameters.get('TZID')
+    if tzid and not value.endswith(('Z', 'z')):
+        try:
+            zone = ZoneInfo(tzid)
+        except (ZoneInfoNotFoundError, ValueError):
+            return parsed
+        parsed = parsed.replace(tzinfo=zone).astimezone(timezone.utc).replace(tzinfo=None)
+    
+    return parsed
+
+def parse_ics_duration(value):
+    """Parse a DURATION value such as PT1H30M into a timedelta, or None"""
+    match = DURATION_PATTERN.match(value.strip())
+    if not match:
+        return None
+    
+    parts = {key: int(amount or 0) for key, amount in match.groupdict().items() if key != 'sign'}
+    duration = timedelta(**parts)
+    return -duration if match.group('sign') == '-' else duration
+
+def _source_id(uid, recurrence_id):
+    """Build the source_id of an entry; edited occurrences of a series have their own"""
+    source_id = f'{uid}/{recurrence_id}' if recurrence_id else uid
+    # source_id holds up to 255 characters; longer UIDs are stored by digest
+    if len(source_id) > 255:
+        source_id = hashlib.sha1(source_id.encode()).hexdigest()
+    return source_id
+
+def _zone_name(parameters):
+    """Return the TZID of a property when the tz database knows it, else '' for UTC"""
+    tzid = parameters.get('TZID', '')
+    try:
+        return tzid if tzid and ZoneInfo(tzid) else ''
+    except (ZoneInfoNotFoundError, ValueError):
+        return ''
+
+def _to_event(properties, attendees, recurrence):
+    """Normalize the (parameters, value) properties of one VEVENT, or return None without a UID"""
+    def text(name, default=''):
+        return unescape_text(properties[name][1]) if name in properties else default
+    
+    uid = text('UID').strip()
+    if not uid:
+        return None
+    
+    # An entry with a RECURRENCE-ID overrides one occurrence of the series with its UID
+    series_id = original_start = None
+    if 'RECURRENCE-ID' in properties:
+        parameters, value = properties['RECURRENCE-ID']
+        series_id = _source_id(uid, None)
+        original_start = parse_ics_datetime(value, parameters)
+    source_id = _source_id(uid, properties.get('RECURRENCE-ID', ({}, ''))[1].strip())
+    
+    if text('STATUS').strip().upper() == 'CANCELLED':
+        return NormalizedEvent.removed(source_id, series_id, original_start)
+    
+    start = end = None
+    if 'DTSTART' in properties:
+        start = parse_ics_datetime(properties['DTSTART'][1], properties['DTSTART'][0])
+    if 'DTEND' in properties:
+        end = parse_ics_datetime(properties['DTEND'][1], properties['DTEND'][0])
+    elif start is not None and 'DURATION' in properties:
+        duration = parse_ics_duration(properties['DURATION'][1])
+        end = start + duration if duration is not None else None
+    elif start is not None:
+        # Without an end, an all-day entry lasts the day and a timed one is an instant
+        parameters, value = properties['DTSTART']
+        end = start + timedelta(days=1) if parameters.get('VALUE') == 'DATE' or len(value.strip()) == 8 else start
+    
+    description = text('DESCRIPTION')
+    location = text('LOCATION')
+    
+    meeting_link = ''
+    for name in CONFERENCE_PROPERTIES:
+        if name in properties:
+            value = properties[name][1].strip()
+            meeting_link = find_meeting_link(value) if name == 'URL' else value
+            if meeting_link:
+                break
+    if not meeting_link:
+        meeting_link = find_meeting_link(description) or find_meeting_link(location)
+    
+    # Cut to the column lengths of events and meetings
+    return NormalizedEvent(
+        source_id,
+        title=(text('SUMMARY') or DEFAULT_TITLE)[:100],
+        description=description,
+        start=start,
+        end=end,
+        location=location[:200],
+        is_meeting=bool(meeting_link),
+        meeting_link=meeting_link[:255],
+        attendees=','.join(attendees),
+        duration=int((end - start).total_seconds() / 60) if start and end else DEFAULT_DURATION,
+        recurrence=tuple(recurrence),
+        timezone=_zone_name(properties['DTSTART'][0]) if 'DTSTART' in properties else '',
+        series_id=series_id,
+        original_start=original_start
+    )
+
+def parse_ics(lines):
+    """Yield a NormalizedEvent for every VEVENT of an iCalendar stream, one at a time
+    
+    Only the properties of the VEVENT being read are held in memory, so a
+    file of any size is parsed in constant space. Components nested in a
+    VEVENT, such as VALARM, are skipped. Events without a UID cannot be
+    matched on re-import and are skipped too. The RRULE and EXDATE lines of
+    a recurring event are passed on as they are.
+    """
+    properties = None
+    attendees = []
+    recurrence = []
+    depth = 0  # Components opened inside the current VEVENT
+    
+    for line in unfold_lines(lines):
+        name, parameters, value = parse_property(line)
+        
+        if name == 'BEGIN':
+            if properties is not None:
+                depth += 1
+            elif value.strip().upper() == 'VEVENT':
+                properties = {}
+                attendees = []
+                recurrence = []
+            continue
+        
+        if name == 'END':
+            if properties is None:
+                continue
+            if depth:
+                depth -= 1
+                continue
+            
+            event = _to_event(properties, attendees, recurrence)
+            properties = None
+            if event is not None:
+                yield event
+            continue
+        
+        if properties is None or depth or name is None:
+            continue
+        
+        if name == 'ATTENDEE':
+            if value[:7].lower() == 'mailto:':
+                attendees.append(value[7:])
+        elif name in ('RRULE', 'EXDATE'):
+            recurrence.append(line)
+        elif name not in properties:
+            properties[name] = (parameters, value)
+
+def _limit_events(events, max_events):
+    """Pass events on, raising IcsLimitExceeded at the first one past max_events"""
+    for count, event in enumerate(events, 1):
+        if count > max_events:
+            raise IcsLimitExceeded(f"Uploads are limited to {max_events} events")
+        yield event
+
+def import_ics(user_id, stream, progress=None):
+    """Stream an iCalendar upload into the user's events and meetings
+    
+    The upload is parsed while it is read and written in chunks of
+    SYNC_CHUNK_SIZE through the provider sync path, each chunk committed on
+    its own, so memory stays flat for any number of events. Entries are
+    matched by UID, so importing the same file again only updates what
+    changed; cancelled entries are deleted. Entries missing from a later
+    file are left alone. Recurring events are stored as one series each,
+    without the occurrences the file overrides or cancels. A progress
+    callback receives the running counts after each chunk.
+    
+    An upload past ICS_IMPORT_MAX_BYTES or ICS_IMPORT_MAX_EVENTS, or a chunk
+    that cannot be written, stops the import: the failing chunk is rolled
+    back and the counts of the chunks committed so far are returned with
+    the error, and limit_exceeded set for a limit.
+    """
+    counts = {'fetched': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0, 'deleted': 0}
+    started = time.perf_counter()
+    exclusions = {}
+    
+    lines = _read_lines(stream, current_app.config['ICS_IMPORT_MAX_BYTES'])
+    events = _limit_events(parse_ics(lines), current_app.config['ICS_IMPORT_MAX_EVENTS'])
+    
+    try:
+        for chunk in iter_chunks(events, current_app.config['SYNC_CHUNK_SIZE']):
+            chunk_counts = apply_sync_batch(user_id, ICS_SOURCE, chunk, exclusions)
+            db.session.commit()
+            
+            for key, value in chunk_counts.items():
+                counts[key] += value
+            counts['fetched'] += len(chunk)
+            
+            if progress:
+                progress(counts)
+    except IcsLimitExceeded as e:
+        db.session.rollback()
+        counts['error'] = str(e)
+        counts['limit_exceeded'] = True
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('Import of an .ics upload for user %s failed', user_id)
+        counts['error'] = str(e)
+    
+    elapsed = time.perf_counter() - started
+    counts['seconds'] = round(elapsed, 3)
+    counts['events_per_second'] = round(counts['fetched'] / elapsed) if elapsed else None
+    return counts
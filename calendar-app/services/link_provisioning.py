@@ -0,0 +1,243 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import update
+from models.database import db
+from models.meeting import Meeting
+from services.data_versions import bump_version
+from services.meeting_service import PROVIDER_PLATFORMS, generate_meeting_link
+from services.range_cache import mark_changed, mark_span_changed
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_pending = 0  # Links handed to this process's threads and not finished yet
+_lock = threading.Lock()
+
+def link_columns(platform):
+    """Return the link columns of a meeting created on, or moved to, a platform
+    
+    Zoom and Teams links are left pending for a worker to create, so the
+    request saving the meeting never waits on the provider. Other platforms
+    have no link to create.
+    """
+    if platform.lower() not in PROVIDER_PLATFORMS:
+        return {'meeting_link': '#', 'link_status': 'ready', 'link_attempts': 0, 'link_retry_at': None}
+    return {'meeting_link': None, 'link_status': 'pending', 'link_attempts': 0, 'link_retry_at': datetime.utcnow()}
+
+def _get_executor():
+    """Return the provisioning threads of this process, creating them on first use"""
+    global _executor
+    
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=current_app.config['LINK_WORKERS'],
+                thread_name_prefix='link-worker'
+            )
+    
+    return _executor
+
+def enqueue_links(meeting_ids):
+    """Hand the pending links of meetings to this process's provisioning threads
+    
+    Call once the meetings are committed. Meetings whose link is not pending
+    are skipped. Links beyond LINK_QUEUE_MAX stay pending for the loop in
+    scheduler.py to create.
+    """
+    global _pending
+    
+    if not meeting_ids:
+        return
+    
+    pending_ids = [meeting_id for (meeting_id,) in db.session.query(Meeting.id).filter(
+        Meeting.id.in_(meeting_ids),
+        Meeting.link_status == 'pending'
+    )]
+    app = current_app._get_current_object()
+    
+    for meeting_id in pending_ids:
+        with _lock:
+            if _pending >= current_app.config['LINK_QUEUE_MAX']:
+                return
+            _pending += 1
+        _get_executor().submit(_run, app, meeting_id)
+
+def _run(app, meeting_id):
+    """Provision one link on a worker thread"""
+    global _pending
+    
+    try:
+        with app.app_context():
+            provision_link(meeting_id)
+    except Exception:
+        logger.exception('Provisioning the link of meeting %s crashed', meeting_id)
+    finally:
+        with _lock:
+            _pending -= 1
+
+def claim_link(meeting_id):
+    """Lease a pending link that is due, so no other worker creates it as well
+    
+    Returns True when claimed. The lease moves link_retry_at LINK_LEASE
+    ahead; an attempt that never records its outcome, e.g. because its
+    process died, is taken over once the lease runs out.
+    """
+    now = datetime.utcnow()
+    table = Meeting.__table__
+    statement = update(table).where(
+        table.c.id == meeting_id,
+        table.c.link_status == 'pending',
+        table.c.link_retry_at <= now
+    ).values(
+        link_retry_at=now + timedelta(seconds=current_app.config['LINK_LEASE']),
+        updated_at=table.c.updated_at  # Not a change clients can see
+    )
+    
+    claimed = db.session.execute(statement).rowcount
+    db.session.commit()
+    return bool(claimed)
+
+def _record(meeting, values):
+    """Write the outcome of an attempt, unless the meeting was deleted or moved to another platform meanwhile"""
+    table = Meeting.__table__
+    statement = update(table).where(
+        table.c.id == meeting.id,
+        table.c.link_status == 'pending',
+        table.c.platform == meeting.platform
+    ).values(**values)
+    
+    written = db.session.execute(statement).rowcount
+    
+    # A new link or status reaches clients through the data version and the list caches
+    if written and 'link_status' in values:
+        if meeting.rrule_until:
+            mark_span_changed(meeting.user_id, Meeting, meeting.date, meeting.rrule_until)
+        else:
+            mark_changed(meeting.user_id, Meeting, meeting.date)
+        bump_version(meeting.user_id)
+    
+    db.session.commit()
+    return bool(written)
+
+def provision_link(meeting_id):
+    """Create the link of a pending meeting that is due and record the outcome
+    
+    A failed attempt is retried after LINK_RETRY_DELAY, doubled for every
+    earlier failure, until LINK_MAX_ATTEMPTS marks the link failed. Returns
+    the link status written, or None when the meeting was not due, is being
+    provisioned elsewhere or changed in the meantime.
+    """
+    if not claim_link(meeting_id):
+        return None
+    
+    # Plain values, which a commit made while fetching a token cannot reload
+    meeting = db.session.query(
+        Meeting.id, Meeting.user_id, Meeting.title, Meeting.date, Meeting.duration, Meeting.platform,
+        Meeting.rrule_until, Meeting.link_attempts
+    ).filter_by(id=meeting_id).first()
+    
+    if meeting is None:
+        return None
+    
+    try:
+        link = generate_meeting_link(
+            platform=meeting.platform,
+            title=meeting.title,
+            date=meeting.date.isoformat(),
+            duration=meeting.duration,
+            user_id=meeting.user_id
+        )
+        values = {'meeting_link': link, 'link_status': 'ready', 'link_retry_at': None}
+    except Exception as e:
+        db.session.rollback()
+        attempts = (meeting.link_attempts or 0) + 1
+        
+        if attempts >= current_app.config['LINK_MAX_ATTEMPTS']:
+            logger.warning('Giving up on the link of meeting %s after %s attempts: %s', meeting_id, attempts, e)
+            values = {'link_status': 'failed', 'link_attempts': attempts, 'link_retry_at': None}
+        else:
+            logger.info('Link of meeting %s failed, attempt %s: %s', meeting_id, attempts, e)
+            delay = current_app.config['LINK_RETRY_DELAY'] * 2 ** (attempts - 1)
+            values = {
+                'link_attempts': attempts,
+                'link_retry_at': datetime.utcnow() + timedelta(seconds=delay),
+                'updated_at': Meeting.__table__.c.updated_at
+            }
+    
+    if not _record(meeting, values):
+        return None
+    return values.get('link_status', 'pending')
+
+class LinkProvisioner:
+    """Background loop creating the pending meeting links that are due
+    
+    Retries failed attempts once their delay has passed, and takes over
+    links a process could not queue or exited before creating. Runs next to
+    the sync scheduler in scheduler.py.
+    """
+    
+    def __init__(self, app, interval, workers, batch_size=100):
+        self.app = app
+        self.interval = interval
+        self.batch_size = batch_size
+        
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='link-provisioner')
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.counts = {'ready': 0, 'failed': 0, 'retried': 0}
+    
+    def due_links(self):
+        """Return the ids of pending links whose next attempt is due, longest waiting first"""
+        with self.app.app_context():
+            return [meeting_id for (meeting_id,) in db.session.query(Meeting.id).filter(
+                Meeting.link_status == 'pending',
+                Meeting.link_retry_at <= datetime.utcnow()
+            ).order_by(Meeting.link_retry_at).limit(self.batch_size)]
+    
+    def _provision(self, meeting_id):
+        """Provision one link and count its outcome"""
+        status = None
+        try:
+            with self.app.app_context():
+                status = provision_link(meeting_id)
+        except Exception:
+            logger.exception('Provisioning the link of meeting %s crashed', meeting_id)
+        
+        if status:
+            with self.lock:
+                self.counts['retried' if status == 'pending' else status] += 1
+    
+    def run_once(self):
+        """Provision the links due now and return how many were tried"""
+        meeting_ids = self.due_links()
+        list(self.executor.map(self._provision, meeting_ids))
+        return len(meeting_ids)
+    
+    def stats(self):
+        """Return the outcome counters of the loop"""
+        with self.lock:
+            return dict(self.counts)
+    
+    def run(self, once=False):
+        """Run the provisioning loop until stopped
+        
+        With once, the loop returns when no link is due.
+        """
+        while not self.stop_event.is_set():
+            tried = self.run_once()
+            
+            if once and not tried:
+                break
+            
+            # A full batch means more links are due right away
+            if tried < self.batch_size:
+                self.stop_event.wait(self.interval)
+        
+        self.executor.shutdown(wait=True)
+    
+    def stop(self):
+        """Ask the loop to exit after the running attempts finish"""
+        self.stop_event.set()
@@ -2,9 +2,19 @@ from flask import current_app
 from models.user import User
 from services.zoom_service import create_zoom_meeting
 from services.teams_service import create_teams_meeting
+from services.token_manager import get_access_token
+
+# Platforms whose links are created through a provider API
+PROVIDER_PLATFORMS = ('zoom', 'teams')
+
+class MeetingLinkError(Exception):
+    """Raised when Zoom or Teams did not create the meeting"""
 
 def generate_meeting_link(platform, title, date, duration, user_id):
-    """Generate a meeting link based on the platform"""
+    """Generate a meeting link based on the platform
+    
+    Raises MeetingLinkError when the provider answers with an error.
+    """
     user = User.query.get(user_id)
     
     if not user:
@@ -13,11 +23,13 @@ def generate_meeting_link(platform, title, date, duration, user_id):
     if platform.lower() == 'zoom':
         if user.zoom_token:
             meeting_info = create_zoom_meeting(
-                token=user.zoom_token,
+                access_token=get_access_token(user, 'zoom'),
                 topic=title,
                 start_time=date,
                 duration=duration
             )
+            if 'error' in meeting_info:
+                raise MeetingLinkError(meeting_info.get('message') or meeting_info['error'])
             return meeting_info.get('join_url', '#')
         else:
             # Mock link for development
@@ -26,11 +38,13 @@ def generate_meeting_link(platform, title, date, duration, user_id):
     elif platform.lower() == 'teams':
         if user.teams_token:
             meeting_info = create_teams_meeting(
-                token=user.teams_token,
+                access_token=get_access_token(user, 'teams'),
                 subject=title,
                 start_time=date,
                 duration=duration
             )
+            if 'error' in meeting_info:
+                raise MeetingLinkError(meeting_info.get('message') or meeting_info['error'])
             return meeting_info.get('joinWebUrl', '#')
         else:
             # Mock link for development
@@ -0,0 +1,226 @@
+import logging
+import re
+from sqlalchemy import inspect, func, delete, update, text
+from models.database import db
+from models.schema_migration import SchemaMigration
+from models.event import Event
+from models.meeting import Meeting
+from models.task import Task
+from models.sync_state import SyncState
+from models.sync_job import SyncJob
+from services.event_buckets import rebuild_event_buckets, unindex_events
+from services.data_versions import bump_version
+
+logger = logging.getLogger(__name__)
+
+# Models whose synced rows are keyed by (user_id, source, source_id)
+SYNCED_MODELS = (Event, Meeting)
+
+# Models that can hold recurring series
+RECURRING_MODELS = (Event, Meeting)
+
+# Series columns of recurring entries, with their SQL types
+RECURRENCE_COLUMNS = (
+    ('rrule', 'TEXT'),
+    ('exdates', 'TEXT'),
+    ('rrule_timezone', 'VARCHAR(64)'),
+    ('rrule_until', 'TIMESTAMP')
+)
+
+# Link provisioning columns of meetings, with their SQL types; meetings
+# saved before links were created off the request path already have theirs
+LINK_COLUMNS = (
+    ('link_status', "VARCHAR(20) DEFAULT 'ready'"),
+    ('link_attempts', 'INTEGER DEFAULT 0'),
+    ('link_retry_at', 'TIMESTAMP')
+)
+
+# Slot column claimed by the sync job in flight of a user and provider; jobs
+# queued before it existed stay unclaimed and cannot block new ones
+SYNC_JOB_COLUMNS = (
+    ('active', 'BOOLEAN'),
+)
+
+# Ids Google gives the occurrences of a recurring series: the series id, then the start they have in it
+GOOGLE_OCCURRENCE_ID = re.compile(r'_\d{8}(T\d{6}Z)?$')
+
+def _column_names(table_name):
+    return {column['name'] for column in inspect(db.engine).get_columns(table_name)}
+
+def _index_names(table_name):
+    return {index['name'] for index in inspect(db.engine).get_indexes(table_name)}
+
+def _create_missing_indexes(models):
+    """Create the indexes of models the database lacks, leaving out ones on columns a later migration adds"""
+    for model in models:
+        existing = _index_names(model.__tablename__)
+        columns = _column_names(model.__tablename__)
+        for index in model.__table__.indexes:
+            if index.name not in existing and all(column.name in columns for column in index.columns):
+                index.create(bind=db.engine)
+
+def _add_source_ids():
+    """Add the provider event id column that sync lookups filter on"""
+    for model in SYNCED_MODELS:
+        table_name = model.__tablename__
+        if 'source_id' not in _column_names(table_name):
+            db.session.execute(text(f'ALTER TABLE {table_name} ADD COLUMN source_id VARCHAR(255)'))
+    db.session.commit()
+
+def _delete_duplicate_synced_rows(model):
+    """Keep the oldest row of every (user_id, source, source_id) so the unique index can be built"""
+    duplicates = db.session.query(model.user_id, model.source, model.source_id, func.min(model.id)).filter(
+        model.source_id.isnot(None)
+    ).group_by(model.user_id, model.source, model.source_id).having(func.count(model.id) > 1).all()
+    
+    for user_id, source, source_id, keep_id in duplicates:
+        db.session.execute(delete(model.__table__).where(
+            model.user_id == user_id,
+            model.source == source,
+            model.source_id == source_id,
+            model.id != keep_id
+        ))
+    
+    if duplicates:
+        logger.info('Removed duplicates of %s synced %s', len(duplicates), model.__tablename__)
+
+def _add_indexes():
+    """Create the composite indexes of the list endpoints and the unique sync key"""
+    for model in SYNCED_MODELS:
+        _delete_duplicate_synced_rows(model)
+    db.session.commit()
+    
+    _create_missing_indexes((Event, Meeting, Task))
+
+def _add_missing_columns(model, columns):
+    """Add the (name, SQL type) columns a model's table lacks"""
+    table_name = model.__tablename__
+    existing = _column_names(table_name)
+    for name, column_type in columns:
+        if name not in existing:
+            db.session.execute(text(f'ALTER TABLE {table_name} ADD COLUMN {name} {column_type}'))
+    db.session.commit()
+
+def _add_recurrence():
+    """Add the series columns of recurring events and meetings and the index finding their masters"""
+    for model in RECURRING_MODELS:
+        _add_missing_columns(model, RECURRENCE_COLUMNS)
+    
+    _create_missing_indexes(RECURRING_MODELS)
+
+def _add_link_status():
+    """Add the link provisioning columns of meetings and the index finding the links due"""
+    _add_missing_columns(Meeting, LINK_COLUMNS)
+    _create_missing_indexes((Meeting,))
+
+def _resync_google_series():
+    """Clear the cursors of Google calendars, so their next sync is a full one storing series
+    
+    Google syncs used to ask for every occurrence of a recurring series as a
+    single event, and their sync tokens belong to that query. The next full
+    sync stores each series as one master and deletes the occurrences inside
+    the sync window that it no longer sees. No row is deleted here.
+    """
+    table = SyncState.__table__
+    db.session.execute(update(table).where(table.c.provider == 'gmail').values(cursor=None))
+    db.session.commit()
+
+def _google_occurrences(model):
+    """Return (id, user_id) of the rows of model synced from Google as single occurrences"""
+    rows = db.session.query(model.id, model.user_id, model.source_id).filter(
+        model.source == 'gmail',
+        model.source_id.isnot(None)
+    )
+    return [(row_id, user_id) for row_id, user_id, source_id in rows if GOOGLE_OCCURRENCE_ID.search(source_id)]
+
+def _delete_google_occurrences(destructive=False, chunk_size=1000):
+    """Delete the Google occurrence rows full syncs left outside their window
+    
+    Returns False, deleting nothing, when such rows exist and destructive is
+    not set, which keeps the migration pending.
+    """
+    stale = {model: _google_occurrences(model) for model in RECURRING_MODELS}
+    if not any(stale.values()):
+        return True
+    if not destructive:
+        return False
+    
+    users = set()
+    for model, rows in stale.items():
+        for index in range(0, len(rows), chunk_size):
+            stale_ids = [row_id for row_id, _ in rows[index:index + chunk_size]]
+            if model is Event:
+                unindex_events(stale_ids)
+            db.session.execute(delete(model.__table__).where(model.id.in_(stale_ids)))
+        
+        users.update(user_id for _, user_id in rows)
+        if rows:
+            logger.info('Removed %s synced occurrences from %s', len(rows), model.__tablename__)
+    
+    for user_id in users:
+        bump_version(user_id)
+    
+    db.session.commit()
+    return True
+
+def _add_sync_job_slot():
+    """Add the active slot of sync jobs and the unique index holding one job in flight per user and provider"""
+    _add_missing_columns(SyncJob, SYNC_JOB_COLUMNS)
+    _create_missing_indexes((SyncJob,))
+
+def _add_activity_indexes():
+    """Create the indexes the sync scheduler reads each user's latest local edit from"""
+    _create_missing_indexes((Task, Event, Meeting))
+
+# Applied in order, each exactly once per database. Steps check the current
+# schema first, so databases created by db.create_all() just get recorded.
+MIGRATIONS = [
+    ('0001', 'Add source_id to events and meetings', _add_source_ids),
+    ('0002', 'Add list and sync lookup indexes', _add_indexes),
+    ('0003', 'Index existing events by time bucket', rebuild_event_buckets),
+    ('0004', 'Add recurring series columns to events and meetings', _add_recurrence),
+    ('0005', 'Re-sync Google calendars as recurring series', _resync_google_series),
+    ('0006', 'Add link provisioning status to meetings', _add_link_status),
+    ('0007', 'Allow one sync job in flight per user and provider', _add_sync_job_slot),
+    ('0008', 'Index local edits for the sync scheduler', _add_activity_indexes),
+    ('0009', 'Delete Google occurrences left outside the sync window', _delete_google_occurrences),
+]
+
+# Migrations that may delete user data. They take the destructive flag and
+# return False when they found rows only an explicit run may delete, which
+# leaves them pending; with nothing to delete they are recorded right away.
+DESTRUCTIVE_MIGRATIONS = {'0009'}
+
+def pending_migrations():
+    """Return the (version, description) of migrations not applied yet"""
+    applied = {version for (version,) in db.session.query(SchemaMigration.version)}
+    return [(version, description) for version, description, _ in MIGRATIONS if version not in applied]
+
+def run_migrations(destructive=False):
+    """Apply every pending migration and record it in schema_migrations
+    
+    Migrations in DESTRUCTIVE_MIGRATIONS only delete rows with destructive
+    set, which migrate.py --apply-destructive does, and are otherwise logged
+    as pending while such rows exist. Returns the versions applied. Call
+    inside an app context after db.create_all() so the schema_migrations
+    table exists.
+    """
+    applied = []
+    pending = dict(pending_migrations())
+    
+    for version, description, migrate in MIGRATIONS:
+        if version not in pending:
+            continue
+        
+        logger.info('Applying migration %s: %s', version, description)
+        if version not in DESTRUCTIVE_MIGRATIONS:
+            migrate()
+        elif not migrate(destructive):
+            logger.warning('Migration %s would delete rows, run migrate.py --apply-destructive: %s',
+                           version, description)
+            continue
+        db.session.add(SchemaMigration(version=version, description=description))
+        db.session.commit()
+        applied.append(version)
+    
+    return applied
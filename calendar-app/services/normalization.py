@@ -0,0 +1,194 @@
+import re
+from datetime import datetime
+
+# Zoom and Teams join links, matched in a single pass over a description. The
+# shared https:// prefix stays outside the alternation so the regex engine can
+# skip ahead to it instead of trying both branches at every position.
+MEETING_LINK_PATTERN = re.compile(
+    r'https://(?:[a-zA-Z0-9.-]+\.(?P<zoom>zoom)\.us|teams\.microsoft\.com)/[a-zA-Z0-9/?.=&-]+'
+)
+
+# Fractional seconds of a timestamp, of any length
+FRACTION_PATTERN = re.compile(r'\.(\d+)')
+
+DEFAULT_TITLE = 'No Subject'
+DEFAULT_DURATION = 30  # Minutes, used when a timestamp is missing or unreadable
+
+class NormalizedEvent:
+    """Provider calendar entry in the shape the sync engine stores"""
+    
+    __slots__ = ('id', 'deleted', 'title', 'description', 'start', 'end', 'location',
+                 'is_meeting', 'meeting_link', 'attendees', 'duration',
+                 'recurrence', 'timezone', 'series_id', 'original_start')
+    
+    def __init__(self, id, deleted=False, title=DEFAULT_TITLE, description='', start=None, end=None,
+                 location='', is_meeting=False, meeting_link='', attendees='', duration=DEFAULT_DURATION,
+                 recurrence=(), timezone='', series_id=None, original_start=None):
+        self.id = id
+        self.deleted = deleted  # Removed at the provider, only id is meaningful
+        self.title = title
+        self.description = description
+        self.start = start  # Naive UTC datetimes
+        self.end = end
+        self.location = location
+        self.is_meeting = is_meeting
+        self.meeting_link = meeting_link
+        self.attendees = attendees  # Comma separated emails
+        self.duration = duration
+        self.recurrence = recurrence  # RRULE and EXDATE content lines of a recurring series
+        self.timezone = timezone  # Zone a series repeats in, '' for UTC
+        self.series_id = series_id  # Provider id of the series an edited or cancelled occurrence belongs to
+        self.original_start = original_start  # Start that occurrence has in its series
+    
+    @classmethod
+    def removed(cls, id, series_id=None, original_start=None):
+        """Return the record of an entry deleted at the provider, or of a cancelled occurrence of a series"""
+        return cls(id, deleted=True, series_id=series_id, original_start=original_start)
+    
+    def __repr__(self):
+        return f'<NormalizedEvent {self.id}{" deleted" if self.deleted else ""}>'
+
+def parse_datetime(value):
+    """Parse an ISO-8601 timestamp or all-day date into a naive UTC datetime
+    
+    The C datetime.fromisoformat handles the layouts providers send. Values it
+    rejects, such as Z suffixes or Graph's seven fractional digits on older
+    Pythons, are rewritten once and parsed again. Returns None for an empty
+    value and raises ValueError for a malformed one.
+    """
+    if not value:
+        return None
+    
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        value = FRACTION_PATTERN.sub(_pad_fraction, value)
+        if value.endswith('Z'):
+            value = value[:-1] + '+00:00'
+        parsed = datetime.fromisoformat(value)
+    
+    if parsed.tzinfo is not None:
+        parsed = parsed.replace(tzinfo=None) - parsed.utcoffset()
+    
+    return parsed
+
+def _pad_fraction(match):
+    """Rewrite fractional seconds as exactly six digits"""
+    return '.' + match.group(1)[:6].ljust(6, '0')
+
+def find_meeting_link(text):
+    """Return the first Zoom link in a text, else the first Teams link, else ''"""
+    if not text:
+        return ''
+    
+    teams_link = ''
+    for match in MEETING_LINK_PATTERN.finditer(text):
+        if match.group('zoom'):
+            return match.group()
+        if not teams_link:
+            teams_link = match.group()
+    
+    return teams_link
+
+def _duration(start, end):
+    """Return the length of an entry in whole minutes"""
+    if start is None or end is None:
+        return DEFAULT_DURATION
+    return int((end - start).total_seconds() / 60)
+
+def _parse_or_none(value):
+    """Parse a timestamp, treating an unreadable one as missing"""
+    try:
+        return parse_datetime(value)
+    except ValueError:
+        return None
+
+def normalize_gmail_event(event):
+    """Normalize a Google Calendar event
+    
+    Recurring series come as one master with its recurrence lines. Edited
+    and cancelled occurrences come as entries of their own, which name
+    their series and the start they had in it.
+    """
+    series_id = event.get('recurringEventId')
+    original_start = None
+    if series_id:
+        original = event.get('originalStartTime', {})
+        original_start = _parse_or_none(original.get('dateTime') or original.get('date'))
+    
+    # Cancelled entries only carry their id
+    if event.get('status') == 'cancelled':
+        return NormalizedEvent.removed(event.get('id'), series_id, original_start)
+    
+    description = event.get('description', '')
+    
+    # Conference video entry point first, then links in the description
+    meeting_link = ''
+    conference = event.get('conferenceData')
+    is_meeting = conference is not None
+    if is_meeting:
+        for entry_point in conference.get('entryPoints', ()):
+            if entry_point.get('entryPointType') == 'video':
+                meeting_link = entry_point.get('uri', '')
+                break
+    
+    if not meeting_link and description:
+        meeting_link = find_meeting_link(description)
+        if meeting_link:
+            is_meeting = True
+    
+    start_data = event.get('start', {})
+    end_data = event.get('end', {})
+    start = _parse_or_none(start_data.get('dateTime') or start_data.get('date'))
+    end = _parse_or_none(end_data.get('dateTime') or end_data.get('date'))
+    
+    return NormalizedEvent(
+        event.get('id'),
+        title=event.get('summary', DEFAULT_TITLE),
+        description=description,
+        start=start,
+        end=end,
+        location=event.get('location', ''),
+        is_meeting=is_meeting,
+        meeting_link=meeting_link,
+        attendees=','.join([attendee['email'] for attendee in event.get('attendees', ()) if attendee.get('email')]),
+        duration=_duration(start, end),
+        recurrence=tuple(event.get('recurrence', ())),
+        timezone=start_data.get('timeZone', ''),
+        series_id=series_id,
+        original_start=original_start
+    )
+
+def normalize_outlook_event(event):
+    """Normalize a Microsoft Graph event"""
+    # Removed entries only carry their id
+    if '@removed' in event:
+        return NormalizedEvent.removed(event.get('id'))
+    
+    online_meeting = event.get('onlineMeeting')
+    is_meeting = bool(online_meeting)
+    start = _parse_or_none(event.get('start', {}).get('dateTime'))
+    end = _parse_or_none(event.get('end', {}).get('dateTime'))
+    
+    meeting_link = ''
+    attendees = ''
+    if is_meeting:
+        meeting_link = online_meeting.get('joinUrl', '')
+        attendees = ','.join([
+            address for address in (
+                attendee.get('emailAddress', {}).get('address') for attendee in event.get('attendees', ())
+            ) if address
+        ])
+    
+    return NormalizedEvent(
+        event.get('id'),
+        title=event.get('subject', DEFAULT_TITLE),
+        description=event.get('bodyPreview', ''),
+        start=start,
+        end=end,
+        location=(event.get('location') or {}).get('displayName', ''),
+        is_meeting=is_meeting,
+        meeting_link=meeting_link,
+        attendees=attendees,
+        duration=_duration(start, end)
+    )
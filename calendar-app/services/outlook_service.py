@@ -1,6 +1,12 @@
 import requests
 from flask import current_app
 import json
+from datetime import datetime, timedelta
+from services import http_client
+from services.sync_service import SyncCursor, SyncFetchError
+from services.normalization import normalize_outlook_event
+
+GRAPH_CALENDAR_VIEW_DELTA_URL = "https://graph.microsoft.com/v1.0/me/calendarView/delta"
 
 def get_outlook_auth_url(user_id):
     """Generate the authorization URL for Microsoft Graph API (Outlook)"""
@@ -31,7 +37,11 @@ def get_outlook_token(code):
         "grant_type": "authorization_code"
     }
     
-    response = requests.post(token_url, data=data)
+    try:
+        response = http_client.post(token_url, data=data)
+    except requests.RequestException:
+        # Handle error
+        return None
     
     if response.status_code == 200:
         return json.dumps(response.json())
@@ -53,7 +63,11 @@ def refresh_outlook_token(refresh_token):
         "grant_type": "refresh_token"
     }
     
-    response = requests.post(token_url, data=data)
+    try:
+        response = http_client.post(token_url, data=data)
+    except requests.RequestException:
+        # Handle error
+        return None
     
     if response.status_code == 200:
         return json.dumps(response.json())
@@ -61,85 +75,62 @@ def refresh_outlook_token(refresh_token):
         # Handle error
         return None
 
-def get_outlook_events(token_json):
-    """Fetch calendar events from Outlook"""
-    token_data = json.loads(token_json)
-    access_token = token_data.get('access_token')
+def _start_full_outlook_sync(cursor):
+    """Switch the cursor to a full fetch of the sync window and return its query"""
+    now = datetime.utcnow()
+    cursor.start_full_sync(now, now + timedelta(days=current_app.config['SYNC_WINDOW_DAYS']))
+    
+    return {
+        'startDateTime': cursor.window_start.isoformat() + 'Z',
+        'endDateTime': cursor.window_end.isoformat() + 'Z'
+    }
+
+def get_outlook_events(access_token, cursor=None):
+    """Yield calendar events from Outlook, following every @odata.nextLink
     
-    if not access_token:
-        # Try to refresh token if no access token
-        refresh_token = token_data.get('refresh_token')
-        if refresh_token:
-            new_token_json = refresh_outlook_token(refresh_token)
-            if new_token_json:
-                token_data = json.loads(new_token_json)
-                access_token = token_data.get('access_token')
-            else:
-                return []
-        else:
-            return []
+    With a cursor holding a deltaLink only the changes since that link are
+    fetched, including deletions. An expired link (410 Gone) falls back to a
+    full fetch of the sync window. Once the last page is read the next
+    deltaLink is recorded on the cursor and it is marked complete.
+    Raises SyncFetchError when a page cannot be read.
+    """
+    cursor = cursor or SyncCursor()
     
     # Get events from Microsoft Graph API
     headers = {
         "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json"
+        "Content-Type": "application/json",
+        "Prefer": f"odata.maxpagesize={current_app.config['SYNC_PAGE_SIZE']}"
     }
     
-    # Get events for the next 30 days
-    url = "https://graph.microsoft.com/v1.0/me/calendarView?startDateTime={start}&endDateTime={end}"
-    
-    from datetime import datetime, timedelta
-    start = datetime.utcnow().isoformat() + 'Z'
-    end = (datetime.utcnow() + timedelta(days=30)).isoformat() + 'Z'
-    
-    url = url.format(start=start, end=end)
-    
-    response = requests.get(url, headers=headers)
+    if cursor.token:
+        url, params = cursor.token, None
+    else:
+        url, params = GRAPH_CALENDAR_VIEW_DELTA_URL, _start_full_outlook_sync(cursor)
     
-    if response.status_code == 200:
-        events_data = response.json().get('value', [])
+    while True:
+        try:
+            response = http_client.get(url, headers=headers, params=params)
+        except requests.RequestException as e:
+            raise SyncFetchError(f"Microsoft Graph request failed: {e}") from e
         
-        # Transform to our format
-        events = []
-        for event in events_data:
-            is_meeting = bool(event.get('onlineMeeting'))
-            
-            event_dict = {
-                'id': event.get('id'),
-                'subject': event.get('subject', 'No Subject'),
-                'body': event.get('bodyPreview', ''),
-                'start_time': event.get('start', {}).get('dateTime', ''),
-                'end_time': event.get('end', {}).get('dateTime', ''),
-                'location': event.get('location', {}).get('displayName', ''),
-                'is_meeting': is_meeting
-            }
-            
-            # Calculate duration in minutes
-            try:
-                start_time = datetime.fromisoformat(event_dict['start_time'].replace('Z', '+00:00'))
-                end_time = datetime.fromisoformat(event_dict['end_time'].replace('Z', '+00:00'))
-                duration = int((end_time - start_time).total_seconds() / 60)
-                event_dict['duration'] = duration
-            except:
-                event_dict['duration'] = 30  # Default duration
-            
-            # Add meeting-specific fields if it's a meeting
-            if is_meeting:
-                event_dict['meeting_link'] = event.get('onlineMeeting', {}).get('joinUrl', '')
-                
-                # Get attendees
-                attendees = []
-                for attendee in event.get('attendees', []):
-                    email = attendee.get('emailAddress', {}).get('address')
-                    if email:
-                        attendees.append(email)
-                
-                event_dict['attendees'] = ','.join(attendees)
-            
-            events.append(event_dict)
+        if response.status_code == 410 and not cursor.full_sync:
+            # Delta link expired, start over with a full fetch
+            url, params = GRAPH_CALENDAR_VIEW_DELTA_URL, _start_full_outlook_sync(cursor)
+            continue
         
-        return events
-    else:
-        # Handle error
-        return []
-
+        if response.status_code != 200:
+            raise SyncFetchError(f"Microsoft Graph returned {response.status_code}: {response.text[:200]}")
+        
+        data = response.json()
+        for event in data.get('value', []):
+            yield normalize_outlook_event(event)
+        
+        next_link = data.get('@odata.nextLink')
+        if not next_link:
+            cursor.next_token = data.get('@odata.deltaLink')
+            cursor.complete = True
+            return
+        
+        # Next links already carry the query parameters
+        url, params = next_link, None
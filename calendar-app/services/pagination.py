@@ -0,0 +1,85 @@
+import base64
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import or_, and_
+
+class InvalidPage(ValueError):
+    """Raised for a malformed limit or cursor query parameter"""
+
+def encode_cursor(start, row_id):
+    """Encode the (start, id) of the last row of a page as an opaque cursor"""
+    raw = f'{start.isoformat()}|{row_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Decode a cursor back into the (start, id) a page resumes after"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        start, row_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(start), int(row_id)
+    except ValueError:
+        raise InvalidPage('Invalid cursor')
+
+def parse_page_args(args):
+    """Read limit and cursor from the query string
+    
+    Returns (limit, after) where after is the decoded cursor. Both are None
+    when the client asked for neither, i.e. wants the whole list.
+    """
+    limit = args.get('limit')
+    cursor = args.get('cursor')
+    
+    if limit is None and cursor is None:
+        return None, None
+    
+    if limit is None:
+        limit = current_app.config['PAGE_SIZE_DEFAULT']
+    else:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise InvalidPage('Limit must be an integer')
+        if limit < 1:
+            raise InvalidPage('Limit must be positive')
+        limit = min(limit, current_app.config['PAGE_SIZE_MAX'])
+    
+    return limit, decode_cursor(cursor) if cursor else None
+
+def page_query(query, start_column, id_column, limit, after=None):
+    """Order a query by (start, id) and restrict it to the rows following a cursor
+    
+    The page resumes with a range seek after the last row of the previous
+    one rather than an OFFSET, so every page costs the same. One row more
+    than the limit is selected to tell whether another page follows.
+    """
+    if after:
+        start, row_id = after
+        query = query.filter(or_(
+            start_column > start,
+            and_(start_column == start, id_column > row_id)
+        ))
+    
+    return query.order_by(start_column, id_column).limit(limit + 1)
+
+def paginate(query, start_column, id_column, limit, after=None, extra=()):
+    """Return one page of a query ordered by (start, id) and the cursor of the next page
+    
+    extra rows from outside the query, e.g. expanded occurrences of
+    recurring series, are merged in by the same (start, id) order; they
+    need the start and id as attributes, like the query's rows. next_cursor
+    is None on the last page.
+    """
+    rows = page_query(query, start_column, id_column, limit, after).all()
+    
+    if extra:
+        def key(row):
+            return getattr(row, start_column.key), getattr(row, id_column.key)
+        
+        rows = sorted(rows + [row for row in extra if not after or key(row) > after], key=key)
+    
+    if len(rows) <= limit:
+        return rows, None
+    
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, start_column.key), getattr(last, id_column.key))
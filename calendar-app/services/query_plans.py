@@ -0,0 +1,45 @@
+from models.database import db
+
+def _explain(statement):
+    """Run the dialect's EXPLAIN on a statement and return its plan rows as dicts"""
+    engine = db.engine
+    dialect = engine.dialect.name
+    # Expand IN lists into individual parameters so the SQL can be sent as is
+    compiled = statement.compile(dialect=engine.dialect, compile_kwargs={'render_postcompile': True})
+    
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    
+    prefix = {'sqlite': 'EXPLAIN QUERY PLAN ', 'postgresql': 'EXPLAIN '}.get(dialect, 'EXPLAIN ')
+    
+    with engine.connect() as connection:
+        if dialect == 'postgresql':
+            # Tiny tables are always read sequentially; ask whether an index path exists
+            connection.exec_driver_sql('SET enable_seqscan = off')
+        result = connection.exec_driver_sql(prefix + str(compiled), params)
+        return [dict(row._mapping) for row in result]
+
+def find_table_scans(statement):
+    """Return the plan lines of a statement that read a whole table
+    
+    SQLite reports 'SCAN <table>' without an index, MySQL a row of type ALL
+    with no possible key and PostgreSQL a 'Seq Scan' even with sequential
+    scans disabled. An empty list means every table is reached by index.
+    """
+    dialect = db.engine.dialect.name
+    scans = []
+    
+    for row in _explain(statement):
+        if dialect == 'sqlite':
+            detail = row['detail']
+            if detail.startswith('SCAN ') and ' USING ' not in detail:
+                scans.append(detail)
+        elif dialect == 'postgresql':
+            line = row['QUERY PLAN']
+            if 'Seq Scan' in line:
+                scans.append(line.strip())
+        elif row.get('type') == 'ALL' and not row.get('possible_keys'):
+            scans.append(f"{row.get('table')}: type ALL, no usable index")
+    
+    return scans
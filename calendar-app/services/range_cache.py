@@ -0,0 +1,290 @@
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+from flask import current_app, has_app_context, request, g, Response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from werkzeug.utils import import_string
+from models.database import db
+from services.data_versions import make_etag
+
+# Session.info key of the cache tags a transaction invalidates once it commits
+PENDING_TAGS = 'range_cache_tags'
+
+_cache = None
+_cache_lock = threading.Lock()
+
+class CacheBackend:
+    """Storage behind the range cache
+    
+    Subclass it to keep entries in a shared cache such as Redis or memcached
+    and name the class in RANGE_CACHE_BACKEND. Counters written by incr()
+    must never be evicted before the entries built from them, e.g. stored
+    without a TTL, or invalidated entries become reachable again.
+    """
+    
+    @classmethod
+    def from_config(cls, config):
+        return cls()
+    
+    def get(self, key):
+        """Return the value stored under key, or None"""
+        raise NotImplementedError
+    
+    def set(self, key, value, ttl):
+        """Store a value for ttl seconds"""
+        raise NotImplementedError
+    
+    def get_counters(self, keys):
+        """Return the values of several counters, 0 for the ones never incremented"""
+        raise NotImplementedError
+    
+    def incr(self, key):
+        """Increment a counter"""
+        raise NotImplementedError
+    
+    def stats(self):
+        """Return backend counters such as entries and evictions"""
+        return {}
+
+class MemoryBackend(CacheBackend):
+    """In-process LRU bounded by RANGE_CACHE_MAX_ENTRIES
+    
+    Every process holds its own entries, so with several workers a write
+    served by one of them reaches the others only through the TTL.
+    """
+    
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (value, expires_at), least recently used first
+        self._counters = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+    
+    @classmethod
+    def from_config(cls, config):
+        return cls(config['RANGE_CACHE_MAX_ENTRIES'])
+    
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            return value
+    
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def get_counters(self, keys):
+        with self._lock:
+            return [self._counters.get(key, 0) for key in keys]
+    
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+def month_buckets(start, end):
+    """Return the YYYY-MM buckets from the month of start to the month of end"""
+    first = start.year * 12 + start.month - 1
+    last = end.year * 12 + end.month - 1
+    return [f'{month // 12:04d}-{month % 12 + 1:02d}' for month in range(first, last + 1)]
+
+class RangeCache:
+    """Read-through cache of list responses, invalidated by user and month
+    
+    Entries are tagged with the user's month buckets their range covers,
+    or with an 'open' bucket when the range is unbounded or longer than
+    RANGE_CACHE_MAX_BUCKETS. Every tag has a generation counter that is part
+    of the entry key, so invalidating a tag is a single increment and the
+    entries it covered are never read again; the LRU drops them in time.
+    A write to a row bumps the buckets the row covers and 'open', which
+    reaches every range that could contain the row.
+    """
+    
+    def __init__(self, backend, ttl, max_buckets):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_buckets = max_buckets
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+    
+    def _read_tags(self, kind, user_id, start, end):
+        """Return the tags of an entry covering [start, end] of one user"""
+        tags = [f'{kind}:{user_id}:all']
+        
+        if start and end and start <= end:
+            buckets = month_buckets(start, end)
+            if len(buckets) <= self.max_buckets:
+                return tags + [f'{kind}:{user_id}:{bucket}' for bucket in buckets]
+        
+        return tags + [f'{kind}:{user_id}:open']
+    
+    def get_or_load(self, kind, user_id, start, end, variant, load):
+        """Return the cached value of a range read, calling load() to fill a miss
+        
+        variant tells apart the reads of one range, e.g. their query strings.
+        """
+        tags = self._read_tags(kind, user_id, start, end)
+        generations = self.backend.get_counters([f'gen:{tag}' for tag in tags])
+        key = f'range:{kind}:{user_id}:{variant}:' + '.'.join(map(str, generations))
+        
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        
+        if value is None:
+            value = load()
+            self.backend.set(key, value, self.ttl)
+        
+        return value
+    
+    def get(self, key):
+        """Return a plain entry, for values whose key already changes along with their data"""
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+    
+    def set(self, key, value):
+        self.backend.set(key, value, self.ttl)
+    
+    def invalidate(self, tags):
+        """Make every entry carrying one of the tags unreachable"""
+        for tag in tags:
+            self.backend.incr(f'gen:{tag}')
+        
+        with self._lock:
+            self.invalidations += len(tags)
+    
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+                'invalidations': self.invalidations
+            }
+        
+        stats.update(self.backend.stats())
+        return stats
+
+def get_cache():
+    """Return the process-wide range cache, or None when RANGE_CACHE_BACKEND is empty"""
+    global _cache
+    
+    backend_name = current_app.config['RANGE_CACHE_BACKEND']
+    if not backend_name:
+        return None
+    
+    if _cache is not None:
+        return _cache
+    
+    with _cache_lock:
+        if _cache is None:
+            backend = import_string(backend_name).from_config(current_app.config)
+            _cache = RangeCache(backend, current_app.config['RANGE_CACHE_TTL'], current_app.config['RANGE_CACHE_MAX_BUCKETS'])
+        return _cache
+
+def cached_list(model, user_id, start, end, load):
+    """Serve a list endpoint's JSON body from the range cache
+    
+    load() builds the body as bytes on a miss. The entry keeps the data
+    version it was read at for its ETag, so a body cached before a write
+    another process made is never labelled with the newer version.
+    """
+    cache = get_cache()
+    version = g.get('data_version')
+    
+    if cache is None:
+        body = load()
+    else:
+        variant = urlencode(sorted(request.args.items(multi=True)))
+        body, version = cache.get_or_load(
+            model.__tablename__, user_id, start, end, variant,
+            lambda: (load(), g.get('data_version'))
+        )
+    
+    response = Response(body, mimetype='application/json')
+    if version is not None:
+        response.set_etag(make_etag(user_id, version))
+    return response
+
+def _queue_tags(tags):
+    """Queue cache tags on the session to be invalidated once the transaction commits"""
+    db.session.info.setdefault(PENDING_TAGS, set()).update(tags)
+
+def mark_changed(user_id, model, *starts):
+    """Invalidate the cached ranges holding rows of a user that start at starts
+    
+    The tags are queued on the session and invalidated once the transaction
+    commits, so a read racing the write cannot cache the old rows under the
+    new generation. Call it with both the old and the new start of a row
+    that moves.
+    """
+    starts = [start for start in starts if start]
+    if not starts:
+        return
+    
+    kind = model.__tablename__
+    _queue_tags([f'{kind}:{user_id}:open'] + [f'{kind}:{user_id}:{start:%Y-%m}' for start in starts])
+
+def mark_span_changed(user_id, model, start, end):
+    """Invalidate the cached ranges a row of a user overlapping [start, end] shows up in
+    
+    Rows spanning more months than an entry is tagged with invalidate every
+    cached range of the user.
+    """
+    kind = model.__tablename__
+    end = max(start, end)
+    
+    # Counted before the buckets are listed: an open-ended series runs to the year 9999
+    if (end.year - start.year) * 12 + end.month - start.month >= current_app.config['RANGE_CACHE_MAX_BUCKETS']:
+        _queue_tags([f'{kind}:{user_id}:all'])
+    else:
+        _queue_tags([f'{kind}:{user_id}:open'] + [f'{kind}:{user_id}:{month}' for month in month_buckets(start, end)])
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session):
+    tags = session.info.pop(PENDING_TAGS, None)
+    if tags and has_app_context():
+        cache = get_cache()
+        if cache is not None:
+            cache.invalidate(tags)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_rolled_back(session):
+    session.info.pop(PENDING_TAGS, None)
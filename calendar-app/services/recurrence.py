@@ -0,0 +1,333 @@
+import hashlib
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from dateutil.parser import isoparse
+from dateutil.rrule import rrulestr
+from flask import current_app
+from models.event import Event
+from models.meeting import Meeting
+from services.range_cache import get_cache
+
+# rrule_until of a series without COUNT or UNTIL, so a single range condition
+# on the (user_id, rrule_until) index finds every series reaching a window
+OPEN_SERIES_END = datetime(9999, 12, 31)
+
+# Frequencies a series may repeat at; finer ones could expand to an occurrence a second
+FREQUENCIES = ('HOURLY', 'DAILY', 'WEEKLY', 'MONTHLY', 'YEARLY')
+
+# Occurrences walked to find where a series with COUNT or UNTIL ends; longer
+# series are stored as open-ended, which only costs reads a wider candidate set
+MAX_COUNTED_OCCURRENCES = 10000
+
+# Periods of the frequencies whose expansion can skip whole intervals to a
+# window: every interval of a DAILY or WEEKLY rule repeats the same pattern
+SKIPPABLE_PERIODS = {'DAILY': timedelta(days=1), 'WEEKLY': timedelta(weeks=1)}
+
+# Columns a series master is expanded from
+SERIES_FIELDS = {
+    Event: ('id', 'start_date', 'end_date', 'rrule', 'exdates', 'rrule_timezone', 'updated_at'),
+    Meeting: ('id', 'date', 'duration', 'rrule', 'exdates', 'rrule_timezone', 'updated_at')
+}
+
+# Series columns of an entry that does not repeat
+NO_RECURRENCE = {'rrule': None, 'exdates': None, 'rrule_timezone': None, 'rrule_until': None}
+
+class InvalidRecurrence(ValueError):
+    """Raised for a recurrence rule, exception date or time zone that cannot be used"""
+
+def _zone(name):
+    """Return the tz database zone of a name, UTC without one"""
+    if not name:
+        return timezone.utc
+    
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise InvalidRecurrence(f'Unknown time zone: {name}')
+
+def _utc(moment):
+    """Convert an aware datetime into a naive UTC one"""
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+def _local(moment, zone):
+    """Convert a naive UTC datetime into an aware one in zone"""
+    return moment.replace(tzinfo=timezone.utc).astimezone(zone)
+
+def _start(model, row):
+    """Return the start column value of a row of model"""
+    return row['start_date'] if model is Event else row['date']
+
+def _until(value, zone):
+    """Rewrite a floating UNTIL in UTC, which dateutil requires once DTSTART has a zone"""
+    if value.endswith('Z'):
+        return value
+    
+    try:
+        moment = isoparse(value)
+    except ValueError:
+        raise InvalidRecurrence('UNTIL must be a DATE or DATE-TIME')
+    
+    # A DATE includes the whole day
+    if len(value) == 8:
+        moment += timedelta(days=1, seconds=-1)
+    return _utc(moment.replace(tzinfo=zone)).strftime('%Y%m%dT%H%M%SZ')
+
+def normalize_rrule(rrule, zone=timezone.utc):
+    """Validate an RRULE value and return it as stored: upper case, UNTIL in UTC, no RRULE: prefix"""
+    if not isinstance(rrule, str):
+        raise InvalidRecurrence('rrule must be a string')
+    
+    value = rrule.strip().upper()
+    if value.startswith('RRULE:'):
+        value = value[6:]
+    
+    parts = []
+    frequency = None
+    for part in value.split(';'):
+        name, _, part_value = (item.strip() for item in part.partition('='))
+        if not name or not part_value:
+            raise InvalidRecurrence(f'Invalid rrule part: {part}')
+        
+        if name == 'FREQ':
+            frequency = part_value
+        elif name == 'UNTIL':
+            part_value = _until(part_value, zone)
+        parts.append(f'{name}={part_value}')
+    
+    if frequency not in FREQUENCIES:
+        raise InvalidRecurrence(f"FREQ must be one of {', '.join(FREQUENCIES)}")
+    return ';'.join(parts)
+
+def build_rule(rrule, start, zone=timezone.utc):
+    """Return the dateutil rule of a stored RRULE from a naive UTC start, repeating at wall-clock times in zone"""
+    return rrulestr(rrule, dtstart=_local(start, zone))
+
+def parse_exdates(value, zone=timezone.utc):
+    """Parse exception dates into naive UTC datetimes
+    
+    value is a list, or a comma-separated string, of ISO 8601 datetimes or
+    datetime objects. Values without an offset are wall-clock times in zone.
+    """
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(',')
+    if not isinstance(value, (list, tuple, set)):
+        raise InvalidRecurrence('exdates must be a list of ISO 8601 datetimes')
+    
+    dates = []
+    for item in value:
+        if isinstance(item, datetime):
+            dates.append(item)
+            continue
+        
+        try:
+            moment = isoparse(item.strip())
+        except (AttributeError, ValueError):
+            raise InvalidRecurrence(f'Invalid exception date: {item}')
+        dates.append(_utc(moment if moment.tzinfo else moment.replace(tzinfo=zone)))
+    
+    return dates
+
+def format_exdates(dates):
+    """Return exception dates as stored: sorted, unique naive UTC ISO 8601 datetimes joined by commas, or None"""
+    return ','.join(sorted({moment.isoformat() for moment in dates})) or None
+
+def merge_exdates(stored, dates):
+    """Return the stored exception dates with more datetimes added, as stored"""
+    return format_exdates(parse_exdates(stored) + list(dates))
+
+def recurrence_lines(lines):
+    """Split iCalendar RRULE and EXDATE content lines, such as Google's recurrence field, into (rrule, exdates)
+    
+    EXDATEs are converted from their TZID to naive UTC. Other lines, e.g.
+    RDATE, are ignored.
+    """
+    rrule = None
+    exdates = []
+    
+    for line in lines:
+        name, _, value = line.partition(':')
+        name, *params = name.split(';')
+        name = name.strip().upper()
+        
+        if name == 'RRULE' and rrule is None:
+            rrule = value
+        elif name == 'EXDATE':
+            parameters = {key.upper(): param_value.strip('"') for key, _, param_value in (param.partition('=') for param in params)}
+            exdates += parse_exdates(value, _zone(parameters.get('TZID')))
+    
+    return rrule, exdates
+
+def _window_start(rrule, start, first, zone):
+    """Return the aware local start to expand a rule from for a window beginning at first
+    
+    A DAILY or WEEKLY rule without COUNT is moved forward by whole intervals
+    to the last one starting over a period before first, so the expansion
+    does not walk every earlier occurrence. Others start at their own start.
+    """
+    local_start = _local(start, zone).replace(tzinfo=None)
+    parts = dict(part.split('=', 1) for part in rrule.split(';'))
+    period = SKIPPABLE_PERIODS.get(parts['FREQ'])
+    if period is None or 'COUNT' in parts or first <= start:
+        return local_start.replace(tzinfo=zone)
+    
+    # Wall-clock arithmetic, like the rule's, so the time of day survives DST
+    interval = period * int(parts.get('INTERVAL', 1))
+    skipped = (_local(first, zone).replace(tzinfo=None) - local_start - period) // interval
+    return (local_start + max(skipped, 0) * interval).replace(tzinfo=zone)
+
+def series_end(rrule, rule, start, length):
+    """Return the end of a series' last occurrence, OPEN_SERIES_END when it has no end or too many to count"""
+    if 'COUNT=' not in rrule and 'UNTIL=' not in rrule:
+        return OPEN_SERIES_END
+    
+    last = None
+    for index, last in enumerate(rule):
+        if index == MAX_COUNTED_OCCURRENCES:
+            return OPEN_SERIES_END
+    
+    # A rule without any occurrence keeps its master findable at its own start
+    return (_utc(last) if last is not None else start) + length
+
+def recurrence_columns(start, length, rrule, exdates=None, zone_name=None):
+    """Return the series columns of an entry starting at start and lasting length
+    
+    Without a rule they are all None: the entry does not repeat. Otherwise
+    the rule is validated and stored normalized, with the end of its last
+    occurrence in rrule_until. Raises InvalidRecurrence for a rule, exception
+    date or time zone that cannot be used.
+    """
+    if not rrule:
+        return dict(NO_RECURRENCE)
+    
+    zone = _zone(zone_name)
+    rrule = normalize_rrule(rrule, zone)
+    try:
+        rrule_until = series_end(rrule, build_rule(rrule, start, zone), start, length)
+    except (ValueError, TypeError) as e:
+        raise InvalidRecurrence(f'Invalid rrule: {e}')
+    
+    return {
+        'rrule': rrule,
+        'exdates': format_exdates(parse_exdates(exdates)),
+        'rrule_timezone': zone_name or None,
+        'rrule_until': rrule_until
+    }
+
+def series_filter(model, user_id, start, end):
+    """Return the criteria selecting the series masters of a user that can have occurrences in [start, end]
+    
+    user_id can also be a list, for the masters of several users. Rows that
+    do not repeat have no rrule_until, so the (user_id, rrule_until) index
+    reads masters only.
+    """
+    if isinstance(user_id, (list, tuple, set)):
+        owner = model.user_id.in_(user_id)
+    else:
+        owner = model.user_id == user_id
+    
+    start_column = Event.start_date if model is Event else Meeting.date
+    return [owner, model.rrule_until >= start, start_column <= end]
+
+def _series_digest(model, master):
+    """Return a hash of the columns an expansion of a master depends on"""
+    series = (master['rrule'], master['exdates'] or '', master['rrule_timezone'] or '', _start(model, master).isoformat())
+    return hashlib.sha1('\n'.join(series).encode()).hexdigest()
+
+def occurrence_starts(model, master, first, last):
+    """Return the naive UTC starts of a master's occurrences in [first, last], without its exception dates
+    
+    Expansions are cached per master and window in the range cache. The key
+    holds the master's updated_at and a hash of its series columns, so
+    writing the master retires them even within the same second, which is
+    all a MySQL DATETIME keeps. At most RECURRENCE_MAX_OCCURRENCES are
+    returned.
+    """
+    cache = get_cache()
+    key = (f"rrule:{model.__tablename__}:{master['id']}:{master['updated_at'].isoformat()}:"
+           f"{_series_digest(model, master)}:{first.isoformat()}:{last.isoformat()}")
+    if cache is not None:
+        starts = cache.get(key)
+        if starts is not None:
+            return starts
+    
+    zone = _zone(master['rrule_timezone'])
+    rule = rrulestr(master['rrule'], dtstart=_window_start(master['rrule'], _start(model, master), first, zone))
+    excluded = set(parse_exdates(master['exdates']))
+    limit = current_app.config['RECURRENCE_MAX_OCCURRENCES']
+    starts = []
+    
+    for occurrence in rule.xafter(_local(first, zone), inc=True):
+        occurrence = _utc(occurrence)
+        if occurrence > last or len(starts) == limit:
+            break
+        if occurrence not in excluded:
+            starts.append(occurrence)
+    
+    if cache is not None:
+        cache.set(key, starts)
+    return starts
+
+def expand_series(model, masters, start, end, end_inclusive=False):
+    """Yield (master, start, end) for every occurrence of series masters in a window
+    
+    masters are mappings holding at least SERIES_FIELDS[model], e.g. the
+    _mapping of result rows. Event occurrences count while they overlap
+    [start, end), like overlap_filter(); meeting occurrences when they start
+    in [start, end), or [start, end] with end_inclusive.
+    """
+    for master in masters:
+        if model is Event:
+            length = master['end_date'] - master['start_date']
+            first = start - length
+        else:
+            length = timedelta(minutes=master['duration'])
+            first = start
+        
+        for occurrence in occurrence_starts(model, master, first, end):
+            if occurrence == end and (model is Event or not end_inclusive):
+                continue
+            # Zero-length events count when they start inside the range
+            if occurrence < start and occurrence + length <= start:
+                continue
+            yield master, occurrence, occurrence + length
+
+def occurrence_rows(model, query, names, start, end, end_inclusive=False):
+    """Expand the series masters a query selects into rows laid out like a list query's
+    
+    query is a model query narrowed by series_filter(); its columns are
+    replaced by names plus the ones the expansion needs. Every occurrence
+    is a row of names, with its own start (and end), followed by
+    recurrence_id, the start it has in the series.
+    """
+    columns = names + tuple(field for field in SERIES_FIELDS[model] if field not in names)
+    query = query.with_entities(*[getattr(model, name) for name in columns])
+    Occurrence = namedtuple('Occurrence', names + ('recurrence_id',), rename=True)
+    start_field = 'start_date' if model is Event else 'date'
+    rows = []
+    
+    for master, occurrence_start, occurrence_end in expand_series(model, (row._mapping for row in query), start, end, end_inclusive):
+        values = [master[name] for name in names]
+        for index, name in enumerate(names):
+            if name == start_field:
+                values[index] = occurrence_start
+            elif name == 'end_date':
+                values[index] = occurrence_end
+        rows.append(Occurrence(*values, occurrence_start))
+    
+    return rows
+
+def rows_with_occurrences(rows, fields):
+    """rows_to_dicts() for list rows merged with occurrence_rows(), whose dicts also get their recurrence_id"""
+    entries = []
+    
+    for row in rows:
+        entry = dict(zip(fields, row))
+        recurrence_id = getattr(row, 'recurrence_id', None)
+        if recurrence_id is not None:
+            entry['recurrence_id'] = recurrence_id
+        entries.append(entry)
+    
+    return entries
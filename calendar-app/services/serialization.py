@@ -0,0 +1,67 @@
+import json
+from flask import Response
+from models.task import Task
+from models.event import Event
+from models.meeting import Meeting
+
+try:
+    import orjson
+except ImportError:  # Falls back to the standard library encoder
+    orjson = None
+
+# Columns a list endpoint can return, in to_dict() order
+LIST_FIELDS = {
+    Task: ('id', 'title', 'description', 'date', 'completed', 'assigned_to', 'source', 'created_at', 'updated_at'),
+    Event: ('id', 'title', 'description', 'start_date', 'end_date', 'location', 'rrule', 'exdates', 'rrule_timezone',
+            'source', 'created_at', 'updated_at'),
+    Meeting: ('id', 'title', 'description', 'date', 'duration', 'platform', 'meeting_link', 'link_status',
+              'participants', 'rrule', 'exdates', 'rrule_timezone', 'source', 'created_at', 'updated_at')
+}
+
+class InvalidFields(ValueError):
+    """Raised for a fields query parameter naming an unknown column"""
+
+def parse_fields(model, value):
+    """Return the columns requested with ?fields=a,b,c, or every list column without it"""
+    if not value:
+        return LIST_FIELDS[model]
+    
+    fields = tuple(field.strip() for field in value.split(',') if field.strip())
+    for field in fields:
+        if field not in LIST_FIELDS[model]:
+            raise InvalidFields(f"Unknown field: {field}")
+    
+    return fields
+
+def select_fields(query, model, fields, required=()):
+    """Narrow a model query to plain row tuples of the given columns
+    
+    Columns in required, e.g. the ones a pagination cursor is built from, are
+    selected after the requested ones without being returned. Returns the
+    query and the selected column names.
+    """
+    names = fields + tuple(name for name in required if name not in fields)
+    return query.with_entities(*[getattr(model, name) for name in names]), names
+
+def rows_to_dicts(rows, fields):
+    """Turn selected rows into dicts of the requested fields, which come first in each row"""
+    return [dict(zip(fields, row)) for row in rows]
+
+def _default(value):
+    """Encode the datetimes the standard library encoder does not know"""
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+def dumps(data):
+    """Encode data as JSON bytes, with orjson when it is installed
+    
+    Naive datetimes come out as isoformat() strings either way.
+    """
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, default=_default, separators=(',', ':')).encode()
+
+def json_response(data, status=200):
+    """Build a JSON response without going through jsonify"""
+    return Response(dumps(data), status=status, mimetype='application/json')
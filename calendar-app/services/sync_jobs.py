@@ -0,0 +1,214 @@
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from models.database import db
+from models.user import User
+from models.sync_job import SyncJob
+from services.gmail_service import get_gmail_events
+from services.outlook_service import get_outlook_events
+from services.sync_service import sync_provider
+from services.token_manager import TOKEN_COLUMNS, get_access_token
+
+# Event fetchers of the providers that can be synced
+FETCHERS = {
+    'outlook': get_outlook_events,
+    'gmail': get_gmail_events
+}
+
+_executor = None
+_pending = 0  # Jobs submitted to this process and not finished yet
+_lock = threading.Lock()
+
+class SyncQueueFull(Exception):
+    """Raised when this process already holds SYNC_QUEUE_MAX pending jobs"""
+
+def _get_executor():
+    """Return the worker pool of this process, creating it on first use"""
+    global _executor
+    
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=current_app.config['SYNC_WORKERS'],
+                thread_name_prefix='sync-worker'
+            )
+    
+    return _executor
+
+def _active_job(user_id, provider):
+    """Return the job holding the in-flight slot of a user's provider, if any"""
+    return SyncJob.query.filter_by(user_id=user_id, provider=provider, active=True).first()
+
+def claim_job(user_id, provider):
+    """Create a queued job for a provider sync unless one is already in flight
+    
+    Returns (job, created). The unique index on (user_id, provider, active)
+    lets a single job hold the slot, so of two concurrent requests one
+    creates the job and the other gets it back. Jobs stuck longer than
+    SYNC_JOB_TIMEOUT, e.g. because their process died, are failed and give
+    the slot up.
+    """
+    now = datetime.utcnow()
+    table = SyncJob.__table__
+    db.session.execute(update(table).where(
+        table.c.user_id == user_id,
+        table.c.provider == provider,
+        table.c.active.is_(True),
+        table.c.created_at <= now - current_app.config['SYNC_JOB_TIMEOUT']
+    ).values(status='failed', error='Timed out', active=None, finished_at=now))
+    
+    active = _active_job(user_id, provider)
+    if active:
+        db.session.commit()
+        return active, False
+    
+    job = SyncJob(id=uuid.uuid4().hex, user_id=user_id, provider=provider, status='queued', active=True)
+    try:
+        with db.session.begin_nested():
+            db.session.add(job)
+    except IntegrityError:
+        # Another request claimed the slot since the lookup
+        active = _active_job(user_id, provider)
+        db.session.commit()
+        if active:
+            return active, False
+        raise
+    
+    db.session.commit()
+    
+    return job, True
+
+def enqueue_sync(user_id, provider):
+    """Queue a provider sync for a user, merging into a job already in flight
+    
+    Returns (job, created). Raises SyncQueueFull when this process already
+    holds SYNC_QUEUE_MAX pending jobs.
+    """
+    global _pending
+    
+    with _lock:
+        if _pending >= current_app.config['SYNC_QUEUE_MAX']:
+            raise SyncQueueFull()
+        _pending += 1
+    
+    created = False
+    try:
+        job, created = claim_job(user_id, provider)
+    finally:
+        # Merged requests do not take a queue slot
+        if not created:
+            with _lock:
+                _pending -= 1
+    
+    if created:
+        _get_executor().submit(_run_job, current_app._get_current_object(), job.id)
+    
+    return job, created
+
+def run_user_sync(user_id, provider, progress=None):
+    """Sync one provider of a user and return the counts
+    
+    Raises ValueError when the provider is not connected or its token can no
+    longer be refreshed. The caller commits the final cursor.
+    """
+    user = User.query.get(user_id)
+    
+    if not user or not getattr(user, TOKEN_COLUMNS[provider]):
+        raise ValueError(f"{provider.capitalize()} not connected")
+    
+    access_token = get_access_token(user, provider)
+    
+    if not access_token:
+        raise ValueError(f"{provider.capitalize()} token expired, please reconnect")
+    
+    return sync_provider(user_id, provider, FETCHERS[provider], access_token, progress)
+
+def execute_job(job_id):
+    """Run a claimed sync job in the current app context and record its outcome"""
+    job = SyncJob.query.get(job_id)
+    job.status = 'running'
+    job.started_at = datetime.utcnow()
+    db.session.commit()
+    
+    def progress(counts):
+        # Saved with the chunk commit that produced the counts
+        job.counts = json.dumps(counts)
+    
+    try:
+        counts = run_user_sync(job.user_id, job.provider, progress)
+        job.counts = json.dumps(counts)
+        job.status = 'succeeded'
+    except Exception as e:
+        db.session.rollback()
+        job.status = 'failed'
+        job.error = str(e)
+    
+    job.finished_at = datetime.utcnow()
+    job.active = None
+    db.session.commit()
+    
+    return job
+
+def _run_job(app, job_id):
+    """Run a queued sync job on a worker thread"""
+    global _pending
+    
+    try:
+        with app.app_context():
+            execute_job(job_id)
+    finally:
+        with _lock:
+            _pending -= 1
+
+def _execute_claimed(app, job_id):
+    """Run a claimed sync job on a thread of its own and return its state with the seconds it took"""
+    with app.app_context():
+        started = time.perf_counter()
+        result = execute_job(job_id).to_dict()
+        result['seconds'] = round(time.perf_counter() - started, 3)
+        return result
+
+def run_concurrent_sync(user):
+    """Sync every connected provider of a user in parallel and wait for them
+    
+    Each provider runs as a claimed sync job on a thread with its own session,
+    streaming its pages into chunk commits, so a provider that fails leaves
+    the others applied. A provider with a job already in flight returns that
+    job instead of syncing twice. Returns {provider: job} as
+    SyncJob.to_dict(), with the seconds of the jobs run here. Wall-clock time
+    follows the slowest provider.
+    """
+    results = {}
+    claimed = {}
+    
+    for provider in FETCHERS:
+        if not getattr(user, TOKEN_COLUMNS[provider]):
+            continue
+        
+        job, created = claim_job(user.id, provider)
+        if created:
+            claimed[provider] = job.id
+        else:
+            results[provider] = job.to_dict()
+    
+    if not claimed:
+        return results
+    
+    app = current_app._get_current_object()
+    with ThreadPoolExecutor(max_workers=len(claimed), thread_name_prefix='sync-worker') as executor:
+        futures = {provider: executor.submit(_execute_claimed, app, job_id) for provider, job_id in claimed.items()}
+        
+        for provider, future in futures.items():
+            try:
+                results[provider] = future.result()
+            except Exception as e:
+                # The job could not record its outcome; it gives its slot up once timed out
+                results[provider] = {"id": claimed[provider], "status": "failed", "error": str(e)}
+    
+    return results
@@ -0,0 +1,213 @@
+import heapq
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import func
+from models.database import db
+from models.user import User
+from models.task import Task
+from models.event import Event
+from models.meeting import Meeting
+from services.sync_jobs import FETCHERS, claim_job, execute_job
+from services.token_manager import TOKEN_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Entry types whose local edits count as user activity
+ACTIVITY_MODELS = (Task, Event, Meeting)
+
+def last_edits_query(model):
+    """Return (user_id, latest local edit) of every user, read off the (source, user_id, updated_at) index"""
+    return db.session.query(model.user_id, func.max(model.updated_at)).filter(
+        model.source == 'local'
+    ).group_by(model.user_id)
+
+class TokenBucket:
+    """Rate budget of `rate` acquisitions per second with bursts up to `capacity`"""
+    
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+    
+    def try_acquire(self):
+        """Take one token if available without blocking"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        
+        if self.tokens < 1:
+            return False
+        
+        self.tokens -= 1
+        return True
+
+class SyncScheduler:
+    """Background sync of every connected calendar on a jittered interval
+    
+    Due syncs wait in a heap ordered by due time. Once due they are started
+    most recently active user first, as long as the global and per-provider
+    concurrency limits and the per-provider rate budgets allow it. Each run
+    goes through the sync job table, so it merges with user-triggered syncs.
+    """
+    
+    def __init__(self, app, interval, jitter, max_concurrency, provider_concurrency,
+                 provider_rates, refresh_interval):
+        self.app = app
+        self.interval = interval
+        self.jitter = jitter
+        self.refresh_interval = refresh_interval
+        self.max_concurrency = max_concurrency
+        self.provider_concurrency = provider_concurrency
+        self.buckets = {provider: TokenBucket(rate) for provider, rate in provider_rates.items()}
+        
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='scheduled-sync')
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        
+        self.due = []  # Heap of (due_at, user_id, provider)
+        self.scheduled = set()  # (user_id, provider) pairs in the heap or running
+        self.connected = set()
+        self.running = {provider: 0 for provider in FETCHERS}
+        self.activity = {}  # user_id -> last activity timestamp
+        self.completed = 0
+        self.failed = 0
+        self.last_refresh = 0
+    
+    def _next_due(self, now):
+        """Return the next run time, spread by +/- jitter around the interval"""
+        return now + self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+    
+    def refresh_users(self):
+        """Pick up newly connected calendars and the latest user activity"""
+        with self.app.app_context():
+            connected = set()
+            for provider in FETCHERS:
+                column = getattr(User, TOKEN_COLUMNS[provider])
+                for (user_id,) in db.session.query(User.id).filter(column.isnot(None)):
+                    connected.add((user_id, provider))
+            
+            # Last activity is the most recent local edit of any entry type
+            activity = {}
+            for model in ACTIVITY_MODELS:
+                for user_id, updated_at in last_edits_query(model):
+                    if updated_at and updated_at.timestamp() > activity.get(user_id, 0):
+                        activity[user_id] = updated_at.timestamp()
+        
+        now = time.time()
+        with self.lock:
+            self.activity = activity
+            for key in connected - self.scheduled:
+                # First runs are spread across a whole interval to avoid a burst
+                heapq.heappush(self.due, (now + random.uniform(0, self.interval), key[0], key[1]))
+                self.scheduled.add(key)
+            
+            # Disconnected calendars are dropped when they come due
+            self.connected = connected
+        
+        self.last_refresh = now
+    
+    def _start_ready(self, now):
+        """Start as many due syncs as the limits and budgets allow"""
+        with self.lock:
+            ready = []
+            while self.due and self.due[0][0] <= now:
+                ready.append(heapq.heappop(self.due))
+            
+            # Most recently active users first
+            ready.sort(key=lambda item: -self.activity.get(item[1], 0))
+            waiting = []
+            
+            for due_at, user_id, provider in ready:
+                if (user_id, provider) not in self.connected:
+                    self.scheduled.discard((user_id, provider))
+                    continue
+                
+                if (sum(self.running.values()) >= self.max_concurrency
+                        or self.running[provider] >= self.provider_concurrency.get(provider, self.max_concurrency)
+                        or (provider in self.buckets and not self.buckets[provider].try_acquire())):
+                    waiting.append((due_at, user_id, provider))
+                    continue
+                
+                self.running[provider] += 1
+                self.executor.submit(self._run, user_id, provider)
+            
+            for item in waiting:
+                heapq.heappush(self.due, item)
+    
+    def _run(self, user_id, provider):
+        """Run one scheduled sync and put it back in the heap"""
+        succeeded = True
+        try:
+            with self.app.app_context():
+                # A sync already in flight, e.g. user-triggered, counts as this run
+                job, created = claim_job(user_id, provider)
+                if created:
+                    job = execute_job(job.id)
+                    if job.status == 'failed':
+                        logger.warning('Sync of %s for user %s failed: %s', provider, user_id, job.error)
+                        succeeded = False
+        except Exception:
+            logger.exception('Sync of %s for user %s crashed', provider, user_id)
+            succeeded = False
+        finally:
+            with self.lock:
+                self.running[provider] -= 1
+                if succeeded:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                heapq.heappush(self.due, (self._next_due(time.time()), user_id, provider))
+    
+    def stats(self):
+        """Return queue depth, lag and counters of the scheduler"""
+        now = time.time()
+        
+        with self.lock:
+            overdue = [due_at for due_at, _, _ in self.due if due_at <= now]
+            return {
+                'scheduled': len(self.scheduled),
+                'queue_depth': len(overdue),
+                'lag_seconds': round(now - min(overdue), 3) if overdue else 0,
+                'running': dict(self.running),
+                'completed': self.completed,
+                'failed': self.failed
+            }
+    
+    def run(self, tick=1.0, once=False):
+        """Run the scheduling loop until stopped
+        
+        With once, every connected calendar is synced a single time and the
+        loop returns when they are done.
+        """
+        self.refresh_users()
+        
+        if once:
+            with self.lock:
+                self.due = [(0, user_id, provider) for _, user_id, provider in self.due]
+                heapq.heapify(self.due)
+        
+        while not self.stop_event.is_set():
+            now = time.time()
+            
+            if not once and now - self.last_refresh >= self.refresh_interval:
+                self.refresh_users()
+            
+            self._start_ready(now)
+            
+            if once:
+                with self.lock:
+                    idle = not any(self.running.values()) and not any(d <= now for d, _, _ in self.due)
+                if idle:
+                    break
+            
+            self.stop_event.wait(tick)
+        
+        self.executor.shutdown(wait=True)
+    
+    def stop(self):
+        """Ask the loop to exit after the running syncs finish"""
+        self.stop_event.set()
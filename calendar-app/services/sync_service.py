@@ -0,0 +1,433 @@
+import queue
+import threading
+from contextlib import closing
+from datetime import datetime, timedelta
+from itertools import islice
+from flask import current_app
+from sqlalchemy import insert, update, delete, bindparam, or_
+from models.database import db
+from models.event import Event
+from models.meeting import Meeting
+from models.sync_state import SyncState
+from services.data_versions import bump_version
+from services.range_cache import mark_changed, mark_span_changed
+from services.event_buckets import index_events, unindex_events
+from services.recurrence import (NO_RECURRENCE, InvalidRecurrence, recurrence_columns, recurrence_lines,
+                                 parse_exdates, merge_exdates)
+
+# Platforms assumed for a synced meeting when its link mentions them
+PLATFORM_HINTS = {'outlook': ('teams',), 'gmail': ('zoom',), 'ics': ('zoom', 'teams')}
+
+# Columns kept in step with the provider on every sync
+SERIES_SYNC_FIELDS = ('rrule', 'exdates', 'rrule_timezone', 'rrule_until')
+EVENT_SYNC_FIELDS = ('title', 'description', 'start_date', 'end_date', 'location') + SERIES_SYNC_FIELDS
+MEETING_SYNC_FIELDS = ('title', 'description', 'date', 'duration', 'meeting_link', 'participants') + SERIES_SYNC_FIELDS
+
+SYNC_FIELDS = {Event: EVENT_SYNC_FIELDS, Meeting: MEETING_SYNC_FIELDS}
+
+# Column holding the start of each synced entry
+START_COLUMNS = {Event: Event.start_date, Meeting: Meeting.date}
+
+# Columns placing each synced entry in time
+SPAN_FIELDS = {Event: ('start_date', 'end_date', 'rrule_until'), Meeting: ('date', 'rrule_until')}
+
+class SyncCursor:
+    """Provider sync position handed to an events fetch and updated by it"""
+    
+    def __init__(self, token=None):
+        self.token = token  # Cursor the fetch resumes from, None for a full fetch
+        self.next_token = None  # Cursor to store once the fetch completes
+        self.full_sync = token is None
+        self.complete = False  # Set once every page was read successfully
+        self.window_start = None  # Time window covered by a full fetch
+        self.window_end = None
+        self.started_at = datetime.utcnow()
+    
+    def start_full_sync(self, window_start, window_end):
+        """Record that the fetch re-reads the whole window"""
+        self.full_sync = True
+        self.window_start = window_start
+        self.window_end = window_end
+
+class SyncFetchError(Exception):
+    """Raised by an events fetch that stopped before its last page, e.g. on a provider or network error"""
+
+def _series_columns(event, length):
+    """Return the series columns of a provider entry; one whose rule cannot be used is kept as a single entry"""
+    if not event.recurrence:
+        return NO_RECURRENCE
+    
+    try:
+        rrule, exdates = recurrence_lines(event.recurrence)
+        return recurrence_columns(event.start, length, rrule, exdates, event.timezone or None)
+    except InvalidRecurrence:
+        return NO_RECURRENCE
+
+def _to_row(event):
+    """Map a normalized provider event onto the model and column values it is stored as"""
+    if event.is_meeting:
+        return Meeting, dict({
+            'title': event.title,
+            'description': event.description,
+            'date': event.start,
+            'duration': event.duration,
+            'meeting_link': event.meeting_link,
+            'participants': event.attendees
+        }, **_series_columns(event, timedelta(minutes=event.duration)))
+    
+    end = event.end or event.start
+    return Event, dict({
+        'title': event.title,
+        'description': event.description,
+        'start_date': event.start,
+        'end_date': end,
+        'location': event.location
+    }, **_series_columns(event, end - event.start))
+
+def _mark_changed(user_id, model, values):
+    """Invalidate the cached ranges a synced row with these column values shows up in"""
+    if values.get('rrule_until'):
+        start = values['start_date'] if model is Event else values['date']
+        mark_span_changed(user_id, model, start, values['rrule_until'])
+    elif model is Event:
+        mark_span_changed(user_id, model, values['start_date'], values['end_date'])
+    else:
+        mark_changed(user_id, model, values['date'])
+
+def _load_existing(model, user_id, source, source_ids):
+    """Load {source_id: (id, synced values)} for the stored rows of a batch"""
+    fields = SYNC_FIELDS[model]
+    columns = [getattr(model, field) for field in fields]
+    
+    rows = db.session.query(model.id, model.source_id, *columns).filter(
+        model.user_id == user_id,
+        model.source == source,
+        model.source_id.in_(source_ids)
+    )
+    
+    return {row[1]: (row[0], tuple(row[2:])) for row in rows}
+
+def _bulk_update(model, rows):
+    """Update many rows by primary key with a single executemany statement"""
+    table = model.__table__
+    statement = update(table).where(table.c.id == bindparam('_id')).values(
+        {field: bindparam(f'_{field}') for field in SYNC_FIELDS[model]}
+    )
+    
+    db.session.execute(statement, [
+        {'_id': row_id, **{f'_{field}': values[field] for field in SYNC_FIELDS[model]}}
+        for row_id, values in rows
+    ])
+
+def _exclude_occurrences(user_id, source, exclusions):
+    """Add the original starts of edited and cancelled occurrences to the exception dates of their series
+    
+    exclusions maps series source ids to sets of starts. Series found among
+    the stored rows are updated and dropped from it; the rest stay for a
+    later batch, as providers list occurrences and masters in any order.
+    Returns the number of series changed.
+    """
+    changed = 0
+    
+    for model in SYNC_FIELDS:
+        if not exclusions:
+            break
+        
+        fields = SPAN_FIELDS[model]
+        columns = [getattr(model, field) for field in fields]
+        rows = db.session.query(model.id, model.source_id, model.exdates, *columns).filter(
+            model.user_id == user_id,
+            model.source == source,
+            model.source_id.in_(list(exclusions)),
+            model.rrule.isnot(None)
+        ).all()
+        updates = []
+        
+        for row_id, source_id, stored, *span in rows:
+            exdates = merge_exdates(stored, exclusions.pop(source_id))
+            if exdates != stored:
+                updates.append({'_id': row_id, '_exdates': exdates})
+                _mark_changed(user_id, model, dict(zip(fields, span)))
+        
+        if updates:
+            table = model.__table__
+            statement = update(table).where(table.c.id == bindparam('_id')).values(exdates=bindparam('_exdates'))
+            db.session.execute(statement, updates)
+            changed += len(updates)
+    
+    return changed
+
+def apply_sync_batch(user_id, source, remote_events, exclusions=None):
+    """Diff a batch of normalized provider events against the stored rows and write the changes in bulk
+    
+    The stored rows matching the batch are loaded with one query per table,
+    compared in memory and written back with executemany inserts and updates.
+    The user's data version is bumped and the cached ranges holding changed
+    rows are invalidated once the caller commits.
+    
+    Recurring series are stored as one master row. Edited and cancelled
+    occurrences are left out of their series through its exception dates;
+    pass the same exclusions dict to every batch of a sync so occurrences
+    listed before their series still reach it.
+    """
+    remote_events = list(remote_events)
+    exclusions = {} if exclusions is None else exclusions
+    source_ids = [event.id for event in remote_events]
+    existing = {model: _load_existing(model, user_id, source, source_ids) for model in SYNC_FIELDS}
+    inserts = {model: [] for model in SYNC_FIELDS}
+    updates = {model: [] for model in SYNC_FIELDS}
+    seen = set()
+    removed = []
+    unchanged = 0
+    
+    for event in remote_events:
+        source_id = event.id
+        
+        # An edited occurrence is stored on its own, a cancelled one only leaves a gap
+        if event.series_id and event.original_start:
+            exclusions.setdefault(event.series_id, set()).add(event.original_start)
+        
+        if event.deleted:
+            removed.append(source_id)
+            continue
+        
+        # Entries without a readable start cannot be placed on the calendar
+        if event.start is None:
+            continue
+        
+        model, values = _to_row(event)
+        
+        # Providers can repeat an entry across pages; keep the first copy
+        if (model, source_id) in seen:
+            continue
+        seen.add((model, source_id))
+        
+        stored = existing[model].get(source_id)
+        
+        # Exception dates gathered from occurrences are kept when the series itself changes
+        if stored is not None and values['rrule']:
+            stored_exdates = stored[1][SYNC_FIELDS[model].index('exdates')]
+            values['exdates'] = merge_exdates(stored_exdates, parse_exdates(values['exdates']))
+        
+        if stored is None:
+            row = dict(values, source=source, source_id=source_id, user_id=user_id)
+            if model is Meeting:
+                link = (values['meeting_link'] or '').lower()
+                row['platform'] = next((hint for hint in PLATFORM_HINTS[source] if hint in link), 'other')
+            inserts[model].append(row)
+            _mark_changed(user_id, model, values)
+        elif stored[1] == tuple(values[field] for field in SYNC_FIELDS[model]):
+            unchanged += 1
+        else:
+            updates[model].append((stored[0], values))
+            _mark_changed(user_id, model, dict(zip(SYNC_FIELDS[model], stored[1])))
+            _mark_changed(user_id, model, values)
+    
+    for model in SYNC_FIELDS:
+        if inserts[model]:
+            db.session.execute(insert(model.__table__), inserts[model])
+        if updates[model]:
+            _bulk_update(model, updates[model])
+    
+    # Keep the time buckets of inserted and moved events in step
+    if inserts[Event]:
+        rows = db.session.query(Event.id, Event.start_date, Event.end_date).filter(
+            Event.user_id == user_id,
+            Event.source == source,
+            Event.source_id.in_([row['source_id'] for row in inserts[Event]])
+        )
+        index_events(user_id, rows)
+    if updates[Event]:
+        index_events(user_id, [(row_id, values['start_date'], values['end_date']) for row_id, values in updates[Event]])
+    
+    deleted = 0
+    if removed:
+        for model in SYNC_FIELDS:
+            stored_rows = [existing[model][source_id] for source_id in removed if source_id in existing[model]]
+            for _, stored in stored_rows:
+                _mark_changed(user_id, model, dict(zip(SYNC_FIELDS[model], stored)))
+            if model is Event:
+                unindex_events([row_id for row_id, _ in stored_rows])
+            
+            result = db.session.execute(delete(model.__table__).where(
+                model.user_id == user_id,
+                model.source == source,
+                model.source_id.in_(removed)
+            ))
+            deleted += result.rowcount
+    
+    excluded = _exclude_occurrences(user_id, source, exclusions)
+    
+    # Unchanged batches leave the version, and the clients' ETags, alone
+    if any(inserts.values()) or any(updates.values()) or deleted or excluded:
+        bump_version(user_id)
+    
+    return {
+        'inserted': sum(len(rows) for rows in inserts.values()),
+        'updated': sum(len(rows) for rows in updates.values()) + excluded,
+        'unchanged': unchanged,
+        'deleted': deleted
+    }
+
+def prune_unseen(user_id, source, seen_ids, window_start, window_end):
+    """Delete stored rows in a fully synced window that the provider no longer returns
+    
+    Recurring series that started before the window are listed as long as
+    they reach into it, so their masters are checked as well.
+    """
+    deleted = 0
+    
+    for model, start_column in START_COLUMNS.items():
+        fields = SPAN_FIELDS[model]
+        rows = db.session.query(model.id, model.source_id, *[getattr(model, field) for field in fields]).filter(
+            model.user_id == user_id,
+            model.source == source,
+            or_(start_column >= window_start, model.rrule_until >= window_start),
+            start_column < window_end
+        )
+        stale_ids = []
+        
+        for row in rows:
+            if row[1] not in seen_ids:
+                stale_ids.append(row[0])
+                _mark_changed(user_id, model, dict(zip(fields, row[2:])))
+        
+        if stale_ids:
+            if model is Event:
+                unindex_events(stale_ids)
+            result = db.session.execute(delete(model.__table__).where(model.id.in_(stale_ids)))
+            deleted += result.rowcount
+    
+    if deleted:
+        bump_version(user_id)
+    
+    return deleted
+
+def iter_chunks(iterable, size):
+    """Yield lists of up to size items from an iterable"""
+    iterator = iter(iterable)
+    
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def load_sync_state(user_id, source):
+    """Return the stored SyncState of a provider and a cursor resuming from it
+    
+    The stored cursor is dropped once it is older than SYNC_FULL_RESYNC_INTERVAL
+    so the provider window moves forward.
+    """
+    state = SyncState.query.filter_by(user_id=user_id, provider=source).first()
+    
+    if not state:
+        state = SyncState(user_id=user_id, provider=source)
+        db.session.add(state)
+    
+    token = state.cursor
+    resync_interval = current_app.config['SYNC_FULL_RESYNC_INTERVAL']
+    if not state.full_synced_at or datetime.utcnow() - state.full_synced_at > resync_interval:
+        token = None
+    
+    return state, SyncCursor(token)
+
+def prefetch(fetch_events, access_token, cursor):
+    """Yield the events of a fetch while a thread reads the next pages
+    
+    The thread stays at most SYNC_PREFETCH_CHUNKS chunks ahead, so provider
+    requests overlap the writes and memory stays bounded whatever the size
+    of the calendar. An error of the fetch is raised once the events read
+    before it were yielded. The thread stops when the consumer does.
+    """
+    app = current_app._get_current_object()
+    events = queue.Queue(maxsize=current_app.config['SYNC_CHUNK_SIZE'] * current_app.config['SYNC_PREFETCH_CHUNKS'])
+    stopped = threading.Event()
+    
+    def put(item):
+        while not stopped.is_set():
+            try:
+                events.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def fetch():
+        # None marks the end of the fetch, an exception its failure
+        try:
+            with app.app_context():
+                for event in fetch_events(access_token, cursor):
+                    if not put(event):
+                        return
+        except Exception as e:
+            put(e)
+        else:
+            put(None)
+    
+    thread = threading.Thread(target=fetch, name='sync-fetch', daemon=True)
+    thread.start()
+    
+    try:
+        while True:
+            item = events.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stopped.set()
+
+def apply_sync_stream(user_id, source, remote_events, state, cursor, progress=None):
+    """Apply fetched provider events in chunks of SYNC_CHUNK_SIZE and advance the cursor
+    
+    Each chunk is committed on its own so memory stays flat whatever the
+    size of the calendar. After a full fetch, rows inside the window that the
+    provider no longer returns are deleted. A progress callback receives the
+    running counts before each chunk is committed. The caller commits the
+    final cursor.
+    """
+    counts = {'fetched': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0, 'deleted': 0}
+    seen_ids = set()
+    exclusions = {}
+    
+    for chunk in iter_chunks(remote_events, current_app.config['SYNC_CHUNK_SIZE']):
+        for key, value in apply_sync_batch(user_id, source, chunk, exclusions).items():
+            counts[key] += value
+        counts['fetched'] += len(chunk)
+        
+        if cursor.full_sync:
+            seen_ids.update(event.id for event in chunk if not event.deleted)
+        
+        if progress:
+            progress(counts)
+        db.session.commit()
+    
+    # Never prune or move the cursor after a partial fetch
+    if cursor.complete:
+        if cursor.full_sync:
+            counts['deleted'] += prune_unseen(user_id, source, seen_ids, cursor.window_start, cursor.window_end)
+            state.full_synced_at = cursor.started_at
+        state.cursor = cursor.next_token
+        state.last_synced_at = cursor.started_at
+    
+    counts['full_sync'] = cursor.full_sync
+    return counts
+
+def sync_provider(user_id, source, fetch_events, access_token, progress=None):
+    """Stream a provider's changes since the stored cursor into the database
+    
+    Pages are fetched on a thread of their own while the chunks before them
+    are written. Raises SyncFetchError when the fetch stopped before its last
+    page. The chunks written until then stay, the cursor does not move.
+    """
+    state, cursor = load_sync_state(user_id, source)
+    
+    with closing(prefetch(fetch_events, access_token, cursor)) as remote_events:
+        counts = apply_sync_stream(user_id, source, remote_events, state, cursor, progress)
+    
+    if not cursor.complete:
+        raise SyncFetchError(f"{source.capitalize()} sync stopped before the last page")
+    
+    return counts
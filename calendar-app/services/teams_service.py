@@ -1,14 +1,10 @@
 import requests
-import json
 from flask import current_app
 from datetime import datetime, timedelta
+from services import http_client
 
-def create_teams_meeting(token, subject, start_time, duration, content=''):
+def create_teams_meeting(access_token, subject, start_time, duration, content=''):
     """Create a Microsoft Teams meeting and return the meeting details"""
-    # Parse the token
-    token_data = json.loads(token)
-    access_token = token_data.get('access_token')
-    
     if not access_token:
         # Handle error - Teams requires OAuth token
         return {
@@ -43,7 +39,14 @@ def create_teams_meeting(token, subject, start_time, duration, content=''):
         "isEntryPointPresented": True
     }
     
-    response = requests.post(url, headers=headers, json=data)
+    try:
+        response = http_client.post(url, headers=headers, json=data)
+    except requests.RequestException as e:
+        # Handle error
+        return {
+            "error": "Failed to create Teams meeting",
+            "message": str(e)
+        }
     
     if response.status_code == 201:
         return response.json()
@@ -55,12 +58,8 @@ def create_teams_meeting(token, subject, start_time, duration, content=''):
             "message": response.text
         }
 
-def get_teams_meeting(token, meeting_id):
+def get_teams_meeting(access_token, meeting_id):
     """Get details of a specific Teams meeting"""
-    # Parse the token
-    token_data = json.loads(token)
-    access_token = token_data.get('access_token')
-    
     if not access_token:
         # Handle error - Teams requires OAuth token
         return {
@@ -75,7 +74,14 @@ def get_teams_meeting(token, meeting_id):
         "Content-Type": "application/json"
     }
     
-    response = requests.get(url, headers=headers)
+    try:
+        response = http_client.get(url, headers=headers)
+    except requests.RequestException as e:
+        # Handle error
+        return {
+            "error": "Failed to get Teams meeting",
+            "message": str(e)
+        }
     
     if response.status_code == 200:
         return response.json()
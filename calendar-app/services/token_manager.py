@@ -0,0 +1,159 @@
+import json
+import threading
+import time
+from flask import current_app
+from sqlalchemy import select, update
+from sqlalchemy.orm.attributes import set_committed_value
+from models.database import db
+from models.user import User
+from services.gmail_service import refresh_gmail_token
+from services.outlook_service import refresh_outlook_token
+
+# User columns holding each provider's token JSON
+TOKEN_COLUMNS = {
+    'outlook': 'outlook_token',
+    'gmail': 'gmail_token',
+    'zoom': 'zoom_token',
+    'teams': 'teams_token'
+}
+
+# Providers whose tokens can be refreshed with a refresh_token
+REFRESHERS = {
+    'outlook': refresh_outlook_token,
+    'gmail': refresh_gmail_token
+}
+
+# Decoded token data keyed by (user_id, provider), valid while the stored JSON is unchanged
+_decoded = {}
+_locks = {}  # Refresh locks of this process; other processes are handled by _store_token
+_locks_guard = threading.Lock()
+
+def stamp_token(token_json):
+    """Add an absolute expires_at to a provider token response"""
+    if not token_json:
+        return token_json
+    
+    token_data = json.loads(token_json)
+    if 'expires_in' in token_data:
+        token_data['expires_at'] = int(time.time()) + int(token_data['expires_in'])
+    
+    return json.dumps(token_data)
+
+def _lock_for(user_id, provider):
+    """Return the lock serializing refreshes of one user's provider token"""
+    key = (user_id, provider)
+    
+    with _locks_guard:
+        lock = _locks.get(key)
+        if lock is None:
+            lock = _locks[key] = threading.Lock()
+    
+    return lock
+
+def _decode(user, provider):
+    """Return the decoded token data of a user, parsing the JSON only when it changed"""
+    token_json = getattr(user, TOKEN_COLUMNS[provider])
+    if not token_json:
+        return None
+    
+    key = (user.id, provider)
+    cached = _decoded.get(key)
+    if cached and cached[0] == token_json:
+        return cached[1]
+    
+    token_data = json.loads(token_json)
+    _decoded[key] = (token_json, token_data)
+    return token_data
+
+def _read_token(user, provider):
+    """Reload a user's stored token JSON on a connection of its own, seeing what other processes committed"""
+    column = User.__table__.c[TOKEN_COLUMNS[provider]]
+    with db.engine.connect() as connection:
+        token_json = connection.execute(select(column).where(User.__table__.c.id == user.id)).scalar()
+    
+    # Loaded as if read by the session, so the caller's unit of work does not write it back
+    set_committed_value(user, TOKEN_COLUMNS[provider], token_json)
+    return token_json
+
+def _store_token(user, provider, old_json, new_json):
+    """Save a refreshed token and return the token JSON stored afterwards
+    
+    The write commits on a connection of its own, leaving the caller's
+    transaction alone. It only replaces the token the refresh started from,
+    so when another process stored a refreshed token first that one is kept
+    and returned instead.
+    """
+    table = User.__table__
+    column = table.c[TOKEN_COLUMNS[provider]]
+    
+    with db.engine.begin() as connection:
+        stored = connection.execute(
+            update(table).where(table.c.id == user.id, column == old_json).values({column: new_json})
+        ).rowcount
+        if not stored:
+            new_json = connection.execute(select(column).where(table.c.id == user.id)).scalar()
+    
+    set_committed_value(user, TOKEN_COLUMNS[provider], new_json)
+    return new_json
+
+def _needs_refresh(token_data):
+    """Check whether a token is missing, expired or about to expire"""
+    if not token_data.get('access_token'):
+        return True
+    
+    expires_at = token_data.get('expires_at')
+    if expires_at is None:
+        # Stored before expiry tracking; refresh once if we can so it gets stamped
+        return bool(token_data.get('refresh_token'))
+    
+    return expires_at - current_app.config['TOKEN_REFRESH_MARGIN'] <= time.time()
+
+def get_access_token(user, provider):
+    """Return a usable access token for a provider, or None
+    
+    The token is refreshed shortly before it expires. Within a process,
+    refreshes run under a per-user lock and re-read the stored token first,
+    so concurrent requests reuse the token the first one obtained. Across
+    processes the lock does not apply: each may refresh, but the token is
+    saved with a conditional update, so the first one stored wins and the
+    others use it. The save commits on its own connection and never commits
+    the caller's session.
+    """
+    token_data = _decode(user, provider)
+    
+    if token_data is None:
+        return None
+    
+    if not _needs_refresh(token_data):
+        return token_data.get('access_token')
+    
+    refresher = REFRESHERS.get(provider)
+    if not refresher or not token_data.get('refresh_token'):
+        # Nothing to refresh with; only hand out a token that is still valid
+        expires_at = token_data.get('expires_at')
+        if expires_at is not None and expires_at <= time.time():
+            return None
+        return token_data.get('access_token')
+    
+    with _lock_for(user.id, provider):
+        # Another request may have refreshed while we waited
+        old_json = _read_token(user, provider)
+        token_data = _decode(user, provider)
+        
+        if token_data is None:
+            return None
+        
+        if not _needs_refresh(token_data):
+            return token_data.get('access_token')
+        
+        new_token_json = refresher(token_data['refresh_token'])
+        if not new_token_json:
+            # Handle error
+            return None
+        
+        new_token_data = json.loads(stamp_token(new_token_json))
+        # Google only returns the refresh token on the first exchange
+        new_token_data.setdefault('refresh_token', token_data['refresh_token'])
+        
+        _store_token(user, provider, old_json, json.dumps(new_token_data))
+        return _decode(user, provider).get('access_token')
@@ -1,16 +1,12 @@
 import requests
-import json
 import jwt
 import time
 from flask import current_app
 from datetime import datetime
+from services import http_client
 
-def create_zoom_meeting(token, topic, start_time, duration, agenda=''):
+def create_zoom_meeting(access_token, topic, start_time, duration, agenda=''):
     """Create a Zoom meeting and return the meeting details"""
-    # Parse the token
-    token_data = json.loads(token)
-    access_token = token_data.get('access_token')
-    
     if not access_token:
         # Generate JWT token if no OAuth token
         api_key = current_app.config['ZOOM_API_KEY']
@@ -57,7 +53,14 @@ def create_zoom_meeting(token, topic, start_time, duration, agenda=''):
         }
     }
     
-    response = requests.post(url, headers=headers, json=data)
+    try:
+        response = http_client.post(url, headers=headers, json=data)
+    except requests.RequestException as e:
+        # Handle error
+        return {
+            "error": "Failed to create Zoom meeting",
+            "message": str(e)
+        }
     
     if response.status_code == 201:
         return response.json()
@@ -69,12 +72,8 @@ def create_zoom_meeting(token, topic, start_time, duration, agenda=''):
             "message": response.text
 
         }
-def get_zoom_meeting(token, meeting_id):
+def get_zoom_meeting(access_token, meeting_id):
     """Get details of a specific Zoom meeting"""
-    # Parse the token
-    token_data = json.loads(token)
-    access_token = token_data.get('access_token')
-    
     if not access_token:
         # Generate JWT token if no OAuth token
         api_key = current_app.config['ZOOM_API_KEY']
@@ -97,7 +96,14 @@ def get_zoom_meeting(token, meeting_id):
         "Content-Type": "application/json"
     }
     
-    response = requests.get(url, headers=headers)
+    try:
+        response = http_client.get(url, headers=headers)
+    except requests.RequestException as e:
+        # Handle error
+        return {
+            "error": "Failed to get Zoom meeting",
+            "message": str(e)
+        }
     
     if response.status_code == 200:
         return response.json()